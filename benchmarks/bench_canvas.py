@@ -0,0 +1,166 @@
+"""Обзорная мнемосхема на PlantView под платформой offscreen.
+
+Создаётся --items элементов canvas (ValueItem, RelayItem, ValveItem, PointerItem, StateItem по
+очереди) на сетке, и для нескольких масштабов измеряется:
+    frame_ms  - перерисовка окна после сдвига на --step пикселей (лучшая и худшая из --repeat)
+    update_ms - применение новых значений ко всем элементам через WidgetGroup и перерисовка окна
+Отдельно печатается время построения сцены.
+
+    python benchmarks/bench_canvas.py                          # только отчёт
+    python benchmarks/bench_canvas.py --save canvas.json       # сохранить базовую линию
+    python benchmarks/bench_canvas.py --baseline canvas.json --tolerance 0.5
+
+При сравнении с базовой линией код возврата 1, если хотя бы одно время выросло больше чем
+на tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from time import perf_counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PyQt6.QtWidgets import QApplication
+
+import value_widgets as vw
+
+ZOOMS = (1.0, 0.5, 0.2, 0.05, 0.01)
+
+_COLUMNS = 160
+_STEP_X = 150
+_STEP_Y = 110
+
+# время ниже этого порога, мс, считается шумом и не сравнивается
+_NOISE_MS = 1.0
+
+
+def build(n, group):
+    scene = vw.PlantScene()
+    for i in range(n):
+        x = i % _COLUMNS * _STEP_X
+        y = i // _COLUMNS * _STEP_Y
+        kind = i % 5
+        if kind == 0:
+            item = vw.ValueItem(x, y, 130, 60, label=f"P{i}", max_val=1.6)
+        elif kind == 1:
+            item = vw.RelayItem(x, y, label=f"K{i}", controllable=True)
+        elif kind == 2:
+            item = vw.ValveItem(x, y, label=f"V{i}", controllable=True)
+        elif kind == 3:
+            item = vw.PointerItem(x, y, 90, label="P", units="МПа")
+        else:
+            item = vw.StateItem(x, y, 100, 30)
+            item.add_state("Стоп", 0, "grey")
+            item.add_state("Работа", 1, "green")
+        scene.addItem(item)
+        group.bind(i, item)
+    return scene
+
+
+def _values(n, rnd):
+    """Значения всех тегов: аналоговые для ValueItem и PointerItem, состояния для остальных"""
+    ret = list()
+    for i in range(n):
+        kind = i % 5
+        if kind in (0, 3):
+            ret.append(rnd.random())
+        elif kind == 2:
+            ret.append(rnd.randrange(4))
+        else:
+            ret.append(rnd.randrange(2 if kind == 4 else 3))
+    return ret
+
+
+def run(app, view, group, n, zoom, step, repeat, rnd):
+    view.set_zoom(zoom)
+    rows = (n + _COLUMNS - 1) // _COLUMNS
+    view.centerOn(_COLUMNS * _STEP_X / 2, rows * _STEP_Y / 2)
+    app.processEvents()
+
+    frames = list()
+    scroll = view.horizontalScrollBar()
+    for i in range(repeat):
+        scroll.setValue(scroll.value() + (step if i % 2 == 0 else -step))
+        t0 = perf_counter()
+        view.viewport().repaint()
+        frames.append(perf_counter() - t0)
+
+    updates = list()
+    for _ in range(repeat):
+        values = _values(n, rnd)
+        t0 = perf_counter()
+        group.update_array(values)
+        group.flush()
+        # перерисовка по пометкам сцены, как в обычном цикле событий
+        app.processEvents()
+        view.viewport().repaint()
+        updates.append(perf_counter() - t0)
+    return {"frame_ms": min(frames) * 1000, "frame_max_ms": max(frames) * 1000,
+            "update_ms": min(updates) * 1000}
+
+
+def compare(results, baseline, tolerance):
+    failures = list()
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, value in metrics.items():
+            ref = base.get(key)
+            if ref is None or value < _NOISE_MS:
+                continue
+            if value > max(ref, _NOISE_MS) * (1 + tolerance):
+                failures.append(f"{name}: {key} {value:.2f} > baseline {ref:.2f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--items", type=int, default=20000)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=800)
+    parser.add_argument("--step", type=int, default=37, help="сдвиг при панорамировании, пикселей")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--save", help="сохранить результаты как базовую линию JSON")
+    parser.add_argument("--baseline", help="сравнить с базовой линией JSON")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    rnd = random.Random(1)
+    group = vw.WidgetGroup()
+    t0 = perf_counter()
+    scene = build(args.items, group)
+    results = {"build": {"build_ms": (perf_counter() - t0) * 1000}}
+    print(f"build {args.items} items: {results['build']['build_ms']:.0f} ms")
+
+    view = vw.PlantView(scene)
+    view.resize(args.width, args.height)
+    view.show()
+    app.processEvents()
+
+    print(f"{'zoom':>6} {'frame, ms':>10} {'worst, ms':>10} {'update, ms':>11}")
+    for zoom in ZOOMS:
+        r = run(app, view, group, args.items, zoom, args.step, args.repeat, rnd)
+        results[f"zoom {zoom}"] = r
+        print(f"{zoom:6} {r['frame_ms']:10.1f} {r['frame_max_ms']:10.1f} {r['update_ms']:11.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args) | {"save": None, "baseline": None}, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        failures = compare(results, baseline, args.tolerance)
+        for line in failures:
+            print("REGRESSION", line)
+        if failures:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
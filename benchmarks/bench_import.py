@@ -0,0 +1,119 @@
+"""Время импорта пакета и отдельных классов по данным python -X importtime.
+
+Каждый случай выполняется в отдельном процессе (лучший из --repeat запусков). Печатается
+суммарное время, загружен ли numpy, и --top самых дорогих модулей (собственное время).
+
+    python benchmarks/bench_import.py                          # только отчёт
+    python benchmarks/bench_import.py --save import.json       # сохранить базовую линию
+    python benchmarks/bench_import.py --baseline import.json --tolerance 0.5
+
+При сравнении с базовой линией код возврата 1, если время хотя бы одного случая выросло больше
+чем на tolerance или появился импорт numpy там, где его не было.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CASES = {
+    "package": "import value_widgets",
+    "ValueWidget": "from value_widgets import ValueWidget",
+    "PointerDevice": "from value_widgets import PointerDevice",
+    "KKM": "from value_widgets import KKM",
+    "TimerWidget": "from value_widgets import TimerWidget",
+    "WidgetGroup": "from value_widgets import WidgetGroup",
+    "Diagram": "from value_widgets import Diagram",
+    "StripChart": "from value_widgets import StripChart",
+}
+
+# время ниже этого порога, мкс, считается шумом и не сравнивается
+_NOISE_US = 2000
+
+
+def _importtime(statement):
+    """[(модуль, собственное время, суммарное время)] в порядке завершения импорта"""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                          env=env, capture_output=True, text=True, check=True)
+    rows = list()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_case(statement, repeat):
+    best = None
+    for _ in range(repeat):
+        rows = _importtime(statement)
+        # модули, загружаемые интерпретатором до выполнения statement, не учитываются
+        own = [r for r in rows if r[0] not in _BASE_MODULES]
+        total = sum(r[1] for r in own)
+        if best is None or total < best[0]:
+            best = total, own
+    total, rows = best
+    return {
+        "total_us": total,
+        "numpy": any(r[0] == "numpy" for r in rows),
+        "modules": len(rows),
+        "top": sorted(((r[0], r[1]) for r in rows), key=lambda r: -r[1]),
+    }
+
+
+def compare(results, baseline, tolerance):
+    failures = list()
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if r["total_us"] > max(base["total_us"], _NOISE_US) * (1 + tolerance):
+            failures.append(f"{name}: {r['total_us'] / 1000:.1f} ms > baseline {base['total_us'] / 1000:.1f} ms")
+        if r["numpy"] and not base["numpy"]:
+            failures.append(f"{name}: numpy is imported")
+    return failures
+
+
+def main():
+    global _BASE_MODULES
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5, help="сколько самых дорогих модулей показать")
+    parser.add_argument("--cases", nargs="*", default=list(CASES), help="подмножество случаев")
+    parser.add_argument("--save", help="сохранить результаты как базовую линию JSON")
+    parser.add_argument("--baseline", help="сравнить с базовой линией JSON")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    args = parser.parse_args()
+
+    _BASE_MODULES = {r[0] for r in _importtime("pass")}
+    results = dict()
+    for name in args.cases:
+        r = run_case(CASES[name], args.repeat)
+        results[name] = r
+        top = ", ".join(f"{m} {us / 1000:.1f}" for m, us in r["top"][:args.top])
+        print(f"{name:16} {r['total_us'] / 1000:8.1f} ms  modules {r['modules']:4}  numpy {'yes' if r['numpy'] else 'no ':3}  {top}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "results": {k: v | {"top": v["top"][:20]} for k, v in results.items()}},
+                      f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        failures = compare(results, baseline, args.tolerance)
+        for line in failures:
+            print("REGRESSION", line)
+        if failures:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+_BASE_MODULES = set()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Стоимость записи одного отсчёта в RingBuffer и прогон с потоком-писателем и отрисовкой.
+
+    python benchmarks/bench_ingest.py [--samples N] [--widgets N] [--seconds S]
+"""
+import argparse
+import os
+import sys
+import threading
+from time import perf_counter, sleep
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtCore import QTimer
+
+from value_widgets import ValueWidget, WidgetGroup
+from value_widgets import IngestEndpoint
+from value_widgets.ingest import RingBuffer
+
+
+def bench_push(n_samples):
+    buffer = RingBuffer(n_samples)
+    t0 = perf_counter()
+    for i in range(n_samples):
+        buffer.push(i & 255, 1.0, 0.0)
+    dt_ts = perf_counter() - t0
+
+    buffer = RingBuffer(n_samples)
+    t0 = perf_counter()
+    for i in range(n_samples):
+        buffer.push(i & 255, 1.0)
+    dt = perf_counter() - t0
+
+    buffer = RingBuffer(n_samples)
+    block = list(range(256))
+    t0 = perf_counter()
+    for _ in range(n_samples // 256):
+        buffer.push_many(block, block)
+    dt_block = perf_counter() - t0
+    return dt_ts / n_samples * 1e9, dt / n_samples * 1e9, dt_block / (n_samples // 256 * 256) * 1e9
+
+
+def bench_threaded(n_widgets, seconds):
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = QWidget()
+    window.resize(1400, 900)
+    group = WidgetGroup()
+    for i in range(n_widgets):
+        w = ValueWidget(window, 10 + (i % 20) * 68, 20 + (i // 20) * 75, 60, 60, max_val=100)
+        group.bind(i, w)
+    window.show()
+
+    endpoint = IngestEndpoint(group, capacity=1 << 16)
+    endpoint.start()
+    buffer = endpoint.producer()
+    stop = threading.Event()
+    cost = [0.0, 0]
+
+    def produce():
+        k = 0
+        while not stop.is_set():
+            t0 = perf_counter()
+            for _ in range(1000):
+                buffer.push(k % n_widgets, (k * 7) % 101)
+                k += 1
+            cost[0] += perf_counter() - t0
+            cost[1] += 1000
+            sleep(0)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    QTimer.singleShot(int(seconds * 1000), app.quit)
+    app.exec()
+    stop.set()
+    thread.join()
+    endpoint.drain()
+    endpoint.stop()
+    return cost[0] / max(cost[1], 1) * 1e9, endpoint.stats(), group.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--widgets", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    with_ts, without_ts, block = bench_push(args.samples)
+    print(f"push, timestamp given:   {with_ts:8.1f} ns/sample")
+    print(f"push, monotonic() stamp: {without_ts:8.1f} ns/sample")
+    print(f"push_many, 256 values:   {block:8.1f} ns/sample")
+
+    per_sample, ingest, group = bench_threaded(args.widgets, args.seconds)
+    print(f"producer thread with GUI draining: {per_sample:8.1f} ns/sample")
+    print("endpoint:", ingest)
+    print("group:", group)
+
+
+if __name__ == "__main__":
+    main()
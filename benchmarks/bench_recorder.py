@@ -0,0 +1,68 @@
+"""Стоимость записи изменений в потоке GUI, переход по времени и воспроизведение с максимальной скоростью.
+
+    python benchmarks/bench_recorder.py [--widgets N] [--frames N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication, QWidget
+
+from value_widgets import ValueWidget, WidgetGroup, Recorder, RecordingReader, Replayer
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--widgets", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = QWidget()
+    group = WidgetGroup()
+    for i in range(args.widgets):
+        group.bind(f"tag{i}", ValueWidget(window, 10, 10, 60, 60, max_val=100), setter=lambda v: None)
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.vwrec")
+    recorder = Recorder(path, group, keyframe_interval=1.0)
+    recorder.start()
+    rng = np.random.default_rng(0)
+    frames = rng.random((args.frames, args.widgets)) * 100
+    t0 = perf_counter()
+    for row in frames:
+        group.update_array(row)
+        group.flush()
+    dt = perf_counter() - t0
+    recorder.close()
+    stats = recorder.stats()
+    print(f"recorder, GUI thread: {stats['cost_per_change_us']:6.2f} us/change "
+          f"({stats['changes']} changes, {stats['bytes'] / stats['changes']:.1f} bytes/change)")
+    print(f"flush with recording:  {dt / args.frames * 1e3:6.3f} ms/frame")
+
+    reader = RecordingReader(path)
+    replayer = Replayer(reader, group)
+    times = rng.uniform(reader.start_time, reader.end_time, 200)
+    t0 = perf_counter()
+    for t in times:
+        replayer.seek(float(t))
+    print(f"seek: {(perf_counter() - t0) / len(times) * 1e3:6.3f} ms ({reader.n_chunks} chunks)")
+
+    replayer.seek(reader.start_time)
+    t0 = perf_counter()
+    n = 0
+    while not replayer.finished:
+        replayer.advance(float("inf"), Replayer.MAX_RECORDS_PER_FRAME)
+        n += 1
+    print(f"replay as fast as possible: {perf_counter() - t0:6.3f} s for {stats['changes']} changes in {n} frames")
+    reader.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Стоимость кадра для каждого класса виджетов под платформой offscreen.
+
+Для каждого случая создаётся N экземпляров, которые питаются синтетическим сигналом
+с частотой --rate Гц. Измеряется:
+    paint_us   - время перерисовки одного виджета (repaint), мкс
+    fps        - перерисовок одного виджета в секунду при питании сигналом
+    cpu_active - доля процессорного времени при питании сигналом
+    cpu_idle   - доля процессорного времени в простое после остановки сигнала
+
+    python benchmarks/bench_render.py                          # только отчёт
+    python benchmarks/bench_render.py --save baseline.json     # сохранить базовую линию
+    python benchmarks/bench_render.py --baseline baseline.json --tolerance 0.25
+
+При сравнении с базовой линией код возврата 1, если хотя бы один класс хуже базовой линии
+больше чем на tolerance (paint_us, cpu_active, cpu_idle - рост, fps - падение).
+"""
+import argparse
+import json
+import os
+import sys
+from math import sin, pi
+from time import perf_counter, process_time, monotonic
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtCore import QObject, QEvent, QEventLoop, QTimer
+
+import value_widgets as vw
+
+
+def _wave(t, phase, freq=0.5):
+    return 0.5 + 0.45 * sin(2 * pi * freq * t + phase)
+
+
+def _value_widget(vertical):
+    def make(parent, x, y):
+        w = vw.ValueWidget(parent, x + 60, y + 20, 60 if vertical else 200, 120 if vertical else 60, label="P", max_val=1)
+        if vertical:
+            w.set_vertical(True)
+            w.draw_ticks(True)
+        return w
+
+    def drive(w, t, phase):
+        w.set_value(_wave(t, phase))
+    return make, drive
+
+
+def _pointer_device(second_needle):
+    def make(parent, x, y):
+        w = vw.PointerDevice(parent, x + 40, y + 40, 120, label="P", units="МПа")
+        w.draw_frame(True)
+        return w
+
+    def drive(w, t, phase):
+        w.set_value(_wave(t, phase))
+        if second_needle:
+            w.set_second_value(_wave(t, phase + 1))
+    return make, drive
+
+
+def _diagram(n_sections):
+    def make(parent, x, y):
+        w = vw.Diagram(parent, x + 50, y + 25, 300, 120)
+        w.set_number_of_sections(n_sections)
+        w.set_number_of_values(2)
+        w.set_max_value(100)
+        return w
+
+    def drive(w, t, phase):
+        section = int(t * 50) % n_sections
+        w.set_section(section, [100 * _wave(t, phase), 100 * _wave(t, phase + 1)])
+    return make, drive
+
+
+def _relay():
+    def make(parent, x, y):
+        return vw.Relay(parent, x, y, "R")
+
+    def drive(w, t, phase):
+        w.set_value(_wave(t, phase, 2) > 0.5)
+    return make, drive
+
+
+def _valve():
+    def make(parent, x, y):
+        return vw.Valve(parent, x, y, label="V")
+
+    def drive(w, t, phase):
+        w.set_state(int(t * 2 + phase) % 4)
+    return make, drive
+
+
+def _kkm():
+    def make(parent, x, y):
+        return vw.KKM(parent, x, y, 0.3)
+
+    def drive(w, t, phase):
+        w.set_position(1 + int(t + phase) % 7)
+    return make, drive
+
+
+def _timer_widget():
+    def make(parent, x, y):
+        return vw.TimerWidget(parent, x, y, 0.2, 0.8, name="T", units="МПа")
+
+    def drive(w, t, phase):
+        w.set_controlled_value(_wave(t, phase))
+    return make, drive
+
+
+def _state_widget():
+    def make(parent, x, y):
+        w = vw.StateWidget(parent, x, y, 100, 30)
+        w.add_state("Норма", 0, "green")
+        w.add_state("Авария", 1, "red")
+        return w
+
+    def drive(w, t, phase):
+        w.set_state(int(_wave(t, phase, 2) > 0.5))
+    return make, drive
+
+
+def _error_widget():
+    def make(parent, x, y):
+        return vw.ErrorWidget(parent, x, y, "Ошибка")
+
+    def drive(w, t, phase):
+        w.set_error(_wave(t, phase, 2) > 0.5)
+    return make, drive
+
+
+CASES = {
+    "ValueWidget/horizontal": _value_widget(False),
+    "ValueWidget/vertical": _value_widget(True),
+    "PointerDevice/one_needle": _pointer_device(False),
+    "PointerDevice/two_needles": _pointer_device(True),
+    "Diagram/4_sections": _diagram(4),
+    "Diagram/16_sections": _diagram(16),
+    "Diagram/64_sections": _diagram(64),
+    "Relay": _relay(),
+    "Valve": _valve(),
+    "KKM": _kkm(),
+    "TimerWidget": _timer_widget(),
+    "StateWidget": _state_widget(),
+    "ErrorWidget": _error_widget(),
+}
+
+# для этих показателей хуже - больше, для fps - меньше
+_LOWER_IS_BETTER = ("paint_us", "cpu_active", "cpu_idle")
+# доля процессора ниже этого порога считается шумом и не сравнивается
+_CPU_NOISE = 0.02
+
+
+class _PaintCounter(QObject):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            self.count += 1
+        return False
+
+
+def _run_loop(app, seconds):
+    end = monotonic() + seconds
+    while monotonic() < end:
+        app.processEvents()
+
+
+def run_case(app, name, n, rate, seconds, idle_seconds, repeat):
+    make, drive = CASES[name]
+    window = QWidget()
+    window.resize(1600, 1200)
+    widgets = [make(window, 10 + (i % 4) * 380, 10 + (i // 4) * 200) for i in range(n)]
+    window.show()
+    _run_loop(app, 0.2)
+
+    # время перерисовки одного виджета: как и timeit, берётся лучший повтор - он меньше всего зависит от посторонней нагрузки
+    samples = list()
+    t = 0.0
+    for k in range(repeat):
+        t += 0.37
+        paint = 0.0
+        for i, w in enumerate(widgets):
+            drive(w, t, i)
+            t0 = perf_counter()
+            w.repaint()
+            paint += perf_counter() - t0
+        samples.append(paint / n)
+    paint_us = min(samples) * 1e6
+
+    counter = _PaintCounter()
+    for w in widgets:
+        w.installEventFilter(counter)
+
+    t_start = monotonic()
+
+    def feed():
+        now = monotonic() - t_start
+        for i, w in enumerate(widgets):
+            drive(w, now, i)
+
+    timer = QTimer()
+    timer.timeout.connect(feed)
+    timer.start(max(1, round(1000 / rate)))
+    cpu0 = process_time()
+    wall0 = monotonic()
+    _run_event_loop(app, seconds)
+    cpu_active = (process_time() - cpu0) / (monotonic() - wall0)
+    timer.stop()
+    fps = counter.count / n / seconds
+
+    _run_loop(app, 0.2)
+    cpu0 = process_time()
+    wall0 = monotonic()
+    _run_event_loop(app, idle_seconds)
+    cpu_idle = (process_time() - cpu0) / (monotonic() - wall0)
+
+    for w in widgets:
+        w.removeEventFilter(counter)
+    window.close()
+    window.deleteLater()
+    _run_loop(app, 0.05)
+    return {"paint_us": paint_us, "fps": fps, "cpu_active": cpu_active, "cpu_idle": cpu_idle}
+
+
+def _run_event_loop(app, seconds):
+    """Обычный цикл событий: в отличие от _run_loop ждёт событий, а не опрашивает их"""
+    # QApplication.quit() в Qt 6 закрывает окна, поэтому отдельный QEventLoop
+    loop = QEventLoop()
+    QTimer.singleShot(round(seconds * 1000), loop.quit)
+    loop.exec()
+
+
+def compare(results, baseline, tolerance):
+    failures = list()
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, value in metrics.items():
+            ref = base.get(key)
+            if ref is None:
+                continue
+            if key in _LOWER_IS_BETTER:
+                if key.startswith("cpu") and value < _CPU_NOISE:
+                    continue
+                if value > max(ref, _CPU_NOISE if key.startswith("cpu") else 0) * (1 + tolerance):
+                    failures.append(f"{name}: {key} {value:.3f} > baseline {ref:.3f}")
+            elif value < ref * (1 - tolerance):
+                failures.append(f"{name}: {key} {value:.3f} < baseline {ref:.3f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--instances", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=100, help="частота синтетического сигнала, Гц")
+    parser.add_argument("--seconds", type=float, default=1.0, help="длительность питания сигналом, с")
+    parser.add_argument("--idle", type=float, default=1.0, help="длительность простоя, с")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов при замере перерисовки")
+    parser.add_argument("--cases", nargs="*", default=list(CASES), help="подмножество случаев")
+    parser.add_argument("--save", help="сохранить результаты как базовую линию JSON")
+    parser.add_argument("--baseline", help="сравнить с базовой линией JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    results = dict()
+    print(f"{'case':28} {'paint, us':>10} {'fps':>8} {'cpu active':>11} {'cpu idle':>9}")
+    for name in args.cases:
+        r = run_case(app, name, args.instances, args.rate, args.seconds, args.idle, args.repeat)
+        results[name] = r
+        print(f"{name:28} {r['paint_us']:10.1f} {r['fps']:8.1f} {r['cpu_active']:11.3f} {r['cpu_idle']:9.3f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args) | {"save": None, "baseline": None}, "results": results}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        failures = compare(results, baseline, args.tolerance)
+        for line in failures:
+            print("REGRESSION", line)
+        if failures:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Добавление отсчётов и отрисовка StripChart с длинной историей.
+
+    python benchmarks/bench_strip_chart.py [--history N] [--width PX] [--series N]
+"""
+import argparse
+import os
+import sys
+from time import perf_counter
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtGui import QImage
+
+from value_widgets import StripChart
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=10_000_000)
+    parser.add_argument("--width", type=int, default=1000)
+    parser.add_argument("--series", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = QWidget()
+    window.resize(args.width + 120, 500)
+    chart = StripChart(window, 60, 40, args.width, 400, capacity=args.history)
+    chart.set_min_value(-5)
+    chart.set_max_value(5)
+    chart.set_span(args.history)
+
+    rng = np.random.default_rng(0)
+    data = rng.standard_normal(args.history)
+    t0 = perf_counter()
+    for i in range(args.series):
+        chart.append(chart.add_series(f"ch{i}"), data)
+    dt = perf_counter() - t0
+    print(f"bulk append:   {dt / (args.history * args.series) * 1e9:8.1f} ns/sample")
+
+    n = 20000
+    t0 = perf_counter()
+    for _ in range(n):
+        chart.append(0, 0.5)
+    print(f"single append: {(perf_counter() - t0) / n * 1e6:8.2f} us/sample")
+
+    window.show()
+    app.processEvents()
+    image = QImage(window.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    window.render(image)
+    t0 = perf_counter()
+    for _ in range(args.repeat):
+        window.render(image)
+    print(f"render {args.history} points x {args.series}: {(perf_counter() - t0) / args.repeat * 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Потоковая отрисовка (RenderPool) против прямой отрисовки в paintEvent, под платформой offscreen.
+
+Для каждого класса с режимом set_threaded_rendering создаётся N экземпляров, которые питаются
+синтетическим сигналом с частотой --rate Гц (случаи из bench_render.py), сначала в прямом режиме,
+затем в потоковом. Измеряется:
+    gui_cpu   - доля процессорного времени потока GUI
+    cpu       - доля процессорного времени процесса (с потоками отрисовки)
+    stall_ms  - 99-й процентиль опоздания таймера-пробника с периодом 5 мс: сколько поток GUI
+                не обрабатывает события (мышь, другие виджеты)
+    fps       - новых изображений одного виджета в секунду
+
+    python benchmarks/bench_threaded_render.py                            # только отчёт
+    python benchmarks/bench_threaded_render.py --save threaded.json       # сохранить базовую линию
+    python benchmarks/bench_threaded_render.py --baseline threaded.json --tolerance 0.25
+
+При сравнении с базовой линией код возврата 1, если хотя бы один случай хуже базовой линии
+больше чем на tolerance (gui_cpu, cpu, stall_ms - рост, fps - падение).
+"""
+import argparse
+import json
+import os
+import sys
+from math import sin, pi
+from time import process_time, thread_time, monotonic
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtCore import QObject, QEvent, QTimer, Qt
+import numpy as np
+
+import value_widgets as vw
+from value_widgets.render_pool import RenderPool
+from bench_render import CASES as RENDER_CASES, _run_event_loop, _run_loop
+
+
+def _strip_chart(n_series):
+    def make(parent, x, y):
+        w = vw.StripChart(parent, x + 50, y + 25, 300, 120, capacity=1 << 16)
+        for i in range(n_series):
+            w.add_series(f"s{i}")
+        w.set_span(1 << 14)
+        return w
+
+    def drive(w, t, phase):
+        for i in range(n_series):
+            w.append(i, 0.5 + 0.45 * sin(2 * pi * 0.5 * t + phase + i) + np.random.uniform(-0.05, 0.05, 64))
+    return make, drive
+
+
+CASES = {
+    "PointerDevice/one_needle": RENDER_CASES["PointerDevice/one_needle"],
+    "PointerDevice/two_needles": RENDER_CASES["PointerDevice/two_needles"],
+    "Diagram/16_sections": RENDER_CASES["Diagram/16_sections"],
+    "Diagram/64_sections": RENDER_CASES["Diagram/64_sections"],
+    "StripChart/4_series": _strip_chart(4),
+}
+
+_LOWER_IS_BETTER = ("gui_cpu", "cpu", "stall_ms")
+# доля процессора и опоздание ниже этих порогов считаются шумом и не сравниваются
+_CPU_NOISE = 0.02
+_STALL_NOISE_MS = 2.0
+
+_PROBE_PERIOD = 5
+
+
+class _Probe(QObject):
+    """Таймер-пробник: опоздания срабатываний относительно периода"""
+
+    def __init__(self):
+        super().__init__()
+        self.delays = list()
+        self.__last = None
+        self.__tmr = QTimer(self)
+        self.__tmr.setTimerType(Qt.TimerType.PreciseTimer)
+        self.__tmr.timeout.connect(self.__tick)
+
+    def start(self):
+        self.__last = monotonic()
+        self.__tmr.start(_PROBE_PERIOD)
+
+    def stop(self):
+        self.__tmr.stop()
+
+    def __tick(self):
+        now = monotonic()
+        self.delays.append(max(0.0, now - self.__last - _PROBE_PERIOD / 1000))
+        self.__last = now
+
+
+class _PaintCounter(QObject):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            self.count += 1
+        return False
+
+
+def run_case(app, name, threaded, n, rate, seconds):
+    make, drive = CASES[name]
+    window = QWidget()
+    window.resize(1600, 1200)
+    widgets = [make(window, 10 + (i % 4) * 380, 10 + (i // 4) * 200) for i in range(n)]
+    for w in widgets:
+        w.set_threaded_rendering(threaded)
+    window.show()
+    _run_loop(app, 0.2)
+
+    pool = RenderPool.instance()
+    completed0 = pool.stats()["completed"]
+    counter = _PaintCounter()
+    for w in widgets:
+        w.installEventFilter(counter)
+
+    t_start = monotonic()
+
+    def feed():
+        now = monotonic() - t_start
+        for i, w in enumerate(widgets):
+            drive(w, now, i)
+
+    timer = QTimer()
+    timer.timeout.connect(feed)
+    timer.start(max(1, round(1000 / rate)))
+    probe = _Probe()
+    probe.start()
+
+    cpu0 = process_time()
+    gui0 = thread_time()
+    wall0 = monotonic()
+    _run_event_loop(app, seconds)
+    wall = monotonic() - wall0
+    gui_cpu = (thread_time() - gui0) / wall
+    cpu = (process_time() - cpu0) / wall
+    timer.stop()
+    probe.stop()
+
+    # в потоковом режиме перерисовка без нового кадра только выводит прежний
+    frames = pool.stats()["completed"] - completed0 if threaded else counter.count
+    for w in widgets:
+        w.removeEventFilter(counter)
+    window.close()
+    window.deleteLater()
+    _run_loop(app, 0.2)
+    return {"gui_cpu": gui_cpu, "cpu": cpu, "stall_ms": float(np.percentile(probe.delays, 99)) * 1000,
+            "fps": frames / n / seconds}
+
+
+def compare(results, baseline, tolerance):
+    failures = list()
+    for name, metrics in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for key, value in metrics.items():
+            ref = base.get(key)
+            if ref is None:
+                continue
+            if key in _LOWER_IS_BETTER:
+                noise = _STALL_NOISE_MS if key == "stall_ms" else _CPU_NOISE
+                if value < noise:
+                    continue
+                if value > max(ref, noise) * (1 + tolerance):
+                    failures.append(f"{name}: {key} {value:.3f} > baseline {ref:.3f}")
+            elif value < ref * (1 - tolerance):
+                failures.append(f"{name}: {key} {value:.3f} < baseline {ref:.3f}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--instances", type=int, default=12)
+    parser.add_argument("--rate", type=float, default=100, help="частота синтетического сигнала, Гц")
+    parser.add_argument("--seconds", type=float, default=2.0, help="длительность питания сигналом, с")
+    parser.add_argument("--cases", nargs="*", default=list(CASES), help="подмножество случаев")
+    parser.add_argument("--save", help="сохранить результаты как базовую линию JSON")
+    parser.add_argument("--baseline", help="сравнить с базовой линией JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"render threads: {RenderPool.instance().n_threads}")
+
+    results = dict()
+    print(f"{'case':28} {'mode':9} {'gui cpu':>8} {'cpu':>6} {'stall, ms':>10} {'fps':>7}")
+    for name in args.cases:
+        for threaded in (False, True):
+            mode = "threaded" if threaded else "direct"
+            r = run_case(app, name, threaded, args.instances, args.rate, args.seconds)
+            results[f"{name}/{mode}"] = r
+            print(f"{name:28} {mode:9} {r['gui_cpu']:8.3f} {r['cpu']:6.3f} {r['stall_ms']:10.2f} {r['fps']:7.1f}")
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args) | {"save": None, "baseline": None}, "results": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        failures = compare(results, baseline, args.tolerance)
+        for line in failures:
+            print("REGRESSION", line)
+        if failures:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Опрос N таймеров через process() против TimerWheel: доля процессора и число пробуждений.
+
+    python benchmarks/bench_timer_wheel.py [--timers N] [--seconds S] [--coalesce MS]
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter, process_time, monotonic
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from PyQt6.QtCore import QCoreApplication, QEventLoop, QTimer
+
+from value_widgets.timer import Timer, TimerWheel
+
+
+PERIODS = (100, 250, 500, 1000, 2000, 5000)
+
+
+def _run_event_loop(seconds):
+    loop = QEventLoop()
+    QTimer.singleShot(round(seconds * 1000), loop.quit)
+    loop.exec()
+
+
+def bench_polling(n, seconds):
+    """Прежний способ: каждые 5 мс опрашиваются все таймеры"""
+    fired = [0]
+
+    def cb():
+        fired[0] += 1
+
+    timers = [Timer(random.choice(PERIODS)) for _ in range(n)]
+    for t in timers:
+        t.callback = cb
+    poll = QTimer()
+    poll.timeout.connect(lambda: [t.process() for t in timers])
+    poll.start(5)
+    cpu0, wall0 = process_time(), monotonic()
+    _run_event_loop(seconds)
+    poll.stop()
+    return (process_time() - cpu0) / (monotonic() - wall0), fired[0]
+
+
+def bench_wheel(n, seconds, coalesce):
+    fired = [0]
+
+    def cb():
+        fired[0] += 1
+
+    wheel = TimerWheel(coalesce=coalesce)
+    t0 = perf_counter()
+    timers = [Timer(random.choice(PERIODS), cb, wheel=wheel) for _ in range(n)]
+    insert_us = (perf_counter() - t0) / n * 1e6
+    t0 = perf_counter()
+    for t in timers:
+        t.stop()
+    cancel_us = (perf_counter() - t0) / n * 1e6
+    for t in timers:
+        t.restart()
+
+    cpu0, wall0 = process_time(), monotonic()
+    _run_event_loop(seconds)
+    cpu = (process_time() - cpu0) / (monotonic() - wall0)
+    for t in timers:
+        t.stop()
+    return cpu, fired[0], wheel.stats()["wakeups"], insert_us, cancel_us
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--timers", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--coalesce", type=int, default=10, help="шаг округления сроков, мс")
+    args = parser.parse_args()
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    cpu, fired = bench_polling(args.timers, args.seconds)
+    print(f"polling:          cpu {cpu:.3f}, fired {fired}")
+    cpu, fired, wakeups, insert_us, cancel_us = bench_wheel(args.timers, args.seconds, 0)
+    print(f"wheel:            cpu {cpu:.3f}, fired {fired}, wakeups {wakeups}, "
+          f"insert {insert_us:.2f} us, cancel {cancel_us:.2f} us")
+    cpu, fired, wakeups, _, _ = bench_wheel(args.timers, args.seconds, args.coalesce)
+    print(f"wheel, coalesce {args.coalesce} ms: cpu {cpu:.3f}, fired {fired}, wakeups {wakeups}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,71 @@
-from .kkm_widget import KKM
-from .state_widget import StateWidget
-from .diagram import Diagram
-from .relay import Relay
-from .valve import Valve
-from .value_widget import ValueWidget
-from .error_widget import ErrorWidget
-from .pointer_device import PointerDevice
-from .timer_widget import TimerWidget
+# модули виджетов загружаются при первом обращении к имени: import value_widgets не тянет PyQt6 и numpy
+_LAZY = {
+    "KKM": ".kkm_widget",
+    "StateWidget": ".state_widget",
+    "Diagram": ".diagram",
+    "Relay": ".relay",
+    "Valve": ".valve",
+    "ValueWidget": ".value_widget",
+    "ErrorWidget": ".error_widget",
+    "PointerDevice": ".pointer_device",
+    "TimerWidget": ".timer_widget",
+    "StripChart": ".strip_chart",
+    "WidgetGroup": ".widget_group",
+    "IngestEndpoint": ".ingest",
+    "SharedValueTable": ".shared_table",
+    "SharedTableReader": ".shared_table",
+    "Recorder": ".recorder",
+    "RecordingReader": ".recorder",
+    "Replayer": ".recorder",
+    "Panel": ".panel",
+    "PlantScene": ".canvas",
+    "PlantView": ".canvas",
+    "ValueItem": ".canvas",
+    "PointerItem": ".canvas",
+    "RelayItem": ".canvas",
+    "ValveItem": ".canvas",
+    "StateItem": ".canvas",
+}
+
+__all__ = list(_LAZY)
+
+# без import typing: он один дороже остального импорта пакета; анализаторы типов понимают такую константу
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from .kkm_widget import KKM
+    from .state_widget import StateWidget
+    from .diagram import Diagram
+    from .relay import Relay
+    from .valve import Valve
+    from .value_widget import ValueWidget
+    from .error_widget import ErrorWidget
+    from .pointer_device import PointerDevice
+    from .timer_widget import TimerWidget
+    from .strip_chart import StripChart
+    from .widget_group import WidgetGroup
+    from .ingest import IngestEndpoint
+    from .shared_table import SharedValueTable, SharedTableReader
+    from .recorder import Recorder, RecordingReader, Replayer
+    from .panel import Panel
+    from .canvas import PlantScene, PlantView, ValueItem, PointerItem, RelayItem, ValveItem, StateItem
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module(module, __name__), name)
+    # следующие обращения идут мимо __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
 
 
 def _get_hook_dirs():
     """Возвращает пути к директориям с хуками PyInstaller"""
     import os
     return [os.path.join(os.path.dirname(__file__), 'hooks')]
-
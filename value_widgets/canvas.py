@@ -0,0 +1,728 @@
+"""Лёгкие элементы мнемосхемы на QGraphicsScene для очень больших схем с масштабированием.
+
+Элементы повторяют внешний вид и методы установки значения виджетов ValueWidget, PointerDevice,
+Relay, Valve и StateWidget, но не являются QWidget: это QGraphicsItem без собственного окна,
+событий и таймеров. Сцена хранит элементы в BSP-дереве, поэтому при отрисовке и при
+проверке попадания курсора перебираются только элементы в видимой области.
+
+Детализация зависит от масштаба (QStyleOptionGraphicsItem.levelOfDetailFromTransform):
+    >= LOD_DETAIL       - полное изображение с подписями и шкалами;
+    >= LOD_GLYPH        - только фигуры и заливки, без текста и делений;
+    меньше LOD_GLYPH    - плоский прямоугольник цвета состояния; в таком масштабе PlantView
+                          не вызывает paint() элементов, а рисует значки сцены по цветам.
+
+Элементы без окна могут привязываться к WidgetGroup, как и виджеты; привязка снимается unbind.
+
+    scene = PlantScene()
+    scene.addItem(ValueItem(10, 10, label="P1", max_val=1.6))
+    view = PlantView(scene)
+"""
+from math import sin, cos, radians
+
+import numpy as np
+from PyQt6.QtGui import QPainter, QColor, QBrush, QPolygonF
+from PyQt6.QtCore import Qt, QRectF, QPointF, QLineF
+from PyQt6.QtWidgets import QGraphicsItem, QGraphicsScene, QGraphicsView, QStyleOptionGraphicsItem
+
+from .theme import ThemeService
+from .palette import Palette
+from .utils import choose_contrast_color, background_color
+from . import text_cache
+
+
+# пороги детализации: отношение размера на экране к размеру в сцене
+LOD_DETAIL = 0.75
+LOD_GLYPH = 0.3
+
+# пределы масштаба PlantView и шаг колеса мыши (множитель на 1/8 градуса поворота)
+MIN_ZOOM = 0.01
+MAX_ZOOM = 8.0
+WHEEL_ZOOM_STEP = 1.0015
+
+
+class CanvasItem(QGraphicsItem):
+    """Базовый элемент: прямоугольник w x h в точке (x, y) сцены.
+    Наследники рисуют себя в draw() и сообщают цвет значка для мелкого масштаба в glyph_color()"""
+
+    def __init__(self, x, y, w, h):
+        super().__init__()
+        self.setPos(x, y)
+        self.__rect = QRectF(0, 0, w, h)
+        # сглаженные линии по краю выходят за прямоугольник на полпикселя
+        self.__bounds = self.__rect.adjusted(-1, -1, 1, 1)
+        # сцена, в массивах которой есть значок элемента (ставит и снимает PlantScene)
+        self._glyph_scene = None
+
+    def itemChange(self, change, value):
+        # сцена меняется не только в addItem/removeItem: вместе с родителем, через setParentItem,
+        # при переносе в другую сцену
+        if change == QGraphicsItem.GraphicsItemChange.ItemSceneHasChanged:
+            if self._glyph_scene is not None and self._glyph_scene is not value:
+                self._glyph_scene.remove_glyph(self)
+            if isinstance(value, PlantScene):
+                value.update_glyph(self, geometry=True)
+        return super().itemChange(change, value)
+
+    def __dtor__(self):
+        # вызывается sip при удалении C++ объекта: удаление элемента, его родителя или scene.clear()
+        # не сообщают о смене сцены, поэтому значок снимается здесь
+        scene = self._glyph_scene
+        if scene is not None:
+            scene.remove_glyph(self)
+
+    def boundingRect(self):
+        return self.__bounds
+
+    def rect(self) -> QRectF:
+        return self.__rect
+
+    def palette(self) -> Palette:
+        scene = self.scene()
+        return scene.item_palette if isinstance(scene, PlantScene) else Palette.get(False)
+
+    def paint(self, painter, option, widget=None):
+        lod = QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+        palette = self.palette()
+        if lod < LOD_GLYPH:
+            painter.fillRect(self.__rect, self.glyph_color(palette))
+            return
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, lod >= LOD_DETAIL)
+        self.draw(painter, palette, lod >= LOD_DETAIL)
+
+    def draw(self, painter, palette, detail: bool):
+        pass
+
+    def glyph_color(self, palette) -> QColor:
+        return palette.inactive
+
+    def changed(self):
+        """Перерисовка элемента и обновление цвета его значка на сцене"""
+        self.update()
+        scene = self.scene()
+        if isinstance(scene, PlantScene):
+            scene.glyph_changed(self)
+
+
+class ControllableItem(CanvasItem):
+    """Аналог ControllableWidget: подсветка под курсором, нажатие и переключаемое состояние управления"""
+
+    def __init__(self, x, y, w, h, active=True, on_release=True):
+        super().__init__(x, y, w, h)
+        self.__active = active
+        self.__on_release = on_release
+        self.__under_mouse = False
+        self.__mouse_pressed = False
+        self.__control_state = False
+        self.setAcceptHoverEvents(active)
+        self.setAcceptedMouseButtons(Qt.MouseButton.LeftButton if active else Qt.MouseButton.NoButton)
+
+    @property
+    def controllable(self):
+        return self.__active
+
+    @property
+    def mouse_pressed(self):
+        return self.__active and self.__mouse_pressed
+
+    def underMouse(self):
+        return self.__active and self.__under_mouse
+
+    def get_control_state(self):
+        return self.__active and self.__control_state
+
+    def set_control_state(self, state: bool):
+        self.__control_state = state
+        self.update()
+
+    def hoverEnterEvent(self, event):
+        if not self.hasCursor():
+            # курсор задаётся при первом наведении: setCursor в конструкторе дорог для тысяч элементов
+            self.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.__under_mouse = True
+        self.update()
+
+    def hoverLeaveEvent(self, event):
+        self.__under_mouse = False
+        self.update()
+
+    def mousePressEvent(self, event):
+        # событие принято: элемент получит отпускание кнопки, а PlantView не начнёт перетаскивание
+        self.__mouse_pressed = True
+        if not self.__on_release:
+            self.__control_state = not self.__control_state
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        self.__mouse_pressed = False
+        if self.__on_release and self.contains(event.pos()):
+            self.__control_state = not self.__control_state
+        self.update()
+
+    def draw_control_state(self, painter, palette, x, y):
+        control_state = int(self.get_control_state())
+        painter.setPen(palette.control_pens[control_state])
+        painter.setBrush(palette.control_brushes[control_state])
+        painter.drawRoundedRect(QRectF(x, y, 10, 10), 2, 2)
+
+
+class ValueItem(CanvasItem):
+    """Горизонтальный ValueWidget: столбец значения, текст значения и подпись"""
+
+    def __init__(self, x, y, w=260, h=60, label="", min_val=0, max_val=1, units="МПа", draw_ref_value=False,
+                 color=None):
+        super().__init__(x, y, w, h)
+        self.__w = w
+        self.__h = h
+        self.__label = label
+        self.__min_value = min_val
+        self.__max_value = max_val
+        self.__units = units
+        self.__value = 0
+        self.__ref_value = 0
+        self.__draw_ref_value = draw_ref_value
+        self.__draw_ticks = False
+        self.__brush = QBrush(QColor(color)) if color else None
+        self.__value_format = "{}"
+        self.__update_format()
+
+    def __update_format(self):
+        if self.__max_value <= 1:
+            self.__value_format = "{:.3f}"
+        elif self.__max_value <= 100:
+            self.__value_format = "{:.2f}"
+        elif self.__max_value <= 1000:
+            self.__value_format = "{:.1f}"
+        else:
+            self.__value_format = "{}"
+
+    def set_value(self, val: float):
+        if val != self.__value:
+            self.__value = val
+            self.changed()
+
+    def set_reference_value(self, val: float):
+        if val != self.__ref_value:
+            self.__ref_value = val
+            self.update()
+
+    def set_min_value(self, val):
+        self.__min_value = val
+        self.changed()
+
+    def set_max_value(self, val):
+        self.__max_value = val
+        self.__update_format()
+        self.changed()
+
+    def set_units(self, units: str):
+        self.__units = units
+        self.update()
+
+    def set_color(self, clr):
+        self.__brush = QBrush(QColor(clr))
+        self.changed()
+
+    def draw_ticks(self, draw: bool):
+        self.__draw_ticks = draw
+        self.update()
+
+    def __is_error_value(self, value):
+        return self.__min_value > value or value > self.__max_value
+
+    def glyph_color(self, palette):
+        if self.__is_error_value(self.__value):
+            return palette.fault
+        return self.__brush.color() if self.__brush is not None else palette.value_bar
+
+    def draw(self, painter, palette, detail):
+        w = self.__w
+        h = self.__h - 22
+        real_width = self.__max_value - self.__min_value
+        painter.setPen(palette.transparent_pen)
+        painter.setBrush(palette.panel_brush)
+        painter.drawRect(QRectF(0, 0, w, h))
+
+        error = self.__is_error_value(self.__value)
+        if not error:
+            x0_val = abs(self.__min_value) / real_width * w
+            painter.setBrush(self.__brush if self.__brush is not None else palette.value_bar)
+            painter.drawRect(QRectF(x0_val, 0, self.__value / real_width * w, h))
+            if detail and x0_val != 0:
+                painter.setPen(palette.value_zero_pen)
+                painter.drawLine(QLineF(x0_val, 5, x0_val, h - 5))
+            if self.__draw_ref_value and self.__min_value <= self.__ref_value <= self.__max_value:
+                x = x0_val + self.__ref_value / real_width * w
+                painter.setPen(palette.value_ref_pen)
+                painter.drawLine(QLineF(x, 2, x, h - 2))
+
+        if not detail:
+            return
+        if self.__draw_ticks:
+            painter.setPen(palette.text_pen)
+            step = (w - 50) / 8
+            for i in range(9):
+                painter.drawLine(QLineF(i * step, 0, i * step, 5 if i % 2 == 0 else 3))
+
+        if error:
+            painter.setPen(palette.error_pen)
+            painter.setFont(text_cache.font('bahnschrift', 14))
+            painter.drawText(QRectF(0, 0, w, h), Qt.AlignmentFlag.AlignCenter, "Ошибка")
+        else:
+            text = self.__value_format.format(self.__value) + f" [{self.__units}]"
+            if self.__min_value < 0 <= self.__value:
+                text = " " + text
+            painter.setPen(palette.text_pen)
+            painter.setFont(text_cache.font('cascadia code', 13))
+            painter.drawText(QRectF(0, 0, w, h), Qt.AlignmentFlag.AlignCenter, text)
+        painter.setPen(palette.text_pen)
+        painter.setFont(text_cache.font('bahnschrift', 10))
+        painter.drawText(QRectF(0, h, w, 22), Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+                         self.__label)
+
+    @property
+    def value(self):
+        return self.__value
+
+
+class PointerItem(CanvasItem):
+    """PointerDevice: шкала 270 градусов со стрелкой; d - диаметр"""
+
+    def __init__(self, x, y, d, min_value=0.0, max_value=1.0, label="", units=""):
+        super().__init__(x, y, d, d)
+        self.__d = d
+        self.__r = d / 2
+        self.__min_val = min_value
+        self.__max_val = max_value
+        self.__label = label
+        self.__units = units
+        self.__value = 0.0
+        self.__second_value = None
+        self.__n_digits = 3
+        self.__major_step = (max_value - min_value) / 10
+        self.__minor_step = (max_value - min_value) / 50
+        self.__ticks = None
+
+    def set_value(self, val: float):
+        if val != self.__value:
+            self.__value = val
+            self.changed()
+
+    def set_second_value(self, val: float):
+        if val != self.__second_value:
+            self.__second_value = val
+            self.update()
+
+    def set_major_step(self, step: float):
+        self.__major_step = step
+        self.__ticks = None
+        self.update()
+
+    def set_minor_step(self, step: float):
+        self.__minor_step = step
+        self.__ticks = None
+        self.update()
+
+    def set_n_digits(self, n):
+        self.__n_digits = n
+        self.update()
+
+    def __angle(self, val):
+        """Угол стрелки от вертикали вниз, радианы"""
+        val = min(self.__max_val, max(val, self.__min_val))
+        return radians(45 + (val - self.__min_val) / (self.__max_val - self.__min_val) * 270)
+
+    def __point(self, angle, radius):
+        return QPointF(self.__r - radius * sin(angle), self.__r + radius * cos(angle))
+
+    def __tick_lines(self):
+        # деления строятся один раз: major - длинные, minor - короткие
+        if self.__ticks is None:
+            major = list()
+            minor = list()
+            for step, lines, length in ((self.__major_step, major, self.__d / 12),
+                                        (self.__minor_step, minor, self.__d / 25)):
+                if step <= 0:
+                    continue
+                n = round((self.__max_val - self.__min_val) / step)
+                for i in range(n + 1):
+                    angle = self.__angle(self.__min_val + i * step)
+                    lines.append(QLineF(self.__point(angle, self.__r - 2), self.__point(angle, self.__r - 2 - length)))
+            self.__ticks = major, minor
+        return self.__ticks
+
+    def __is_error_value(self):
+        return self.__value > self.__max_val or self.__value < self.__min_val
+
+    def glyph_color(self, palette):
+        return palette.fault if self.__is_error_value() else palette.inactive
+
+    def draw(self, painter, palette, detail):
+        painter.setPen(palette.scale_pen)
+        painter.setBrush(palette.panel_brush)
+        painter.drawEllipse(QRectF(1, 1, self.__d - 2, self.__d - 2))
+
+        if detail:
+            major, minor = self.__tick_lines()
+            painter.drawLines(major)
+            painter.setPen(palette.inactive_pen)
+            painter.drawLines(minor)
+
+            painter.setPen(palette.text_pen)
+            painter.setFont(text_cache.font('bahnschrift', 9))
+            painter.drawText(QRectF(0, self.__r * 0.35, self.__d, self.__r * 0.3), Qt.AlignmentFlag.AlignCenter,
+                             f"{self.__label}, {self.__units}" if self.__units else self.__label)
+            if self.__is_error_value():
+                painter.setPen(palette.error_pen)
+                text = "Ошибка"
+            else:
+                text = f"{{:.{self.__n_digits}f}}".format(self.__value)
+            painter.drawText(QRectF(0, self.__r * 1.4, self.__d, self.__r * 0.3), Qt.AlignmentFlag.AlignCenter, text)
+
+        width = max(self.__d / 110, 1)
+        center = QPointF(self.__r, self.__r)
+        if self.__second_value is not None:
+            painter.setPen(palette.second_needle)
+            painter.drawLine(QLineF(center, self.__point(self.__angle(self.__second_value), self.__r - self.__d / 27)))
+        pen = painter.pen()
+        pen.setColor(palette.needle)
+        pen.setWidthF(width)
+        painter.setPen(pen)
+        painter.drawLine(QLineF(center, self.__point(self.__angle(self.__value), self.__r - self.__d / 27)))
+
+    @property
+    def value(self):
+        return self.__value
+
+
+class RelayItem(ControllableItem):
+    """Relay: состояние 0 - разомкнуто, 1 - замкнуто, иначе - авария"""
+
+    def __init__(self, x, y, label="", w=100, h=70, controllable=False):
+        super().__init__(x, y, w, h, active=controllable)
+        self.__w = w
+        self.__h = h
+        self.__label = label
+        self.__value = False
+
+    def set_value(self, value: bool):
+        if self.__value != value:
+            self.__value = value
+            self.changed()
+
+    def __state(self):
+        return self.__value if self.__value in (0, 1) else 2
+
+    def glyph_color(self, palette):
+        return palette.relay_pens[self.__state()].color() if palette.dark else \
+            palette.relay_brushes[self.__state()][True, False].color()
+
+    def draw(self, painter, palette, detail):
+        w = self.__w
+        h = self.__h
+        state = self.__state()
+        painter.setPen(palette.relay_pens[state])
+        painter.setBrush(palette.relay_brushes[state][self.underMouse(), self.mouse_pressed])
+        painter.drawRoundedRect(QRectF(0, 0, w, h), 5, 5)
+
+        painter.setPen(palette.black_pen_2)
+        painter.drawLine(QLineF(2, h / 2, w / 3, h / 2))
+        if self.__value < 2:
+            painter.drawLine(QLineF(w / 3, h / 2, 2 * w / 3 + 2, h / 2 - 20))
+        painter.drawLine(QLineF(2 * w / 3, h / 2, w - 2, h / 2))
+        if self.__value == 1:
+            painter.drawLine(QLineF(2 * w / 3, h / 2, 2 * w / 3, h / 2 - 25))
+
+        if detail:
+            painter.setFont(text_cache.font("bahnschrift", 9))
+            painter.setPen(palette.text_pen)
+            painter.drawText(QRectF(0, h - 25, w, 20), Qt.AlignmentFlag.AlignCenter, self.__label)
+        if self.controllable:
+            self.draw_control_state(painter, palette, 5, 5)
+
+    @property
+    def value(self):
+        return self.__value
+
+
+class ValveItem(ControllableItem):
+    """Valve: состояние 0 - закрыт, 1 - открывается, 2 - открыт, 3 - авария"""
+
+    def __init__(self, x, y, size_x=120, size_y=80, label="", controllable=False):
+        super().__init__(x, y, size_x, size_y, active=controllable, on_release=False)
+        self.__w = size_x
+        self.__h = size_y
+        self.__label = label
+        self.__state = 0
+
+        offset_x = size_x / 6
+        offset_y = size_y / 5
+        points = [QPointF(offset_x, offset_y), QPointF(offset_x, size_y / 2 + offset_y),
+                  QPointF(size_x / 3 + offset_x, size_y / 4 + offset_y),
+                  QPointF(size_x * 2 / 3 + offset_x, offset_y), QPointF(size_x * 2 / 3 + offset_x, size_y / 2 + offset_y)]
+        self.__polygons = (QPolygonF(points[:3]), QPolygonF(points[2:]))
+        y = size_y / 4 + offset_y
+        x3 = points[3].x()
+        self.__lines = [QLineF(2, y, offset_x, y), QLineF(x3, y, x3 + offset_x - 2, y)]
+        ya = offset_y / 2
+        self.__arrow = [QLineF(offset_x + size_x / 6, ya + 5, x3 - size_x / 6, ya + 5),
+                        QLineF(x3 - size_x / 6, ya + 5, x3 - size_x / 4, ya),
+                        QLineF(x3 - size_x / 6, ya + 5, x3 - size_x / 4, ya + 10)]
+
+    def set_state(self, state):
+        if 0 <= state <= 3 and self.__state != state:
+            self.__state = state
+            self.changed()
+
+    def glyph_color(self, palette):
+        if self.__state == 0:
+            return palette.inactive
+        return palette.valve_brushes[self.__state][True, False].color()
+
+    def draw(self, painter, palette, detail):
+        state = int(self.__state)
+        if state == 2 and detail:
+            painter.setPen(palette.valve_arrow_pen)
+            painter.drawLines(self.__arrow)
+
+        painter.setPen(palette.valve_pens[state])
+        painter.setBrush(palette.valve_brushes[state][self.underMouse(), self.mouse_pressed])
+        painter.drawPolygon(self.__polygons[0])
+        painter.drawPolygon(self.__polygons[1])
+        painter.drawLines(self.__lines)
+
+        if detail:
+            painter.setFont(text_cache.font("bahnschrift", 9))
+            painter.setPen(palette.text_pen)
+            painter.drawText(QRectF(0, self.__h - 25, self.__w, 35), Qt.AlignmentFlag.AlignCenter, self.__label)
+        if self.controllable:
+            self.draw_control_state(painter, palette, 2, 2)
+
+    @property
+    def state(self):
+        return self.__state
+
+
+class StateItem(CanvasItem):
+    """StateWidget: прямоугольник цвета состояния с названием состояния"""
+
+    def __init__(self, x, y, w, h):
+        super().__init__(x, y, w, h)
+        self.__state = None
+        self.__states = dict()
+
+    def add_state(self, name: str, value: int, color):
+        color = QColor(color)
+        self.__states[value] = name, color, choose_contrast_color(color)
+        if self.__state is None:
+            self.set_state(value)
+
+    def set_state(self, state: int):
+        if self.__state != state:
+            # неизвестное состояние - ошибка вызывающего, а не отрисовки значка
+            self.__states[state]
+            self.__state = state
+            self.changed()
+
+    def glyph_color(self, palette):
+        if self.__state is None:
+            return palette.inactive
+        return self.__states[self.__state][1]
+
+    def draw(self, painter, palette, detail):
+        if self.__state is None:
+            return
+        name, color, text_color = self.__states[self.__state]
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        painter.drawRoundedRect(self.rect(), 5, 5)
+        if detail:
+            painter.setPen(text_color)
+            painter.setFont(text_cache.font("Bahnschrift, Arial", 12))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, name)
+
+    @property
+    def state(self):
+        return self.__state
+
+
+class PlantScene(QGraphicsScene):
+    """Сцена мнемосхемы: общая палитра элементов и значки для обзорного масштаба.
+    Элементы статичны, поэтому индекс - BSP-дерево: выбор видимых элементов и элемента
+    под курсором не зависит от общего их числа.
+
+    Значки хранятся в массивах (прямоугольник в координатах сцены и номер цвета), а QRectF
+    каждого значка создаётся один раз: в обзорном масштабе PlantView рисует видимые значки
+    одним вызовом drawRects на цвет вместо вызова paint() у тысяч элементов.
+    Значок заводит и снимает сам элемент при смене сцены (CanvasItem.itemChange) и при удалении;
+    если элемент сцены перемещён или скрыт, нужно вызвать update_glyph(item, geometry=True)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setItemIndexMethod(QGraphicsScene.ItemIndexMethod.BspTreeIndex)
+        self.__palette = Palette.get(False)
+
+        self.__glyph_index = dict()
+        self.__n_glyphs = 0
+        self.__bounds = np.zeros((0, 4))
+        self.__color_index = np.zeros(0, dtype=np.int32)
+        self.__rects = np.zeros(0, dtype=object)
+        # таблица цветов значков: rgba -> номер, и кисти по номеру
+        self.__colors = dict()
+        self.__brushes = list()
+        # элементы, цвет значка которых пересчитывается перед ближайшей отрисовкой значков
+        self.__stale = dict()
+
+        ThemeService.instance().register(self)
+
+    @property
+    def item_palette(self) -> Palette:
+        return self.__palette
+
+    def set_dark(self, dark: bool):
+        if self.__palette.dark != dark:
+            self.__palette = Palette.get(dark)
+            self.setBackgroundBrush(background_color(dark))
+            self.__stale = dict.fromkeys(self.__glyph_index)
+            self.update()
+
+    def clear(self):
+        for item in self.__glyph_index:
+            item._glyph_scene = None
+        self.__glyph_index = dict()
+        self.__stale = dict()
+        self.__n_glyphs = 0
+        self.__bounds = np.zeros((0, 4))
+        self.__color_index = np.zeros(0, dtype=np.int32)
+        self.__rects = np.zeros(0, dtype=object)
+        super().clear()
+
+    def __color(self, color) -> int:
+        ret = self.__colors.get(color.rgba())
+        if ret is None:
+            ret = self.__colors[color.rgba()] = len(self.__brushes)
+            self.__brushes.append(QBrush(color))
+        return ret
+
+    def __grow(self):
+        capacity = max(1024, 2 * len(self.__color_index))
+        self.__bounds = np.resize(self.__bounds, (capacity, 4))
+        self.__color_index = np.resize(self.__color_index, capacity)
+        rects = np.zeros(capacity, dtype=object)
+        rects[:self.__n_glyphs] = self.__rects[:self.__n_glyphs]
+        self.__rects = rects
+
+    def update_glyph(self, item, geometry=False):
+        """Обновляет цвет значка элемента; geometry - ещё и его прямоугольник"""
+        i = self.__glyph_index.get(item)
+        if i is None:
+            if self.__n_glyphs == len(self.__color_index):
+                self.__grow()
+            i = self.__glyph_index[item] = self.__n_glyphs
+            self.__n_glyphs += 1
+            item._glyph_scene = self
+            geometry = True
+        if geometry:
+            rect = item.mapRectToScene(item.rect())
+            self.__bounds[i] = rect.left(), rect.top(), rect.right(), rect.bottom()
+            self.__rects[i] = rect
+        self.__color_index[i] = self.__color(item.glyph_color(self.__palette)) if item.isVisible() else -1
+
+    def glyph_changed(self, item):
+        """Отложенное обновление цвета значка: пока схема крупно, значки не рисуются и не пересчитываются"""
+        self.__stale[item] = None
+
+    def remove_glyph(self, item):
+        self.__stale.pop(item, None)
+        i = self.__glyph_index.pop(item, None)
+        if i is not None:
+            item._glyph_scene = None
+            # место в массивах не переиспользуется: элементы удаляются со схемы редко
+            self.__color_index[i] = -1
+
+    def draw_glyphs(self, painter, rect: QRectF):
+        """Рисует значки, пересекающие прямоугольник rect сцены"""
+        if self.__stale:
+            stale = self.__stale
+            self.__stale = dict()
+            for item in stale:
+                self.update_glyph(item)
+        n = self.__n_glyphs
+        bounds = self.__bounds[:n]
+        colors = self.__color_index[:n]
+        visible = np.flatnonzero((colors >= 0) & (bounds[:, 2] >= rect.left()) & (bounds[:, 0] <= rect.right()) &
+                                 (bounds[:, 3] >= rect.top()) & (bounds[:, 1] <= rect.bottom()))
+        if not len(visible):
+            return
+        visible = visible[np.argsort(colors[visible], kind="stable")]
+        colors = colors[visible]
+        starts = np.flatnonzero(np.diff(colors)) + 1
+        painter.setPen(Qt.PenStyle.NoPen)
+        for rects, color in zip(np.split(self.__rects[visible], starts), colors[np.r_[0, starts]].tolist()):
+            painter.setBrush(self.__brushes[color])
+            painter.drawRects(rects.tolist())
+
+    @property
+    def n_glyphs(self) -> int:
+        return len(self.__glyph_index)
+
+
+class PlantView(QGraphicsView):
+    """Окно просмотра сцены: масштаб колесом мыши относительно курсора, сдвиг перетаскиванием.
+    Нажатие на управляемый элемент обрабатывает сам элемент, перетаскивание начинается только
+    на пустом месте или на неуправляемых элементах"""
+
+    def __init__(self, scene=None, parent=None):
+        super().__init__(scene if scene is not None else PlantScene(), parent)
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        # элементы сами задают перо и кисть перед рисованием; сохранять состояние QPainter не нужно
+        self.setOptimizationFlag(QGraphicsView.OptimizationFlag.DontSavePainterState)
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.SmartViewportUpdate)
+        self.setCacheMode(QGraphicsView.CacheModeFlag.CacheBackground)
+        self.__qp = QPainter()
+
+    @property
+    def zoom(self) -> float:
+        return self.transform().m11()
+
+    def set_zoom(self, zoom: float):
+        zoom = min(MAX_ZOOM, max(MIN_ZOOM, zoom))
+        self.scale(zoom / self.zoom, zoom / self.zoom)
+        self.__update_mode()
+
+    def zoom_by(self, factor: float):
+        self.set_zoom(self.zoom * factor)
+
+    def fit_all(self):
+        """Показывает всю схему"""
+        self.fitInView(self.scene().itemsBoundingRect(), Qt.AspectRatioMode.KeepAspectRatio)
+        self.__update_mode()
+
+    def __update_mode(self):
+        # в обзорном масштабе окно дешевле перерисовать целиком, чем собирать область из тысяч
+        # мелких прямоугольников изменившихся элементов
+        mode = QGraphicsView.ViewportUpdateMode
+        self.setViewportUpdateMode(mode.BoundingRectViewportUpdate if self.zoom < LOD_GLYPH else
+                                   mode.SmartViewportUpdate)
+
+    def paintEvent(self, event):
+        scene = self.scene()
+        if not isinstance(scene, PlantScene) or self.zoom >= LOD_GLYPH:
+            super().paintEvent(event)
+            return
+        # обзорный масштаб: элементы нарисовали бы только свои значки, сцена рисует их все сразу
+        exposed = self.mapToScene(event.rect()).boundingRect()
+        self.__qp.begin(self.viewport())
+        self.__qp.setClipRect(event.rect())
+        self.__qp.setTransform(self.viewportTransform())
+        self.drawBackground(self.__qp, exposed)
+        scene.draw_glyphs(self.__qp, exposed)
+        self.drawForeground(self.__qp, exposed)
+        self.__qp.end()
+
+    def wheelEvent(self, event):
+        delta = event.angleDelta().y()
+        if delta:
+            self.zoom_by(WHEEL_ZOOM_STEP ** delta)
+        event.accept()
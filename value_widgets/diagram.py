@@ -1,10 +1,21 @@
-from .utils import choose_contrast_color, is_app_dark
+from .utils import choose_contrast_color
 from .color_generator import ColorGenerator
+from .frame_clock import FrameClock
+from .theme import ThemeService
+from .palette import Palette
+from . import text_cache
 
-from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QFontMetrics
-from PyQt6.QtCore import Qt, QPointF, QRectF, QLineF, pyqtSlot as Slot, QTimer
+from collections import namedtuple
+from math import floor, ceil
+
+from PyQt6.QtGui import QPainter, QColor, QPen, QPixmap, QImage
+from PyQt6.QtCore import Qt, QPointF, QRect, QRectF, QLineF
 from PyQt6.QtWidgets import QWidget
+import numpy as np
 
+# оформление диаграммы, снятое в потоке GUI: слои и столбцы (и в RenderPool) рисуются только по нему
+_Layout = namedtuple("_Layout", ("w", "h", "offset_x", "offset_y", "min_val", "max_val", "n_sections", "n_items",
+                                 "label", "legend", "section_names", "colors", "palette"))
 
 class Diagram(QWidget):
     def __init__(self, widget, x, y, w, h, redraw_period=15):
@@ -21,221 +32,357 @@ class Diagram(QWidget):
         self.__colors = []
         gen = ColorGenerator()
         for _ in range(len(gen)):
-            self.__colors.append(gen.get_color())
+            self.__colors.append(QColor(gen.get_color()))
 
         self.__n_items = 1
         self.__n_sections = 1
         self.__label = "Untitled"
         self.__legend = ["Untitled"]
-        self.__values = list()
+        self.__values = np.zeros((self.__n_sections, self.__n_items))
         self.__dark = False
+        self.__palette = Palette.get(self.__dark)
         self.__section_names = list()
-
-        self.__redraw_required = True
+        self.__background = None
+        self.__overlay = None
+        # потоковая отрисовка: версии оформления и значений - ключ кадра, слои в QImage меняет только RenderPool
+        self.__face = None
+        self.__face_layers = None
+        self.__chrome = 0
+        self.__values_version = 0
+        self.__config = None
 
         self.setGeometry(x, y, w, h)
 
-        self.__tmr = QTimer(self)
-        self.__tmr.timeout.connect(self.__redraw_process)
-        self.__tmr.start(redraw_period)
+        self.__clock = FrameClock.instance()
+        self.__clock.register(self, redraw_period)
+        ThemeService.instance().register(self)
         self.show()
 
     def paintEvent(self, a0):
-        self.__redraw()
+        if self.__face is None:
+            self.__redraw(a0.rect())
+            return
+        dpr = self.devicePixelRatioF()
+        layers_key = (self.__chrome, dpr)
+        # оформление и значения снимаются в потоке GUI: set_value и set_section изменяют массив на месте,
+        # а RenderPool не читает полей виджета
+        config = self.__layout()
+        values = self.__values[:, :self.__n_items].copy()
+        self.__face.request((layers_key, self.__values_version), self.size(), dpr,
+                            lambda image: self.__render_face(image, config, layers_key, values))
+        qp = QPainter(self)
+        self.__face.paint(qp, a0.rect())
+        qp.end()
 
-    @Slot()
-    def __redraw_process(self):
-        if self.__dark != is_app_dark():
-            self.set_dark(is_app_dark())
-            self.__redraw_required = True
-        if self.__redraw_required:
-            self.update()
-            self.__redraw_required = False
+    def set_threaded_rendering(self, enabled: bool):
+        """Потоковая отрисовка: диаграмма рисуется в RenderPool, paintEvent выводит последний готовый кадр"""
+        if enabled == (self.__face is not None):
+            return
+        # пул потоков загружается только при включении режима
+        from .render_pool import ThreadedFace
+        self.__face = ThreadedFace(self) if enabled else None
+        self.__clock.mark_dirty(self)
+
+    @property
+    def threaded_rendering(self) -> bool:
+        return self.__face is not None
+
+    def __layout(self) -> _Layout:
+        if self.__config is None:
+            self.__config = _Layout(self.__w, self.__h, self.__offset_x, self.__offset_y, self.__min_val, self.__max_val,
+                                    self.__n_sections, self.__n_items, self.__label, tuple(self.__legend),
+                                    tuple(self.__section_names), tuple(self.__colors), self.__palette)
+        return self.__config
+
+    def __invalidate_chrome(self):
+        self.__background = None
+        self.__overlay = None
+        self.__config = None
+        self.__chrome += 1
+        if self.__face is not None:
+            self.__face.invalidate()
+        self.__clock.mark_dirty(self)
 
     def set_dark(self, dark: bool):
-        self.__dark = dark
+        if self.__dark != dark:
+            self.__dark = dark
+            self.__palette = Palette.get(dark)
+            self.__invalidate_chrome()
         
     def set_label(self, label: str) -> None:
         self.__label = label
+        self.__invalidate_chrome()
         
     def set_section_names(self, names):
         self.__section_names = names
+        self.__invalidate_chrome()
         
     def set_min_value(self, val: float):
         self.__min_val = val
+        self.__invalidate_chrome()
         
     def set_max_value(self, val: float):
         self.__max_val = val
+        self.__invalidate_chrome()
 
     def set_number_of_values(self, n: int):
         self.__n_items = n
-        self.__values = [[0] * self.__n_items] * self.__n_sections
+        self.__values = np.zeros((self.__n_sections, self.__n_items))
+        self.__invalidate_chrome()
 
     def set_labels(self, *labels):
         self.__legend = list()
         for lbl in labels:
             self.__legend.append(lbl)
+        self.__invalidate_chrome()
 
     def set_color(self, n_value: int, color):
         if n_value >= self.__n_items:
             return
-        self.__colors[n_value] = color
+        self.__colors[n_value] = QColor(color)
+        self.__invalidate_chrome()
 
     def set_number_of_sections(self, n: int):
         self.__n_sections = n
-        self.__values = [[0] * self.__n_items] * self.__n_sections
+        self.__values = np.zeros((self.__n_sections, self.__n_items))
+        self.__invalidate_chrome()
 
     def set_values(self, values):
-        self.__values = values
-        self.__redraw_required = True
+        """Принимает матрицу секции x значения: список списков или 2-D ndarray.
+        Значения копируются в собственную матрицу виджета; она пересоздаётся только при смене формы"""
+        values = np.asarray(values, dtype=float)
+        if values.shape != self.__values.shape:
+            self.__values = np.empty(values.shape)
+        np.copyto(self.__values, values)
+        self.__values_version += 1
+        self.__clock.mark_dirty(self, self.__sections_rect(0, self.__n_sections - 1))
+
+    def set_value(self, section: int, item: int, value: float):
+        if self.__values[section, item] == value:
+            return
+        self.__values[section, item] = value
+        self.__values_version += 1
+        self.__clock.mark_dirty(self, self.__sections_rect(section, section))
+
+    def set_section(self, section: int, values):
+        row = self.__values[section, :self.__n_items]
+        values = np.asarray(values, dtype=float)[:row.shape[0]]
+        if np.array_equal(row[:values.shape[0]], values):
+            return
+        row[:values.shape[0]] = values
+        self.__values_version += 1
+        self.__clock.mark_dirty(self, self.__sections_rect(section, section))
+
+    def __sections_rect(self, first: int, last: int):
+        """Область перерисовки столбцов секций first..last"""
+        section_width = self.__w / self.__n_sections
+        x0 = floor(self.__offset_x + first * section_width)
+        x1 = ceil(self.__offset_x + (last + 1) * section_width)
+        return QRect(x0, self.__offset_y, x1 - x0 + 1, self.__h + 1)
 
     def setGeometry(self, x, y, w, h):
         self.__w = w
         self.__h = h
         super().setGeometry(x - self.__offset_x, y - self.__offset_y, w + self.__offset_x * 2, h + self.__offset_y * 2)
-
-    def __real_to_window_y(self, y):
-        return self.__offset_y + self.__h / (self.__max_val - self.__min_val) * (self.__max_val - y)
-
-    def __redraw(self):
-        if not self.isVisible():
-            return
-        qp = QPainter()
-
-        qp.begin(self)
+        self.__background = None
+        self.__overlay = None
+        self.__config = None
+        self.__chrome += 1
+        if self.__face is not None:
+            self.__face.invalidate()
+
+    @staticmethod
+    def __real_to_window_y(c, y):
+        return c.offset_y + c.h / (c.max_val - c.min_val) * (c.max_val - y)
+
+    def __bar_geometry(self, c, values, first_section, section_width, wrect, step):
+        """Координаты столбцов за один векторный проход; массивы формы (секции, значения)"""
+        n_sections, n_items = values.shape
+
+        top = self.__real_to_window_y(c, np.clip(values, c.min_val, c.max_val))
+        height = self.__real_to_window_y(c, 0) - top
+
+        sector_x0 = c.offset_x + (np.arange(n_sections) + first_section) * section_width
+        item_dx = (np.arange(n_items) + 1) * step + np.arange(n_items) * wrect
+        x = sector_x0[:, np.newaxis] + item_dx[np.newaxis, :]
+        return x, top, height
+
+    @staticmethod
+    def __new_layer(c, dpr, threaded):
+        w = round((c.w + c.offset_x * 2) * dpr)
+        h = round((c.h + c.offset_y * 2) * dpr)
+        # QPixmap можно создавать только в потоке GUI
+        layer = QImage(w, h, QImage.Format.Format_ARGB32_Premultiplied) if threaded else QPixmap(w, h)
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.GlobalColor.transparent)
+        return layer
+
+    def __render_background(self, c, default_color, dpr, threaded=False):
+        """Заголовок, сетка и подписи секций - под столбцами"""
+        pixmap = self.__new_layer(c, dpr, threaded)
+        qp = QPainter(pixmap)
         qp.setRenderHint(QPainter.RenderHint.Antialiasing)
-        y = self.__real_to_window_y(0)
 
         pen = QPen()
-
-        DEFAULT_COLOR = QColor(210, 210, 210) if self.__dark else QColor(0, 0, 0)
-        
-        pen.setColor(DEFAULT_COLOR)
+        pen.setColor(default_color)
         qp.setPen(pen)
 
-        qp.setFont(QFont("bahnschrift", 14))
-        qp.drawText(self.__offset_x, 0, self.__w, 20, Qt.AlignmentFlag.AlignCenter, self.__label)
+        qp.setFont(text_cache.font("bahnschrift", 14))
+        qp.drawText(c.offset_x, 0, c.w, 20, Qt.AlignmentFlag.AlignCenter, c.label)
 
-        section_width = self.__w / self.__n_sections
+        section_width = c.w / c.n_sections
         pen.setWidthF(0.75)
         pen.setStyle(Qt.PenStyle.DotLine)
         qp.setPen(pen)
+        qp.setBrush(default_color)
 
-        step = 5
-        wrect = (section_width - step) / self.__n_items - step
-        rect_lists = [[QRectF() for _ in range(self.__n_sections)] for _ in range(self.__n_items)]
-
-        for i in range(self.__n_sections):
+        for i in range(c.n_sections):
             if i > 0:
-                pen.setWidthF(0.75)
-                pen.setStyle(Qt.PenStyle.DotLine)
-                qp.setPen(pen)
-                x = self.__offset_x + i * section_width
-                qp.drawLine(QLineF(x, self.__offset_y + self.__h, x, self.__offset_y))
-
-            if i < len(self.__section_names):
-                qp.setFont(QFont("consolas", 12))
-                qp.setBrush(DEFAULT_COLOR)
-                qp.drawText(QRectF(self.__offset_x + i * section_width, self.__offset_y + self.__h + 5, section_width, 15),
-                            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop,
-                            self.__section_names[i])
+                x = c.offset_x + i * section_width
+                qp.drawLine(QLineF(x, c.offset_y + c.h, x, c.offset_y))
 
-            
-            sector_x0 = self.__offset_x + i * section_width
-            for j in range(self.__n_items):
-                value = self.__values[i][j]
-
-                if value < self.__min_val:
-                    value = self.__min_val
-                if value > self.__max_val:
-                    value = self.__max_val
-
-                window_val = self.__real_to_window_y(value)
-                h = y - window_val
-                x = (j + 1) * step + sector_x0 + j * wrect
-                rect_lists[j][i] = QRectF(x, window_val, wrect, h)
-
-        qp.setClipRect(self.__offset_x, self.__offset_y, self.__w, self.__h)
-        for i in range(self.__n_items):
-            qp.setPen(QColor(0, 0, 0, 0))
-            qp.setBrush(QColor(self.__colors[i]))
-            qp.drawRects(rect_lists[i])
-
-            font = QFont("consolas", 16)
-            qp.setFont(font)
-            for j in range(self.__n_sections):
-                y = rect_lists[i][j].y()
-                x = rect_lists[i][j].x()
-                h = rect_lists[i][j].height()
-                
-                text = f"{round(self.__values[j][i])}"
-                bounding_rect = QFontMetrics(font).boundingRect(text)
+            if i < len(c.section_names):
+                text_cache.draw_static_text(qp, QRectF(c.offset_x + i * section_width, c.offset_y + c.h + 5, section_width, 15),
+                                            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop,
+                                            c.section_names[i], "consolas", 12)
+        qp.end()
+        return pixmap
 
-                qp.setPen(choose_contrast_color(QColor(self.__colors[i])))
-                if bounding_rect.width() > wrect - 5:
-                    qp.save()
-                    qp.translate(x, y + wrect)
-                    qp.rotate(-90)
-                    qp.drawText(QRectF(-h + self.__offset_y, 0, h, wrect), Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight, text)
-                    qp.restore()
-                else:   
-                    rect = QRectF(x, y + 5, wrect, bounding_rect.height())
-                    qp.drawText(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, text)
-        qp.setClipRect(0, 0, self.width(), self.height())
+    def __render_overlay(self, c, default_color, dpr, threaded=False):
+        """Оси, шкала и легенда - поверх столбцов"""
+        pixmap = self.__new_layer(c, dpr, threaded)
+        qp = QPainter(pixmap)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
 
-        pen.setStyle(Qt.PenStyle.SolidLine)
-        pen.setColor(DEFAULT_COLOR)
+        pen = QPen()
+        pen.setColor(default_color)
         qp.setPen(pen)
 
-        qp.drawLine(QLineF(self.__offset_x, self.__offset_y + self.__h, self.__offset_x + self.__w, self.__offset_y + self.__h))
-        qp.drawLine(QLineF(self.__offset_x, self.__offset_y + self.__h, self.__offset_x, self.__offset_y))
+        qp.drawLine(QLineF(c.offset_x, c.offset_y + c.h, c.offset_x + c.w, c.offset_y + c.h))
+        qp.drawLine(QLineF(c.offset_x, c.offset_y + c.h, c.offset_x, c.offset_y))
 
-        y = self.__offset_y
+        y = c.offset_y
         i = 0
-        val = self.__max_val
-        step = (self.__max_val - self.__min_val) / 4
-        while y <= self.__offset_y + self.__h:
+        val = c.max_val
+        step = (c.max_val - c.min_val) / 4
+        while y <= c.offset_y + c.h:
             if i % 2 == 0:
                 d = 5
             else:
                 d = 3
-            qp.drawLine(QLineF(self.__offset_x, y, self.__offset_x - d, y))
-            qp.setFont(QFont("bahnschrift", 10))
-            qp.drawText(QRectF(self.__offset_x - 50, y - 10, 40, 20), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, f"{round(val)}")
+            qp.drawLine(QLineF(c.offset_x, y, c.offset_x - d, y))
+            text_cache.draw_static_text(qp, QRectF(c.offset_x - 50, y - 10, 40, 20), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                                        f"{round(val)}", "bahnschrift", 10)
 
-            y += self.__h / 4
+            y += c.h / 4
             val -= step
 
-        if len(self.__legend):
-            y0 = self.__offset_y
+        if len(c.legend):
+            y0 = c.offset_y
             h = 13
             step = 5
-            x0 = self.__offset_x + self.__w - h - step
             radius = h / 2
 
-            font = QFont("Bahnschrift, Arial", 11)
-            qp.setFont(font)
-            metrics = QFontMetrics(font)
-            max_width = max(metrics.horizontalAdvance(lbl) for lbl in self.__legend)
+            metrics = text_cache.metrics("Bahnschrift, Arial", 11)
+            max_width = max(metrics.horizontalAdvance(lbl) for lbl in c.legend)
             wrect = max_width + h + 4* step
-            hrect = metrics.height() * len(self.__legend) + step * (len(self.__legend) - 1)
-            x0 = self.__offset_x + self.__w - wrect
+            hrect = metrics.height() * len(c.legend) + step * (len(c.legend) - 1)
+            x0 = c.offset_x + c.w - wrect
             
-            qp.setPen(QColor(0, 0, 0, 0))
-            qp.setBrush(QColor(200, 200, 200, 100))
+            qp.setPen(c.palette.transparent_pen)
+            qp.setBrush(c.palette.legend_brush)
             qp.drawRoundedRect(QRectF(x0, y0, wrect, hrect), radius, radius)
 
             x0 += 5
             y0 += 5
 
-            for i in range(len(self.__legend)):
-                qp.setPen(QColor(0, 0, 0, 0))
-                qp.setBrush(QColor(self.__colors[i]))
+            for i in range(len(c.legend)):
+                qp.setPen(c.palette.transparent_pen)
+                qp.setBrush(c.colors[i])
                 
                 qp.drawRoundedRect(QRectF(x0, y0, h, h), radius, radius)
 
-                qp.setPen(QColor(self.__colors[i]))
-                qp.drawText(QPointF(x0 + h + 5, y0 + h), self.__legend[i])
+                qp.setPen(c.colors[i])
+                text_cache.draw_static_text_at_baseline(qp, QPointF(x0 + h + 5, y0 + h), c.legend[i], "Bahnschrift, Arial", 11)
                 y0 += h + 4
 
         qp.end()
+        return pixmap
+
+    def __draw_bars(self, qp, c, rect, values):
+        section_width = c.w / c.n_sections
+        step = 5
+        wrect = (section_width - step) / c.n_items - step
+
+        # перерисовываются только секции, попавшие в область обновления
+        first = max(0, floor((rect.left() - c.offset_x) / section_width))
+        last = min(c.n_sections, ceil((rect.right() + 1 - c.offset_x) / section_width))
+        values = values[first:last, :c.n_items]
+        if values.size == 0:
+            return
+        bar_x, bar_top, bar_h = self.__bar_geometry(c, values, first, section_width, wrect, step)
+
+        qp.setClipRect(QRect(c.offset_x, c.offset_y, c.w, c.h).intersected(rect))
+        metrics = text_cache.metrics("consolas", 16)
+        qp.setFont(text_cache.font("consolas", 16))
+        for i in range(values.shape[1]):
+            xs = bar_x[:, i].tolist()
+            ys = bar_top[:, i].tolist()
+            hs = bar_h[:, i].tolist()
+
+            qp.setPen(c.palette.transparent_pen)
+            qp.setBrush(c.colors[i])
+            qp.drawRects([QRectF(x, y, wrect, h) for x, y, h in zip(xs, ys, hs)])
+
+            qp.setPen(choose_contrast_color(c.colors[i]))
+            for x, y, h, value in zip(xs, ys, hs, values[:, i].tolist()):
+                text = f"{round(value)}"
+                bounding_rect = metrics.boundingRect(text)
+
+                if bounding_rect.width() > wrect - 5:
+                    qp.save()
+                    qp.translate(x, y + wrect)
+                    qp.rotate(-90)
+                    qp.drawText(QRectF(-h + c.offset_y, 0, h, wrect), Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignRight, text)
+                    qp.restore()
+                else:   
+                    rect = QRectF(x, y + 5, wrect, bounding_rect.height())
+                    qp.drawText(rect, Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop, text)
+        qp.setClipping(False)
+
+    def __redraw(self, rect):
+        if not self.isVisible():
+            return
+        dpr = self.devicePixelRatioF()
+        c = self.__layout()
+        if self.__background is None or self.__background.devicePixelRatio() != dpr:
+            default_color = c.palette.diagram
+            self.__background = self.__render_background(c, default_color, dpr)
+            self.__overlay = self.__render_overlay(c, default_color, dpr)
+
+        qp = QPainter()
+        qp.begin(self)
+        qp.drawPixmap(QRectF(rect), self.__background, self.__layer_rect(rect, dpr))
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.__draw_bars(qp, c, rect, self.__values)
+        qp.drawPixmap(QRectF(rect), self.__overlay, self.__layer_rect(rect, dpr))
+        qp.end()
+
+    def __render_face(self, image, c, layers_key, values):
+        # выполняется в RenderPool: слои свои, в QImage, и перерисовываются только при смене оформления
+        if self.__face_layers is None or self.__face_layers[0] != layers_key:
+            dpr = layers_key[1]
+            default_color = c.palette.diagram
+            self.__face_layers = (layers_key, self.__render_background(c, default_color, dpr, threaded=True),
+                                  self.__render_overlay(c, default_color, dpr, threaded=True))
+        _, background, overlay = self.__face_layers
+        qp = QPainter(image)
+        qp.drawImage(0, 0, background)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.__draw_bars(qp, c, QRect(0, 0, c.w + c.offset_x * 2, c.h + c.offset_y * 2), values)
+        qp.drawImage(0, 0, overlay)
+        qp.end()
+
+    @staticmethod
+    def __layer_rect(rect, dpr):
+        return QRectF(rect.x() * dpr, rect.y() * dpr, rect.width() * dpr, rect.height() * dpr)
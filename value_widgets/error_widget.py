@@ -1,49 +1,93 @@
-from PyQt6.QtGui import QFont
-from PyQt6.QtCore import QTimer, pyqtSlot as Slot
-from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QSizePolicy
-from .utils import is_app_dark
+from PyQt6.QtGui import QPainter
+from PyQt6.QtCore import Qt, QRectF, QSize
+from PyQt6.QtWidgets import QWidget, QHBoxLayout, QLabel, QSizePolicy, QStyle
+from .theme import ThemeService
+from .palette import Palette
+from . import text_cache
 
 
 class ErrorWidget(QWidget):
+    """Индикатор ошибки с подписью.
+    По умолчанию (painted=True) индикатор и подпись рисуются в paintEvent;
+    painted=False - прежние дочерние QLabel со стилями"""
 
-    def __init__(self, widget, x, y, error_name, dark=False):
+    INDICATOR_SIZE = 15
+
+    def __init__(self, widget, x, y, error_name, dark=False, painted=True):
         super().__init__()
         self.setParent(widget)
         super().setGeometry(x, y, 100, 20)
         self.__error = True
         self.__dark = False
+        self.__name = error_name
+        # в режиме painted индикатор и текст рисуются напрямую, без дочерних QLabel и стилей
+        self.__painted = painted
 
-        self.__indicator = QLabel()
-        self.__indicator.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
-        self.__indicator.setMinimumHeight(15)
-        self.__indicator.setMinimumWidth(15)
-        self.__label = QLabel()
-        self.__label.setText(error_name)
-        self.__label.setFont(QFont("Bahnschrift, Arial", 12))
-        self.__label.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Expanding)
-
-        self.__layout = QHBoxLayout(self)
-        self.__layout.addWidget(self.__indicator)
-        self.__layout.addWidget(self.__label)
+        if self.__painted:
+            self.__palette = Palette.get(self.__dark)
+            self.__qp = QPainter()
+            self.setFont(text_cache.font("Bahnschrift, Arial", 12))
+        else:
+            self.__indicator = QLabel()
+            self.__indicator.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
+            self.__indicator.setMinimumHeight(15)
+            self.__indicator.setMinimumWidth(15)
+            self.__label = QLabel()
+            self.__label.setText(error_name)
+            self.__label.setFont(text_cache.font("Bahnschrift, Arial", 12))
+            self.__label.setSizePolicy(QSizePolicy.Policy.Maximum, QSizePolicy.Policy.Expanding)
 
-        self.__tmr = QTimer(self)
-        self.__tmr.timeout.connect(self.__check_theme)
-        self.__tmr.start(100)
+            self.__layout = QHBoxLayout(self)
+            self.__layout.addWidget(self.__indicator)
+            self.__layout.addWidget(self.__label)
 
         self.adjustSize()
 
         self.set_error(False)
+        ThemeService.instance().register(self)
 
     def setGeometry(self, x, y):
         super().setGeometry(x, y, 100, 20)
         self.adjustSize()
 
-    @Slot()
-    def __check_theme(self):
-        if self.__dark != is_app_dark():
-            self.set_dark(is_app_dark())
+    def __margins(self):
+        style = self.style()
+        return (style.pixelMetric(QStyle.PixelMetric.PM_LayoutLeftMargin),
+                style.pixelMetric(QStyle.PixelMetric.PM_LayoutTopMargin),
+                style.pixelMetric(QStyle.PixelMetric.PM_LayoutHorizontalSpacing))
+
+    def sizeHint(self):
+        if not self.__painted:
+            return super().sizeHint()
+        margin, top, spacing = self.__margins()
+        metrics = text_cache.metrics("Bahnschrift, Arial", 12)
+        return QSize(2 * margin + self.INDICATOR_SIZE + spacing + metrics.horizontalAdvance(self.__name),
+                     2 * top + max(self.INDICATOR_SIZE, metrics.height()))
+
+    def paintEvent(self, a0):
+        if not self.__painted:
+            return
+        margin, top, spacing = self.__margins()
+        size = self.INDICATOR_SIZE
+        y0 = (self.height() - size) / 2
+        self.__qp.begin(self)
+        self.__qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.__qp.setPen(Qt.PenStyle.NoPen)
+        self.__qp.setBrush(self.__palette.fault_indicator if self.__error else self.__palette.inactive)
+        self.__qp.drawRoundedRect(QRectF(margin, y0, size, size), size / 2, size / 2)
+
+        self.__qp.setPen(self.__palette.text_pen if self.__error else self.__palette.inactive_pen)
+        self.__qp.setFont(self.font())
+        x = margin + size + spacing
+        self.__qp.drawText(QRectF(x, 0, self.width() - x, self.height()),
+                           Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, self.__name)
+        self.__qp.end()
 
     def set_error(self, error: bool):
+        if self.__error != error and self.__painted:
+            self.__error = error
+            self.update()
+            return
         if self.__error != error:
             self.__indicator.setStyleSheet(
                 f"""
@@ -60,6 +104,11 @@ class ErrorWidget(QWidget):
         self.__error = error
 
     def set_dark(self, dark: bool):
+        if self.__dark != dark and self.__painted:
+            self.__dark = dark
+            self.__palette = Palette.get(dark)
+            self.update()
+            return
         if self.__dark != dark:
             if dark:
                 self.__label.setStyleSheet(f"color: {'white' if self.__error else 'rgb(128, 128, 128)'};")
@@ -0,0 +1,212 @@
+from time import monotonic
+from weakref import ref
+
+from PyQt6.QtCore import QObject, QTimer, QEvent, Qt, pyqtSlot as Slot
+
+
+class FrameClock(QObject):
+    """Общий для процесса таймер кадров: перерисовывает только помеченные виджеты.
+    Скрытые, свёрнутые и целиком закрытые виджеты не перерисовываются - изменения только запоминаются
+    (состояние хранит сам виджет), и виджет рисует последнее состояние один раз, когда снова виден.
+    Виджеты хранятся по id() через слабые ссылки: регистрация не продлевает жизнь виджета"""
+
+    FRAME_PERIOD = 16
+
+    __instance = None
+
+    def __init__(self, frame_period=FRAME_PERIOD):
+        super().__init__()
+        # id(виджет) -> слабая ссылка; остальные словари тоже по id(виджет)
+        self.__widgets = dict()
+        self.__periods = dict()
+        self.__last_update = dict()
+        self.__dirty = dict()
+        self.__next_frame = dict()
+        self.__frame_callbacks = list()
+        # виджеты, отложенные до показа окна: окно -> {id(виджет): None}
+        self.__unexposed = dict()
+        self.__windows = set()
+        self.__suppressed = 0
+
+        self.__tmr = QTimer(self)
+        self.__tmr.timeout.connect(self.__timeout)
+        self.__tmr.setInterval(frame_period)
+
+    @classmethod
+    def instance(cls) -> "FrameClock":
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
+
+    def set_frame_period(self, period: int):
+        self.__tmr.setInterval(period)
+
+    def register(self, widget, redraw_period=0):
+        """Регистрирует виджет; redraw_period - минимальный интервал между перерисовками, мс"""
+        key = id(widget)
+        if key not in self.__periods:
+            # обработчики держат только ключ: удалённый виджет снимается по destroyed или при сборке обёртки
+            self.__widgets[key] = ref(widget, lambda _, k=key: self.__forget(k))
+            widget.destroyed.connect(lambda _=None, k=key: self.__forget(k))
+        self.__periods[key] = redraw_period / 1000
+        self.__last_update[key] = 0.0
+        self.mark_dirty(widget)
+
+    def unregister(self, widget):
+        self.__forget(id(widget))
+
+    def __forget(self, key):
+        self.__widgets.pop(key, None)
+        self.__periods.pop(key, None)
+        self.__last_update.pop(key, None)
+        self.__dirty.pop(key, None)
+        for widgets in self.__unexposed.values():
+            widgets.pop(key, None)
+
+    def set_redraw_period(self, widget, redraw_period):
+        key = id(widget)
+        if key in self.__periods:
+            self.__periods[key] = redraw_period / 1000
+
+    def mark_dirty(self, widget, rect=None):
+        """Помечает виджет к перерисовке; rect - область (QRect), None - весь виджет"""
+        key = id(widget)
+        if key not in self.__periods:
+            return
+        dirty = self.__dirty
+        if key not in dirty:
+            dirty[key] = rect
+        elif dirty[key] is not None:
+            dirty[key] = None if rect is None else dirty[key].united(rect)
+        if not self.__tmr.isActive():
+            self.__tmr.start()
+
+    def clear_dirty(self, widget):
+        """Снимает пометку, если виджет и так будет перерисован целиком (например, при показе)"""
+        self.__dirty.pop(id(widget), None)
+
+    def call_next_frame(self, callback):
+        """Однократно вызывает callback в начале следующего кадра, до перерисовки виджетов.
+        Повторная постановка того же callback до кадра игнорируется"""
+        self.__next_frame[callback] = None
+        if not self.__tmr.isActive():
+            self.__tmr.start()
+
+    def add_frame_callback(self, callback):
+        """Вызывает callback в начале каждого кадра, пока он не снят remove_frame_callback.
+        Пока есть такие функции, таймер кадров не останавливается"""
+        if callback not in self.__frame_callbacks:
+            self.__frame_callbacks.append(callback)
+        if not self.__tmr.isActive():
+            self.__tmr.start()
+
+    def remove_frame_callback(self, callback):
+        if callback in self.__frame_callbacks:
+            self.__frame_callbacks.remove(callback)
+
+    def is_registered(self, widget) -> bool:
+        return id(widget) in self.__periods
+
+    def is_dirty(self, widget) -> bool:
+        return id(widget) in self.__dirty
+
+    @staticmethod
+    def __window_hidden(handle) -> bool:
+        return handle is not None and (not handle.isExposed() or
+                                       bool(handle.windowState() & Qt.WindowState.WindowMinimized))
+
+    @classmethod
+    def is_exposed(cls, widget) -> bool:
+        """Виджет показан, его окно не свёрнуто и не закрыто целиком, и видна хотя бы часть виджета"""
+        if not widget.isVisible() or cls.__window_hidden(widget.window().windowHandle()):
+            return False
+        return not widget.visibleRegion().isEmpty()
+
+    def __defer(self, widget) -> bool:
+        """Откладывает перерисовку невидимого виджета; False - виджет виден"""
+        if not widget.isVisible():
+            # показ виджета (вкладка, страница, окно) сам вызывает перерисовку
+            return True
+        handle = widget.window().windowHandle()
+        if self.__window_hidden(handle):
+            # при разворачивании окна Qt может вывести старое содержимое без перерисовки виджетов,
+            # поэтому виджет помечается заново по событию Expose окна
+            if handle not in self.__windows:
+                self.__windows.add(handle)
+                handle.installEventFilter(self)
+                handle.destroyed.connect(lambda _=None, h=handle: self.__forget_window(h))
+            self.__unexposed.setdefault(handle, dict())[id(widget)] = None
+            return True
+        # вне области прокрутки или под соседними виджетами: появившаяся часть будет перерисована Qt
+        return widget.visibleRegion().isEmpty()
+
+    def __forget_window(self, handle):
+        self.__windows.discard(handle)
+        self.__unexposed.pop(handle, None)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Expose and obj in self.__unexposed and obj.isExposed():
+            for key in self.__unexposed.pop(obj):
+                widget = self.__widgets[key]()
+                if widget is not None:
+                    self.mark_dirty(widget)
+        return False
+
+    @property
+    def active(self) -> bool:
+        return self.__tmr.isActive()
+
+    @property
+    def n_registered(self) -> int:
+        return len(self.__periods)
+
+    @property
+    def n_dirty(self) -> int:
+        return len(self.__dirty)
+
+    @property
+    def suppressed(self) -> int:
+        """Перерисовки, пропущенные из-за того, что виджет не виден"""
+        return self.__suppressed
+
+    @Slot()
+    def __timeout(self):
+        # обработчик кадра ищется при каждом вызове, чтобы его можно было подменить (см. instrumentation)
+        self.__tick()
+
+    def __tick(self):
+        for callback in tuple(self.__frame_callbacks):
+            callback()
+
+        if self.__next_frame:
+            callbacks = self.__next_frame
+            self.__next_frame = dict()
+            for callback in callbacks:
+                callback()
+
+        now = monotonic()
+        dirty = self.__dirty
+        self.__dirty = dict()
+        for key, rect in dirty.items():
+            last = self.__last_update.get(key)
+            if last is None:
+                # виджет удалён во время кадра (сборка обёртки)
+                continue
+            if now - last < self.__periods[key]:
+                # ограничение частоты перерисовки виджета - переносим на следующий кадр
+                self.__dirty[key] = rect
+                continue
+            widget = self.__widgets[key]()
+            if widget is None:
+                continue
+            if self.__defer(widget):
+                self.__suppressed += 1
+                continue
+            self.__last_update[key] = now
+            if rect is None:
+                widget.update()
+            else:
+                widget.update(rect)
+
+        if not self.__dirty and not self.__next_frame and not self.__frame_callbacks:
+            self.__tmr.stop()
@@ -1,3 +1,5 @@
-from PyInstaller.utils.hooks import collect_data_files
+from PyInstaller.utils.hooks import collect_data_files, collect_submodules
 
 datas = collect_data_files("value_widgets", subdir='images')
+# модули виджетов импортируются лениво (value_widgets.__getattr__) и не видны анализатору импортов
+hiddenimports = collect_submodules("value_widgets", filter=lambda name: not name.startswith("value_widgets.hooks"))
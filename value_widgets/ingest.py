@@ -0,0 +1,244 @@
+import threading
+from time import monotonic
+
+from PyQt6.QtCore import QObject, pyqtSignal as Signal
+
+from .frame_clock import FrameClock
+
+
+class RingBuffer:
+    """Кольцевой буфер (тег, значение, время) с одним писателем и одним читателем.
+    Память (списки фиксированной длины) выделяется один раз; запись не берёт блокировок: писатель меняет только
+    write_head и head, читатель - только tail.
+    При переполнении новая запись либо отбрасывается (overwrite=False),
+    либо затирает самую старую (overwrite=True).
+    wake() вызывается писателем, если читатель успел прочитать всё до его записи: читатель мог остановиться"""
+
+    def __init__(self, capacity=4096, overwrite=False, wake=None):
+        self.__capacity = capacity
+        self.__overwrite = overwrite
+        self.__wake = wake
+        # списки, а не массивы numpy: поэлементная запись в список заметно дешевле
+        self.__slots = [0] * capacity
+        self.__values = [0.0] * capacity
+        self.__timestamps = [0.0] * capacity
+        self.__head = 0
+        # граница записи, начатой писателем: выставляется до записи элементов, head - после
+        self.__write_head = 0
+        self.__tail = 0
+        self.__dropped = 0
+        self.__overwritten = 0
+
+    def push(self, slot: int, value: float, timestamp: float | None = None) -> bool:
+        """Вызывается потоком-писателем; slot - индекс слота WidgetGroup (WidgetGroup.slot(tag)).
+        Возвращает False, если запись отброшена из-за переполнения"""
+        head = self.__head
+        if not self.__overwrite and head - self.__tail >= self.__capacity:
+            self.__dropped += 1
+            return False
+        self.__write_head = head + 1
+        i = head % self.__capacity
+        self.__slots[i] = slot
+        self.__values[i] = value
+        self.__timestamps[i] = monotonic() if timestamp is None else timestamp
+        # запись становится видна читателю только после сдвига head
+        self.__head = head + 1
+        if self.__wake is not None and self.__tail >= head:
+            self.__wake()
+        return True
+
+    def push_many(self, slots, values, timestamp: float | None = None) -> int:
+        """Записывает пачку значений с общей меткой времени; возвращает число записанных"""
+        if hasattr(slots, "tolist"):
+            slots = slots.tolist()
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        n = len(slots)
+        head = start = self.__head
+        cap = self.__capacity
+        if not self.__overwrite:
+            free = cap - (head - self.__tail)
+            if n > free:
+                self.__dropped += n - free
+                n = free
+        elif n > cap:
+            # из пачки больше буфера всё равно останутся только последние cap значений
+            slots = slots[n - cap:]
+            values = values[n - cap:]
+            head += n - cap
+            n = cap
+        if n <= 0:
+            return 0
+        timestamp = monotonic() if timestamp is None else timestamp
+        self.__write_head = head + n
+        i = head % cap
+        first = min(n, cap - i)
+        self.__slots[i:i + first] = slots[:first]
+        self.__values[i:i + first] = values[:first]
+        self.__timestamps[i:i + first] = [timestamp] * first
+        if first < n:
+            self.__slots[:n - first] = slots[first:n]
+            self.__values[:n - first] = values[first:n]
+            self.__timestamps[:n - first] = [timestamp] * (n - first)
+        self.__head = head + n
+        if self.__wake is not None and self.__tail >= start:
+            self.__wake()
+        return n
+
+    def drain(self):
+        """Вызывается потоком-читателем; возвращает (слоты, значения, время) всех новых записей или None"""
+        head = self.__head
+        tail = self.__tail
+        n = head - tail
+        if n <= 0:
+            return None
+        cap = self.__capacity
+        if n > cap:
+            self.__overwritten += n - cap
+            tail = head - cap
+        i = tail % cap
+        j = head % cap
+        if i < j:
+            slots = self.__slots[i:j]
+            values = self.__values[i:j]
+            timestamps = self.__timestamps[i:j]
+        else:
+            slots = self.__slots[i:] + self.__slots[:j]
+            values = self.__values[i:] + self.__values[:j]
+            timestamps = self.__timestamps[i:] + self.__timestamps[:j]
+        if self.__overwrite:
+            # пока шло копирование, писатель мог затереть самые старые из прочитанных записей; учитываются
+            # и элементы пачки, которую писатель ещё записывает (head ещё не сдвинут)
+            torn = min(self.__write_head - cap - tail, head - tail)
+            if torn > 0:
+                self.__overwritten += torn
+                slots = slots[torn:]
+                values = values[torn:]
+                timestamps = timestamps[torn:]
+        self.__tail = head
+        return slots, values, timestamps
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    @property
+    def pushed(self) -> int:
+        return self.__head
+
+    @property
+    def dropped(self) -> int:
+        return self.__dropped
+
+    @property
+    def overwritten(self) -> int:
+        return self.__overwritten
+
+    def __len__(self):
+        return min(self.__head - self.__tail, self.__capacity)
+
+
+class _Waker(QObject):
+    # сигнал из потока-писателя доставляется в поток GUI очередью событий
+    requested = Signal()
+
+
+class IngestEndpoint:
+    """Приём значений из рабочих потоков: каждый поток-писатель получает свой RingBuffer
+    через producer(), поток GUI раз в кадр FrameClock переносит накопленное в WidgetGroup
+    вместе с отметками времени записей (см. WidgetGroup.bind, timestamped).
+    Когда все буферы пусты, обработчик кадра снимается и таймер кадров может остановиться;
+    первая запись в пустой буфер снова ставит его через очередь событий потока GUI"""
+
+    def __init__(self, group, capacity=4096, overwrite=False):
+        self.__group = group
+        self.__capacity = capacity
+        self.__overwrite = overwrite
+        self.__buffers = list()
+        # блокировка нужна только для добавления писателей, не для записи значений
+        self.__lock = threading.Lock()
+        self.__clock = FrameClock.instance()
+        self.__running = False
+        # drain снят с кадров и ждёт записи; пока endpoint остановлен - False, будить некого
+        self.__idle = False
+        self.__waker = _Waker()
+        self.__waker.requested.connect(self.__resume)
+
+        self.__drained = 0
+        self.__max_latency = 0.0
+
+    def producer(self) -> RingBuffer:
+        """Создаёт буфер для одного потока-писателя"""
+        buffer = RingBuffer(self.__capacity, self.__overwrite, self.__wake)
+        with self.__lock:
+            self.__buffers = self.__buffers + [buffer]
+        return buffer
+
+    def remove_producer(self, buffer: RingBuffer):
+        with self.__lock:
+            self.__buffers = [b for b in self.__buffers if b is not buffer]
+
+    def start(self):
+        if not self.__running:
+            self.__running = True
+            self.__idle = False
+            self.__clock.add_frame_callback(self.drain)
+
+    def stop(self):
+        if self.__running:
+            self.__running = False
+            self.__idle = False
+            self.__clock.remove_frame_callback(self.drain)
+
+    def __wake(self):
+        # вызывается потоком-писателем; повторные вызовы до возобновления ничего не делают
+        if self.__idle:
+            self.__idle = False
+            self.__waker.requested.emit()
+
+    def __resume(self):
+        if self.__running:
+            self.__clock.add_frame_callback(self.drain)
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    def drain(self):
+        """Переносит все новые записи в группу виджетов и сразу применяет их; вызывать из потока GUI"""
+        now = monotonic()
+        for buffer in self.__buffers:
+            data = buffer.drain()
+            if data is None:
+                continue
+            slots, values, timestamps = data
+            if len(slots) == 0:
+                continue
+            self.__group.update_slots(slots, values, timestamps)
+            self.__drained += len(slots)
+            self.__max_latency = max(self.__max_latency, now - min(timestamps))
+        self.__group.flush()
+        if self.__running and not any(len(b) for b in self.__buffers):
+            self.__clock.remove_frame_callback(self.drain)
+            self.__idle = True
+            # запись между проверкой и выставлением флага не будит endpoint: проверка повторяется
+            if any(len(b) for b in self.__buffers):
+                self.__idle = False
+                self.__clock.add_frame_callback(self.drain)
+
+    def stats(self) -> dict:
+        """max_latency - наибольшая задержка между записью и применением, с"""
+        buffers = self.__buffers
+        return {
+            "producers": len(buffers),
+            "pushed": sum(b.pushed for b in buffers),
+            "drained": self.__drained,
+            "dropped": sum(b.dropped for b in buffers),
+            "overwritten": sum(b.overwritten for b in buffers),
+            "queued": sum(len(b) for b in buffers),
+            "max_latency": self.__max_latency,
+        }
+
+    def reset_stats(self):
+        self.__drained = 0
+        self.__max_latency = 0.0
@@ -0,0 +1,264 @@
+"""Необязательный сбор статистики отрисовки виджетов.
+
+enable() подменяет paintEvent и методы установки значения у классов виджетов, а также обработчик
+кадра FrameClock; disable() возвращает исходные методы, так что в выключенном состоянии накладных
+расходов нет. Счётчики хранятся в заранее выделенных массивах numpy.
+
+    from value_widgets import instrumentation
+    instrumentation.enable()
+    instrumentation.start_dump("paint_stats.json", 5000)
+    ...
+    instrumentation.class_stats()
+"""
+import json
+import weakref
+from time import perf_counter, monotonic, time
+
+import numpy as np
+from PyQt6.QtCore import QTimer
+
+from .frame_clock import FrameClock
+from .widget_group import _SETTER_NAMES
+
+
+MAX_INSTANCES = 4096
+# корзины гистограммы длительности: 0 - меньше 1 мкс, k - от 2 ** (k - 1) до 2 ** k мкс
+N_BINS = 24
+
+_paint_count = np.zeros(MAX_INSTANCES, dtype=np.int64)
+_paint_total = np.zeros(MAX_INSTANCES, dtype=np.float64)
+_paint_max = np.zeros(MAX_INSTANCES, dtype=np.float64)
+_paint_hist = np.zeros((MAX_INSTANCES, N_BINS), dtype=np.int64)
+_updates = np.zeros(MAX_INSTANCES, dtype=np.int64)
+_redundant = np.zeros(MAX_INSTANCES, dtype=np.int64)
+_last_change = np.zeros(MAX_INSTANCES, dtype=np.float64)
+_class_index = np.full(MAX_INSTANCES, -1, dtype=np.int32)
+
+_frame_count = 0
+_frame_hist = np.zeros(N_BINS, dtype=np.int64)
+
+_indices = weakref.WeakKeyDictionary()
+# строки удалённых экземпляров; статистика такой строки видна, пока её не займёт новый экземпляр
+_free = list()
+_names = list()
+_classes = list()
+_last_args = dict()
+_originals = list()
+_dump_timer = None
+_dump_path = None
+
+
+def _clear_row(i):
+    for a in (_paint_count, _paint_total, _paint_max, _paint_hist, _updates, _redundant, _last_change):
+        a[i] = 0
+    for key in [key for key in _last_args if key[0] == i]:
+        del _last_args[key]
+
+
+def _index(widget) -> int:
+    """Номер экземпляра в массивах; живых экземпляров сверх MAX_INSTANCES не учитываются (-1)"""
+    i = _indices.get(widget)
+    if i is None:
+        if _free:
+            i = _free.pop()
+            _clear_row(i)
+        else:
+            i = len(_names)
+            if i >= MAX_INSTANCES:
+                return -1
+            _names.append(None)
+        _indices[widget] = i
+        weakref.finalize(widget, _free.append, i)
+        _names[i] = f"{type(widget).__name__}#{i}" + (f" {widget.objectName()}" if widget.objectName() else "")
+        cls = type(widget).__name__
+        if cls not in _classes:
+            _classes.append(cls)
+        _class_index[i] = _classes.index(cls)
+    return i
+
+
+def _bin(seconds: float) -> int:
+    return min(int(seconds * 1e6).bit_length(), N_BINS - 1)
+
+
+def _wrap_paint(original):
+    def paintEvent(self, a0):
+        t0 = perf_counter()
+        original(self, a0)
+        dt = perf_counter() - t0
+        i = _index(self)
+        if i >= 0:
+            _paint_count[i] += 1
+            _paint_total[i] += dt
+            if dt > _paint_max[i]:
+                _paint_max[i] = dt
+            _paint_hist[i, _bin(dt)] += 1
+    return paintEvent
+
+
+def _wrap_setter(original):
+    clock = FrameClock.instance()
+
+    def setter(self, *args, **kwargs):
+        # ValueWidget и PointerDevice сами считают изменения значения, не изменившие изображения
+        suppressed = getattr(self, "suppressed_updates", None)
+        registered = clock.is_registered(self)
+        was_dirty = registered and clock.is_dirty(self)
+        ret = original(self, *args, **kwargs)
+        i = _index(self)
+        if i < 0:
+            return ret
+        _updates[i] += 1
+        key = (i, original.__name__)
+        same = _last_args.get(key) == args
+        _last_args[key] = args
+        if suppressed is not None:
+            redundant = same or self.suppressed_updates != suppressed
+        elif registered and not was_dirty:
+            redundant = not clock.is_dirty(self)
+        else:
+            # перерисовка уже запрошена или виджет перерисовывается через update(): изменение определяется по аргументам
+            redundant = same
+        if redundant:
+            _redundant[i] += 1
+        else:
+            _last_change[i] = monotonic()
+        return ret
+    setter.__name__ = original.__name__
+    return setter
+
+
+def _wrap_tick(original):
+    def tick(self):
+        global _frame_count
+        t0 = perf_counter()
+        original(self)
+        _frame_count += 1
+        _frame_hist[_bin(perf_counter() - t0)] += 1
+    return tick
+
+
+def _patch(owner, name, wrapper):
+    had_own = name in owner.__dict__
+    original = getattr(owner, name)
+    _originals.append((owner, name, original if had_own else None))
+    setattr(owner, name, wrapper(original))
+
+
+def _widget_classes():
+    from . import (ValueWidget, PointerDevice, Diagram, Relay, Valve, KKM, TimerWidget, StateWidget,
+                   ErrorWidget, StripChart)
+    return ValueWidget, PointerDevice, Diagram, Relay, Valve, KKM, TimerWidget, StateWidget, ErrorWidget, StripChart
+
+
+def enabled() -> bool:
+    return bool(_originals)
+
+
+def enable(classes=None):
+    """Включает сбор статистики для классов classes (по умолчанию - все виджеты пакета)"""
+    if _originals:
+        return
+    for cls in classes or _widget_classes():
+        _patch(cls, "paintEvent", _wrap_paint)
+        for name in _SETTER_NAMES:
+            if hasattr(cls, name):
+                _patch(cls, name, _wrap_setter)
+    _patch(FrameClock, "_FrameClock__tick", _wrap_tick)
+
+
+def disable():
+    """Возвращает исходные методы; накопленная статистика сохраняется до reset()"""
+    while _originals:
+        owner, name, original = _originals.pop()
+        if original is None:
+            delattr(owner, name)
+        else:
+            setattr(owner, name, original)
+
+
+def reset():
+    global _frame_count
+    for a in (_paint_count, _paint_total, _paint_max, _paint_hist, _updates, _redundant, _last_change):
+        a[...] = 0
+    _frame_hist[...] = 0
+    _frame_count = 0
+    _last_args.clear()
+
+
+def _percentile(hist, q):
+    """Верхняя граница корзины, в которую попадает q-я доля отрисовок, мкс"""
+    total = hist.sum()
+    if total == 0:
+        return 0.0
+    k = int(np.searchsorted(np.cumsum(hist), q * total))
+    return float(1 << k)
+
+
+def _stats(idx, now):
+    count = int(_paint_count[idx].sum())
+    hist = _paint_hist[idx].sum(axis=0)
+    last = _last_change[idx]
+    last = last[last > 0]
+    return {
+        "paints": count,
+        "paint_mean_us": float(_paint_total[idx].sum()) / count * 1e6 if count else 0.0,
+        "paint_max_us": float(_paint_max[idx].max()) * 1e6 if idx.shape[0] else 0.0,
+        "paint_p50_us": _percentile(hist, 0.5),
+        "paint_p99_us": _percentile(hist, 0.99),
+        "paint_total_ms": float(_paint_total[idx].sum()) * 1e3,
+        "updates": int(_updates[idx].sum()),
+        "redundant_updates": int(_redundant[idx].sum()),
+        "since_last_change_s": now - float(last.max()) if last.shape[0] else None,
+        "histogram": hist.tolist(),
+    }
+
+
+def instance_stats(widget) -> dict | None:
+    i = _indices.get(widget)
+    if i is None:
+        return None
+    return _stats(np.array([i]), monotonic())
+
+
+def class_stats() -> dict:
+    """Статистика по классам; since_last_change_s - с последнего изменения у любого экземпляра"""
+    now = monotonic()
+    n = len(_names)
+    return {cls: _stats(np.flatnonzero(_class_index[:n] == k), now) for k, cls in enumerate(_classes)}
+
+
+def snapshot(top: int = 20) -> dict:
+    """Снимок для сохранения: кадры, классы и top экземпляров с наибольшим суммарным временем отрисовки"""
+    now = monotonic()
+    n = len(_names)
+    order = np.argsort(-_paint_total[:n])[:top]
+    return {
+        "time": time(),
+        "frames": _frame_count,
+        "frame_histogram": _frame_hist.tolist(),
+        "frame_p99_us": _percentile(_frame_hist, 0.99),
+        "histogram_bins_us": [0] + [1 << k for k in range(N_BINS - 1)],
+        "classes": class_stats(),
+        "instances": {_names[i]: _stats(np.array([i]), now) for i in order.tolist()},
+    }
+
+
+def dump(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=1)
+
+
+def start_dump(path, period_ms=5000):
+    """Периодически сохраняет snapshot() в файл path"""
+    global _dump_timer, _dump_path
+    _dump_path = path
+    if _dump_timer is None:
+        _dump_timer = QTimer()
+        _dump_timer.timeout.connect(lambda: dump(_dump_path))
+    _dump_timer.start(period_ms)
+
+
+def stop_dump():
+    if _dump_timer is not None:
+        _dump_timer.stop()
@@ -1,12 +1,19 @@
-from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QPolygonF, QPainterPath, QFontMetrics, QStyleHints
+from math import sin, cos, radians
+from time import monotonic
+
+from PyQt6.QtGui import QPainter, QColor, QPen, QPainterPath, QPixmap
 from PyQt6.QtCore import Qt, QPointF, QRectF, QLineF, QTimer, pyqtSlot as Slot
 from PyQt6.QtWidgets import QWidget
-import numpy as np
-from .timer import Timer
+from .frame_clock import FrameClock
+from . import text_cache
 
 
 class KKM(QWidget):
 
+    # скорость поворота рукоятки, фиксаций в секунду
+    HANDLE_SPEED = 10
+    BLINK_PERIOD = 250
+
     def __init__(self, widget, x, y, scale, redraw_period=20):
         super().__init__()
         self.setParent(widget)
@@ -22,33 +29,73 @@ class KKM(QWidget):
         self.__handle_length = int(200 * scale)
 
         self.__position = 0
-        self.__new_position = 0
+        self.__new_position = None
 
-        self.__blink_tmr = Timer(250)
+        # мигание рукоятки в положении 0
+        self.__blink_tmr = QTimer(self)
+        self.__blink_tmr.setInterval(self.BLINK_PERIOD)
+        self.__blink_tmr.timeout.connect(self.__blink)
         self.visible = True
 
         self.angles = (3 * self.__step, 2 * self.__step, self.__step, 0, -self.__step, -2 * self.__step, -3 * self.__step)
         self.current_angle = self.angles[0]
         self.target_angle = self.current_angle
 
-        self.__redraw_required = True
+        # движение рукоятки: угол и время начала поворота
+        self.__start_angle = self.current_angle
+        self.__start_time = 0.0
 
-        self.__tmr = QTimer(self)
-        self.__tmr.timeout.connect(self.__redraw_process)
-        self.__tmr.start(redraw_period)
-        self.show()
+        # корпус, риски и плашка не зависят от положения; рукоятка в фиксациях считается заранее
+        self.__static_layer = None
+        self.__handles = dict()
 
-    @Slot()
-    def __redraw_process(self):
-        if self.__redraw_required:
-            self.update()
-            # self.__redraw_required = False
+        self.__clock = FrameClock.instance()
+        self.__clock.register(self, redraw_period)
+        self.set_position(0)
+        self.show()
 
     def paintEvent(self, a0):
         self.__redraw()
+        if self.current_angle != self.target_angle:
+            # рукоятка ещё поворачивается
+            self.__clock.mark_dirty(self)
+        if self.__position == 0 and not self.__blink_tmr.isActive():
+            # мигание, остановленное пока виджет не был виден
+            self.__blink_tmr.start()
+
+    def hideEvent(self, a0):
+        self.__blink_tmr.stop()
+        super().hideEvent(a0)
+
+    def moveEvent(self, a0):
+        # всё рисуется относительно x(), y()
+        self.__invalidate_static_layer()
+        super().moveEvent(a0)
+
+    def resizeEvent(self, a0):
+        self.__invalidate_static_layer()
+        super().resizeEvent(a0)
 
     def set_position(self, pos: int):
+        if pos == self.__new_position:
+            return
         self.__new_position = pos
+        if pos > 0 and pos != self.__position:
+            self.__start_angle = self.__angle_at(monotonic())
+            self.__start_time = monotonic()
+            self.current_angle = self.__start_angle
+            self.target_angle = self.angles[pos - 1] if pos <= 7 else self.angles[-1]
+            self.__position = pos
+            self.visible = True
+            self.__blink_tmr.stop()
+        elif pos == 0:
+            self.target_angle = self.angles[3]
+            self.current_angle = self.target_angle
+            self.__start_angle = self.target_angle
+            self.__position = pos
+            if not self.__blink_tmr.isActive():
+                self.__blink_tmr.start()
+        self.__clock.mark_dirty(self)
 
     def pos_to_str(self, pos: int):
         if pos < 1 or pos > 7:
@@ -69,83 +116,106 @@ class KKM(QWidget):
             case 7:
                 return "VI"
 
+    @Slot()
+    def __blink(self):
+        self.visible = not self.visible
+        if not self.__clock.is_exposed(self):
+            # перезапуск - из paintEvent, когда виджет снова виден
+            self.__blink_tmr.stop()
+        self.__clock.mark_dirty(self)
+
+    def __angle_at(self, now):
+        """Угол рукоятки в момент now: поворот с постоянной скоростью от начального угла к целевому"""
+        delta = self.target_angle - self.__start_angle
+        travel = self.HANDLE_SPEED * self.__step * (now - self.__start_time)
+        if travel >= abs(delta):
+            return self.target_angle
+        return self.__start_angle + (travel if delta > 0 else -travel)
+
+    def __handle_geometry(self, angle):
+        """Отрезок и центр набалдашника рукоятки"""
+        ret = self.__handles.get(angle)
+        if ret is not None:
+            return ret
+        a = radians(angle)
+        leg_x = round(self.__radius * sin(a))
+        leg_y = round(self.__radius * cos(a))
+        leg_x1 = round((self.__handle_length + self.__radius) * sin(a))
+        leg_y1 = round((self.__handle_length + self.__radius) * cos(a))
+        line = QLineF(self.x() - leg_x, self.y() - leg_y + self.__arc_offset, self.x() - leg_x1,
+                      self.y() - leg_y1 + self.__arc_offset)
+        ret = line, QPointF(self.x() - leg_x1, self.y() - leg_y1 + self.__arc_offset)
+        if angle in self.angles:
+            self.__handles[angle] = ret
+        return ret
+
     def __draw_handle(self, angle, visible):
         if not visible:
             return
-        angle = np.deg2rad(angle)
-        leg_x = round(self.__radius * np.sin(angle))
-        leg_y = round(self.__radius * np.cos(angle))
-        leg_x1 = round((self.__handle_length + self.__radius) * np.sin(angle))
-        leg_y1 = round((self.__handle_length + self.__radius) * np.cos(angle))
+        line, center = self.__handle_geometry(angle)
 
         self.__qp.setPen(QPen(QColor(0, 0, 0), int(self.__scale * 25)))
         self.__qp.setBrush(QColor(0, 0, 0, alpha=0))
-        self.__qp.drawLine(self.x() - leg_x, self.y() - leg_y + self.__arc_offset, self.x() - leg_x1,
-                         self.y() - leg_y1 + self.__arc_offset)
+        self.__qp.drawLine(line)
         self.__qp.setBrush(QColor(0, 0, 0))
-
-        center = QPointF(self.x() - leg_x1, self.y() - leg_y1 + self.__arc_offset)
         self.__qp.drawEllipse(center, int(75 * self.__scale/2), int(75 * self.__scale/2))
 
-    def __draw_animated_handle(self, pos):
-        if pos > 0 and pos != self.__position:
-            self.target_angle = self.angles[pos - 1]
-            self.__position = pos
-            self.visible = True
-        elif pos == 0:
-            self.target_angle = self.angles[3]
-            self.current_angle = self.target_angle
-            self.__position = pos
-
-        if pos == 0:
-            if self.__blink_tmr.expired():
-                self.__blink_tmr.restart()
-                self.visible = not self.visible
+    def __invalidate_static_layer(self):
+        self.__static_layer = None
+        self.__handles.clear()
+        self.__clock.mark_dirty(self)
 
-        self.__draw_handle(self.current_angle, self.visible)
-        if self.target_angle < self.current_angle - 1:
-            self.current_angle -= self.__step / 5
-        elif self.target_angle > self.current_angle + 1:
-            self.current_angle += self.__step / 5
-
-    def __redraw(self):
-        self.__qp.begin(self)
-        self.__qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+    def __render_static_layer(self):
+        dpr = self.devicePixelRatioF()
+        pixmap = QPixmap(round(self.width() * dpr), round(self.height() * dpr))
+        pixmap.setDevicePixelRatio(dpr)
+        pixmap.fill(Qt.GlobalColor.transparent)
 
-        self.__draw_animated_handle(self.__new_position)
-
-        self.__qp.setPen(QPen(QColor(0, 0, 0), int(self.__scale) * 2))
+        qp = QPainter(pixmap)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
 
         x = self.x() - int(self.__scale * 170)
         y = int(self.y() - 2 * self.__arc_offset - 10 * self.__scale)
         w = 2 * int(self.__scale * 170)
         h = 6 * self.height()
 
-        point = QPointF(x, y)
-
-        path = QPainterPath(point)
-        boundingRect = QRectF(x, y, w, h)
-        path.moveTo(boundingRect.center())
-        path.arcTo(boundingRect, 20, 150)
+        path = QPainterPath(QPointF(x, y))
+        bounding_rect = QRectF(x, y, w, h)
+        path.moveTo(bounding_rect.center())
+        path.arcTo(bounding_rect, 20, 150)
         path.closeSubpath()
-        self.__qp.setPen(QPen(QColor(0, 0, 0), 3))
-        self.__qp.setBrush(QColor(255, 255, 255))
-        self.__qp.drawPath(path)
+        qp.setPen(QPen(QColor(0, 0, 0), 3))
+        qp.setBrush(QColor(255, 255, 255))
+        qp.drawPath(path)
+
+        qp.setBrush(QColor(0, 0, 0))
+        qp.drawRoundedRect(self.x() - int(self.__scale * 170), self.y() - self.height(), 2 * int(self.__scale * 170),
+                           int(2.3 * self.height()), 10, 10)
+        for angle in self.angles:
+            a = radians(angle)
+            leg_x = round(self.__radius * sin(a))
+            leg_y = round(self.__radius * cos(a))
+            leg_x1 = round((self.__radius - 10 * self.__scale) * sin(a))
+            leg_y1 = round((self.__radius - 10 * self.__scale) * cos(a))
+            qp.drawLine(self.x() - leg_x, self.y() + self.__arc_offset - leg_y, self.x() - leg_x1,
+                        self.y() + self.__arc_offset - leg_y1)
+        qp.end()
+        return pixmap
 
-        self.__qp.setBrush(QColor(0, 0, 0))
-        self.__qp.drawRoundedRect(self.x() - int(self.__scale * 170), self.y() - self.height(), 2 * int(self.__scale * 170), int(2.3 * self.height()),
-                                10, 10)
-        for i in range(7):
-            angle = np.deg2rad(self.angles[i])
-            leg_x = round(self.__radius * np.sin(angle))
-            leg_y = round(self.__radius * np.cos(angle))
-            leg_x1 = round((self.__radius - 10 * self.__scale) * np.sin(angle))
-            leg_y1 = round((self.__radius - 10 * self.__scale) * np.cos(angle))
-            self.__qp.drawLine(self.x() - leg_x, self.y() + self.__arc_offset - leg_y, self.x() - leg_x1,
-                             self.y() + self.__arc_offset - leg_y1)
+    def __redraw(self):
+        if self.__static_layer is None or self.__static_layer.devicePixelRatio() != self.devicePixelRatioF():
+            self.__static_layer = self.__render_static_layer()
+        self.current_angle = self.__angle_at(monotonic())
+
+        self.__qp.begin(self)
+        self.__qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # корпус перекрывает основание рукоятки
+        self.__draw_handle(self.current_angle, self.visible)
+        self.__qp.drawPixmap(0, 0, self.__static_layer)
 
         self.__qp.setPen(QColor(255, 255, 255))
-        self.__qp.setFont(QFont("consolas", int(60 * self.__scale)))
+        self.__qp.setFont(text_cache.font("consolas", int(60 * self.__scale)))
         self.__qp.drawText(self.x() - int(self.__scale * 170), self.y() - self.height(), 2 * int(self.__scale * 170),
-                         int(2.3 * self.height()), Qt.AlignmentFlag.AlignCenter, self.pos_to_str(self.__new_position))
+                           int(2.3 * self.height()), Qt.AlignmentFlag.AlignCenter, self.pos_to_str(self.__new_position))
         self.__qp.end()
@@ -0,0 +1,95 @@
+from PyQt6.QtGui import QColor, QPen, QBrush
+
+
+def _with_alpha(color: QColor, alpha: int) -> QColor:
+    ret = QColor(color)
+    ret.setAlpha(alpha)
+    return ret
+
+
+class Palette:
+    """Неизменяемый набор заранее созданных цветов, перьев и кистей для одной темы.
+    Виджеты при смене темы только переключают ссылку на палитру"""
+
+    __palettes = dict()
+
+    def __init__(self, dark: bool):
+        p = self.__dict__
+        p["dark"] = dark
+
+        # общие
+        p["transparent"] = QColor(0, 0, 0, 0)
+        p["transparent_pen"] = QPen(QColor(0, 0, 0, 0))
+        p["transparent_brush"] = QBrush(QColor(255, 255, 255, 0))
+        p["black"] = QColor(0, 0, 0)
+        p["black_pen"] = QPen(QColor(0, 0, 0), 1)
+        p["black_pen_2"] = QPen(QColor(0, 0, 0), 2)
+        p["black_brush"] = QBrush(QColor(0, 0, 0))
+        p["text"] = QColor(255, 255, 255) if dark else QColor(0, 0, 0)
+        p["text_pen"] = QPen(p["text"], 1)
+        p["dim_text_pen"] = QPen(QColor(128, 128, 128) if dark else QColor(0, 0, 0), 1)
+        p["error_pen"] = QPen(QColor(255, 0, 0), 1)
+        p["inactive"] = QColor(128, 128, 128)
+        p["inactive_pen"] = QPen(QColor(128, 128, 128), 1)
+        p["fault_indicator"] = QColor(255, 0, 0)
+        p["panel_brush"] = QBrush(QColor(45, 52, 65) if dark else QColor(255, 255, 255))
+
+        # состояния: вкл / выкл / авария
+        p["on"] = QColor(6, 214, 160) if dark else QColor(0, 176, 0)
+        p["off"] = QColor(255, 209, 108) if dark else QColor(230, 230, 0)
+        p["fault"] = QColor(229, 89, 52) if dark else QColor(255, 0, 0)
+
+        # ValueWidget
+        p["value_bar"] = QColor(86, 114, 179, 250) if dark else QColor(45, 154, 254, 200)
+        p["value_ref_pen"] = QPen(QColor(6, 214, 160), 2)
+        p["value_zero_pen"] = QPen(QColor(150, 150, 150), 1)
+
+        # PointerDevice
+        p["scale_pen"] = QPen(QColor(128, 128, 128) if dark else QColor(0, 0, 0), 2)
+        p["needle"] = QColor(233, 96, 79) if dark else QColor(255, 0, 0)
+        p["second_needle"] = QColor(86, 114, 179) if dark else QColor(0, 0, 255)
+
+        # Diagram
+        p["diagram"] = QColor(210, 210, 210) if dark else QColor(0, 0, 0)
+        p["legend_brush"] = QBrush(QColor(200, 200, 200, 100))
+
+        # Relay и Valve: кисть по (состояние, под курсором, нажат)
+        relay_colors = (p["off"], p["on"], p["fault"])
+        p["relay_pens"] = tuple(QPen(c if dark else QColor(0, 0, 0), 1) for c in relay_colors)
+        p["relay_brushes"] = self.__interactive_brushes(relay_colors, 90, 200)
+
+        valve_colors = (QColor(255, 255, 255, 0), p["off"], p["on"], p["fault"])
+        valve_pens = [QPen(c if dark else QColor(0, 0, 0), 1) for c in valve_colors]
+        valve_pens[0] = QPen(QColor(128, 128, 128) if dark else QColor(0, 0, 0), 1)
+        p["valve_pens"] = tuple(valve_pens)
+        valve_brushes = list(self.__interactive_brushes(valve_colors, 128, 255))
+        # закрытый клапан не заливается
+        valve_brushes[0] = {key: p["transparent_brush"] for key in valve_brushes[0]}
+        p["valve_brushes"] = tuple(valve_brushes)
+        p["valve_arrow_pen"] = p["dim_text_pen"]
+
+        p["control_pens"] = (QPen(p["off"], 1), QPen(p["on"], 1))
+        p["control_brushes"] = (QBrush(p["off"]), QBrush(p["on"]))
+
+    @staticmethod
+    def __interactive_brushes(colors, alpha, hover_alpha):
+        ret = list()
+        for color in colors:
+            variants = dict()
+            for hover in (False, True):
+                base = _with_alpha(color, hover_alpha if hover else alpha)
+                variants[hover, False] = QBrush(base)
+                variants[hover, True] = QBrush(base.lighter(120))
+            ret.append(variants)
+        return tuple(ret)
+
+    def __setattr__(self, key, value):
+        raise AttributeError("Palette is immutable")
+
+    @classmethod
+    def get(cls, dark: bool) -> "Palette":
+        ret = cls.__palettes.get(dark)
+        if ret is None:
+            ret = cls(dark)
+            cls.__palettes[dark] = ret
+        return ret
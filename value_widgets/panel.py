@@ -0,0 +1,249 @@
+"""Загрузка мнемосхемы из описания JSON или TOML.
+
+    {
+        "pages": [
+            {"name": "Насосная", "width": 1600, "height": 900, "widgets": [
+                {"class": "ValueWidget", "x": 10, "y": 10, "w": 260, "h": 60,
+                 "label": "P1", "units": "МПа", "min": 0, "max": 1.6, "color": "#2a9d8f", "tag": "P1"},
+                {"class": "StateWidget", "x": 300, "y": 10, "w": 100, "h": 30, "tag": "pump1",
+                 "setup": [["add_state", "Стоп", 0, "grey"], ["add_state", "Работа", 1, "green"]]}
+            ]}
+        ]
+    }
+
+Ключи x, y, w, h, label, units, min, max, color, begin, end переводятся в аргументы конструктора
+конкретного класса, остальные ключи передаются конструктору как есть. setup - вызовы методов
+после создания, tag - привязка к WidgetGroup (setter - имя метода установки значения), id - имя
+для Panel.widget(). Один тег может стоять у нескольких виджетов на одной или разных страницах:
+в группе он привязан один раз, значение раздаёт панель.
+
+Виджеты страницы создаются при первом её показе (или заранее в простое, см. prewarm) с
+отключёнными обновлениями, так что страница появляется одним проходом компоновки и отрисовки.
+"""
+import json
+import os
+import tomllib
+from importlib import import_module
+from time import perf_counter
+
+from PyQt6.QtCore import Qt, QTimer, pyqtSlot as Slot
+from PyQt6.QtWidgets import QStackedWidget, QWidget
+
+from .widget_group import resolve_setter
+
+
+# общие ключи описания -> аргументы конструкторов
+_ARGUMENTS = {
+    "ValueWidget": {"w": "w", "h": "h", "label": "label", "units": "units", "min": "min_val", "max": "max_val",
+                    "color": "color"},
+    "PointerDevice": {"w": "d", "label": "label", "units": "units", "min": "min_value", "max": "max_value"},
+    "Relay": {"w": "w", "h": "h", "label": "label"},
+    "Valve": {"w": "size_x", "h": "size_y", "label": "label"},
+    "StateWidget": {"w": "w", "h": "h"},
+    "ErrorWidget": {"label": "error_name"},
+    "Diagram": {"w": "w", "h": "h"},
+    "StripChart": {"w": "w", "h": "h"},
+    "KKM": {},
+    "TimerWidget": {"label": "name", "units": "units", "begin": "begin_value", "end": "end_value"},
+}
+
+# ключи описания, которые не передаются конструктору
+_SERVICE_KEYS = ("class", "x", "y", "tag", "setter", "setup", "id")
+
+# бюджет одного шага предварительного создания в простое, мс
+PREWARM_BUDGET = 8
+
+
+def read_description(path) -> dict:
+    """Читает описание панели; формат определяется по расширению (.toml или .json)"""
+    if os.path.splitext(path)[1].lower() == ".toml":
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _Page(QWidget):
+    """Страница панели; виджеты создаются при первом показе.
+    Пока страница скрыта, последние значения тегов запоминаются и применяются при показе;
+    виджеты с DEFER_HIDDEN_VALUES = False получают значения сразу"""
+
+    def __init__(self, panel, description):
+        super().__init__()
+        self.__panel = panel
+        self.name = description.get("name", "")
+        self.specs = description.get("widgets", [])
+        self.built = 0
+        # последние значения тегов, пришедшие, пока страница скрыта: тег -> (значение, время)
+        self.values = dict()
+        # привязки созданных виджетов: тег -> [(setter, timestamped, получает значения скрытым)]
+        self.bindings = dict()
+        if "width" in description and "height" in description:
+            self.setMinimumSize(description["width"], description["height"])
+
+    @property
+    def complete(self) -> bool:
+        return self.built == len(self.specs)
+
+    def bind(self, tag, widget, setter):
+        setter, timestamped = resolve_setter(widget, setter)
+        binding = (setter, timestamped, not getattr(widget, "DEFER_HIDDEN_VALUES", True))
+        self.bindings.setdefault(tag, list()).append(binding)
+        if tag in self.values:
+            # значение, пришедшее до создания виджета
+            self.__apply(binding, *self.values[tag])
+
+    @staticmethod
+    def __apply(binding, value, timestamp):
+        setter, timestamped, _ = binding
+        if timestamped:
+            setter(value, timestamp)
+        else:
+            setter(value)
+
+    def set_value(self, tag, value, timestamp):
+        if self.isVisible():
+            for binding in self.bindings.get(tag, ()):
+                self.__apply(binding, value, timestamp)
+            return
+        self.values[tag] = (value, timestamp)
+        for binding in self.bindings.get(tag, ()):
+            if binding[2]:
+                self.__apply(binding, value, timestamp)
+
+    def showEvent(self, a0):
+        if not self.complete:
+            self.__panel.build_page(self.name)
+        # событие Show приходит до первой перерисовки страницы
+        values = self.values
+        self.values = dict()
+        for tag, (value, timestamp) in values.items():
+            for binding in self.bindings.get(tag, ()):
+                if not binding[2]:
+                    self.__apply(binding, value, timestamp)
+        super().showEvent(a0)
+
+
+class Panel(QStackedWidget):
+    """Многостраничная мнемосхема, построенная по описанию (см. модуль).
+    group - WidgetGroup для привязки тегов; слоты выдаются в порядке первого появления тега в описании
+    сразу при загрузке, поэтому не зависят от того, какие страницы уже созданы"""
+
+    def __init__(self, description: dict, parent=None, group=None):
+        super().__init__(parent)
+        self.__group = group
+        self.__pages = dict()
+        self.__widgets = dict()
+        self.__build_time = 0.0
+        self.__n_built = 0
+
+        self.__prewarm_tmr = QTimer(self)
+        self.__prewarm_tmr.setInterval(0)
+        self.__prewarm_tmr.timeout.connect(self.__prewarm_step)
+        self.__prewarm_budget = PREWARM_BUDGET / 1000
+
+        # тег -> страницы, на которых он есть
+        tag_pages = dict()
+        for i, page_description in enumerate(description.get("pages", [])):
+            page_description.setdefault("name", str(i))
+            page = _Page(self, page_description)
+            self.__pages[page.name] = page
+            self.addWidget(page)
+            for spec in page.specs:
+                tag = spec.get("tag")
+                if tag is not None and page not in tag_pages.setdefault(tag, list()):
+                    tag_pages[tag].append(page)
+        if group is not None:
+            for tag, pages in tag_pages.items():
+                # в группе тег привязан один раз к панели; отметка времени передаётся виджетам, которые её принимают
+                group.bind(tag, self, lambda v, t, pages=pages, tag=tag: self.__dispatch(pages, tag, v, t),
+                           defer_hidden=False, timestamped=True)
+
+    @staticmethod
+    def __dispatch(pages, tag, value, timestamp):
+        for page in pages:
+            page.set_value(tag, value, timestamp)
+
+    @classmethod
+    def load(cls, path, parent=None, group=None) -> "Panel":
+        return cls(read_description(path), parent, group)
+
+    def page_names(self) -> list:
+        return list(self.__pages)
+
+    def page(self, name) -> QWidget:
+        return self.__pages[name]
+
+    def show_page(self, name):
+        self.setCurrentWidget(self.__pages[name])
+
+    def widget(self, widget_id):
+        """Виджет по id из описания; None - страница с ним ещё не создана"""
+        return self.__widgets.get(widget_id)
+
+    def build_page(self, name):
+        """Создаёт все оставшиеся виджеты страницы"""
+        self.__build(self.__pages[name], None)
+
+    def prewarm(self, budget: int = PREWARM_BUDGET):
+        """Создаёт виджеты непоказанных страниц в простое, порциями не дольше budget мс"""
+        self.__prewarm_budget = budget / 1000
+        self.__prewarm_tmr.start()
+
+    def stop_prewarm(self):
+        self.__prewarm_tmr.stop()
+
+    @Slot()
+    def __prewarm_step(self):
+        for page in self.__pages.values():
+            if not page.complete:
+                self.__build(page, perf_counter() + self.__prewarm_budget)
+                return
+        self.__prewarm_tmr.stop()
+
+    def __build(self, page, deadline):
+        t0 = perf_counter()
+        # обновления страницы отключены, пока создаются виджеты: show() и setGeometry в конструкторах
+        # не вызывают перерисовок, страница отрисуется один раз после включения
+        updates = page.updatesEnabled()
+        page.setUpdatesEnabled(False)
+        try:
+            while not page.complete:
+                self.__create(page, page.specs[page.built])
+                page.built += 1
+                if deadline is not None and perf_counter() >= deadline:
+                    break
+        finally:
+            page.setUpdatesEnabled(updates)
+        self.__build_time += perf_counter() - t0
+
+    def __create(self, page, spec):
+        cls_name = spec["class"]
+        # классы берутся из пакета: его __getattr__ загрузит модуль виджета при первом обращении
+        cls = getattr(import_module(__package__), cls_name)
+        names = _ARGUMENTS.get(cls_name, {})
+        kwargs = {names.get(key, key): value for key, value in spec.items() if key not in _SERVICE_KEYS}
+        widget = cls(page, spec["x"], spec["y"], **kwargs)
+
+        for call in spec.get("setup", []):
+            getattr(widget, call[0])(*call[1:])
+        if not widget.testAttribute(Qt.WidgetAttribute.WA_WState_ExplicitShowHide):
+            # не все виджеты показывают себя в конструкторе, а на уже видимой странице дочерние
+            # виджеты сами не показываются
+            widget.show()
+        if "id" in spec:
+            self.__widgets[spec["id"]] = widget
+        tag = spec.get("tag")
+        if tag is not None and self.__group is not None:
+            page.bind(tag, widget, spec.get("setter"))
+        self.__n_built += 1
+
+    def stats(self) -> dict:
+        """build_time - суммарное время создания виджетов, с"""
+        return {
+            "pages": len(self.__pages),
+            "pages_built": sum(page.complete for page in self.__pages.values()),
+            "widgets": sum(len(page.specs) for page in self.__pages.values()),
+            "widgets_built": self.__n_built,
+            "build_time": self.__build_time,
+        }
@@ -1,9 +1,27 @@
-from PyQt6.QtGui import QPainter, QColor, QFont, QPen, QFontMetrics
-from PyQt6.QtCore import Qt, QRectF, QLineF, QTimer, pyqtSlot as Slot
+from collections import OrderedDict, namedtuple
+
+from PyQt6.QtGui import QPainter, QPen, QFontMetrics, QPixmap, QImage
+from PyQt6.QtCore import Qt, QRectF, QLineF
 from PyQt6.QtWidgets import QWidget
-import numpy as np
-from math import sin, cos, radians, pi, sqrt
-from .utils import is_app_dark
+from math import sin, cos, radians, pi, sqrt, ceil
+from .frame_clock import FrameClock
+from .theme import ThemeService
+from .palette import Palette
+from . import text_cache
+
+
+# общий кэш шкал: приборы с одинаковой конфигурацией используют одно изображение
+_DIAL_CACHE_SIZE = 64
+_dial_cache = OrderedDict()
+
+# шаг квантования положения конца стрелки, доли физического пикселя
+_NEEDLE_SUBPIXEL = 4
+
+# оформление прибора, снятое в потоке GUI: шкала и стрелки (и в RenderPool) рисуются только по нему
+_Dial = namedtuple("_Dial", ("d", "R", "offset", "min_val", "max_val", "real_width", "start_angle", "stop_angle",
+                             "start_radians", "angle", "major_step", "minor_step", "display_nums", "frame",
+                             "draw_arc", "dark", "label", "unit", "n_digits", "second_needle", "palette",
+                             "needle_pens"))
 
 
 class PointerDevice(QWidget):
@@ -36,16 +54,29 @@ class PointerDevice(QWidget):
         self.__qp = QPainter()
 
         self.__dark = dark
+        self.__palette = Palette.get(dark)
+        self.__needle_pens = None
+        self.__update_needle_pens()
 
         self.__label = label
         self.__unit = units
         self.__n_digits = 3
 
-        self.__redraw_required = True
+        self.__dial = None
+        self.__dial_dpr = 0.0
+        self.__config = None
+        # потоковая отрисовка: двойной буфер кадров и шкала в QImage, которую меняет только RenderPool
+        self.__face = None
+        self.__dial_image = None
+        self.__dial_image_key = None
+
+        # видимое состояние (положение стрелок и текст); перерисовка только при его изменении
+        self.__visual_state = None
+        self.__suppressed_updates = 0
 
-        self.__tmr = QTimer(self)
-        self.__tmr.timeout.connect(self.__redraw_process)
-        self.__tmr.start(redraw_period)
+        self.__clock = FrameClock.instance()
+        self.__clock.register(self, redraw_period)
+        ThemeService.instance().register(self)
 
         self.show()
 
@@ -55,237 +86,322 @@ class PointerDevice(QWidget):
         self.__y = y
         self.__d = d
         self.__R = d / 2
+        self.__invalidate_dial()
 
     def set_dark(self, dark: bool):
-        self.__dark = dark
-
-    @Slot()
-    def __redraw_process(self):
-        if self.__dark != is_app_dark():
-            self.set_dark(is_app_dark())
-            self.__redraw_required = True
-        if self.__redraw_required:
-            self.update()
-            self.__redraw_required = False
+        if self.__dark != dark:
+            self.__dark = dark
+            self.__palette = Palette.get(dark)
+            self.__update_needle_pens()
+            self.__invalidate_dial()
+
+    def __update_needle_pens(self):
+        self.__needle_pens = (QPen(self.__palette.needle, self.__needle_width),
+                              QPen(self.__palette.second_needle, self.__needle_width))
+
+    def __invalidate_dial(self):
+        self.__dial = None
+        self.__config = None
+        self.__visual_state = None
+        if self.__face is not None:
+            self.__face.invalidate()
+        self.__clock.mark_dirty(self)
 
     def set_major_step(self, step: float):
         self.__major_step = step
+        self.__invalidate_dial()
 
     def set_minor_step(self, step: float):
         self.__minor_step = step
+        self.__invalidate_dial()
 
     def draw_frame(self, draw: bool):
         self.__frame = draw
+        self.__invalidate_dial()
 
     def draw_arc(self, draw: bool):
         self.__draw_arc = draw
+        self.__invalidate_dial()
 
     def display_value(self, display: bool):
         self.__display_nums = display
-
-    def __value_to_angle(self, val: float):
-        return radians((val - self.__min_val) / self.__real_width * self.__angle + self.__start_angle + 135)
-
-    def __angle_to_coords_with_offset(self, angle: float, offset: int):
+        self.__invalidate_dial()
+
+    def __dial_config(self) -> _Dial:
+        if self.__config is None:
+            self.__config = _Dial(self.__d, self.__R, self.__offset, self.__min_val, self.__max_val, self.__real_width,
+                                  self.__start_angle, self.__stop_angle, self.__start_radians, self.__angle,
+                                  self.__major_step, self.__minor_step, self.__display_nums, self.__frame,
+                                  self.__draw_arc, self.__dark, self.__label, self.__unit, self.__n_digits,
+                                  self.__second_needle, self.__palette, self.__needle_pens)
+        return self.__config
+
+    @staticmethod
+    def __value_to_angle(c, val: float):
+        return radians((val - c.min_val) / c.real_width * c.angle + c.start_angle + 135)
+
+    @staticmethod
+    def __angle_to_coords_with_offset(c, angle: float, offset: int):
         coords = [0.0, 0.0]
-        tmp = -(self.__R - offset)
-        coords[0] = tmp * sin(angle + self.__start_radians) + self.__R + self.__offset
-        coords[1] = tmp * cos(angle + self.__start_radians) + self.__R + self.__offset
+        tmp = -(c.R - offset)
+        coords[0] = tmp * sin(angle + c.start_radians) + c.R + c.offset
+        coords[1] = tmp * cos(angle + c.start_radians) + c.R + c.offset
         return coords
 
-    def __draw_frame(self):
-        if self.__dark:
-            self.__qp.setBrush(QColor(45, 52, 65))
-        else:
-            self.__qp.setBrush(QColor(255, 255, 255))
-        pen = QPen(QColor(0, 0, 0, 0))
-        self.__qp.setPen(pen)
-        self.__qp.drawEllipse(QRectF(self.__x - 1.3 * self.__d / 2, self.__y - 1.3 * self.__d / 2, 1.3*self.__d, 1.3*self.__d))
-
-    def __draw_scale(self):
-        self.__qp.setBrush(QColor(0, 0, 0))
-        pen = QPen(QColor(0, 0, 0), 1.5)
-        self.__qp.setPen(pen)
+    @staticmethod
+    def __draw_frame(qp, c):
+        qp.setBrush(c.palette.panel_brush)
+        qp.setPen(c.palette.transparent_pen)
+        center = c.offset + c.R
+        qp.drawEllipse(QRectF(center - 1.3 * c.d / 2, center - 1.3 * c.d / 2, 1.3 * c.d, 1.3 * c.d))
 
-        font = QFont('Bahnschrift, Arial', self.__d // 20)
-        self.__qp.setFont(font)
+    def __draw_scale(self, qp, c):
+        qp.setBrush(c.palette.black_brush)
 
-        metrics = QFontMetrics(font)
+        font_size = c.d // 20
+        metrics = text_cache.metrics('Bahnschrift, Arial', font_size)
 
         # основные деления
-        X = np.arange(self.__min_val, self.__max_val + self.__major_step, self.__major_step)
+        n_major = ceil((c.max_val + c.major_step - c.min_val) / c.major_step)
+        X = [c.min_val + i * c.major_step for i in range(n_major)]
         lines = list()
 
-        offset_minor = self.__d / 30
-        offset_major = self.__d / 14
-        offset_text = -self.__d / 15
+        offset_minor = c.d / 30
+        offset_major = c.d / 14
+        offset_text = -c.d / 15
 
         for tick in X:
-            for minor_tick_num in range(1, round(self.__major_step / self.__minor_step)):
-                val = tick + minor_tick_num * self.__minor_step
-                if val > self.__max_val or val < self.__min_val:
+            for minor_tick_num in range(1, round(c.major_step / c.minor_step)):
+                val = tick + minor_tick_num * c.minor_step
+                if val > c.max_val or val < c.min_val:
                     break
-                angle = self.__value_to_angle(val)
-                X1 = self.__angle_to_coords_with_offset(angle, 0)
-                X2 = self.__angle_to_coords_with_offset(angle, offset_minor)
+                angle = self.__value_to_angle(c, val)
+                X1 = self.__angle_to_coords_with_offset(c, angle, 0)
+                X2 = self.__angle_to_coords_with_offset(c, angle, offset_minor)
                 lines.append(QLineF(X1[0], X1[1], X2[0], X2[1]))
 
-            angle = self.__value_to_angle(tick)
-            Xtxt = self.__angle_to_coords_with_offset(angle, offset_text)
-            X1 = self.__angle_to_coords_with_offset(angle, 0)
-            X2 = self.__angle_to_coords_with_offset(angle, offset_major)
+            angle = self.__value_to_angle(c, tick)
+            Xtxt = self.__angle_to_coords_with_offset(c, angle, offset_text)
+            X1 = self.__angle_to_coords_with_offset(c, angle, 0)
+            X2 = self.__angle_to_coords_with_offset(c, angle, offset_major)
             rounded_value = round(tick, 2)
             disp = rounded_value if abs(rounded_value) < 10 else round(rounded_value)
-            if self.__display_nums:
-                if self.__dark:
-                    pen = QPen(QColor(255, 255, 255), 2)
-                    self.__qp.setPen(pen)
-                
-                self.__draw_angle_text(f"{disp}", metrics, self.__d / 2, angle - pi / 2 - pi / 4)
+            if c.display_nums:
+                self.__draw_angle_text(qp, c, f"{disp}", metrics, font_size, c.d / 2, angle - pi / 2 - pi / 4)
             lines.append(QLineF(X1[0], X1[1], X2[0], X2[1]))
 
-            if self.__draw_arc:
-                pen = QPen(QColor(0, 0, 0), 2)
-                self.__qp.setPen(pen)
-                self.__qp.drawArc(QRectF(self.__offset + self.__R - self.__d / 2, self.__offset, self.__d, self.__d),
-                                self.__start_angle * 16, (self.__stop_angle - self.__start_angle) * 16)
-
-        if self.__dark:
-            pen = QPen(QColor(128, 128, 128), 2)
-        else:
-            pen = QPen(QColor(0, 0, 0), 2)
-        self.__qp.drawLines(lines)
-
-    def __display_value(self, val):
-        pen = QPen(QColor(0, 0, 0), 1)
-        self.__qp.setPen(pen)
-        val = round(val, 3)
-        if val > self.__max_val or val < self.__min_val:
-            tmp = "Ошибка"
-        else:
-            if (self.__max_val - self.__min_val) < 10:
-                tmp = "{:.3f}".format(val)
-            elif (self.__max_val - self.__min_val) < 100:
-                tmp = "{:.2f}".format(val)
-            else:
-                tmp = "{:.1f}".format(val)
-            if val > 0:
-                tmp = ' ' + tmp
-        self.__qp.setFont(QFont('bahnschrift', self.__d // 12))
-        self.__qp.drawText(int(self.__offset + self.__R - 50), int(self.__offset + self.__R + self.__d // 3.5), 100, 20, Qt.AlignmentFlag.AlignCenter, tmp)
-
-    def __draw_needle(self, val, val2=0.0):
+        qp.setPen(c.palette.scale_pen)
+        if c.draw_arc:
+            qp.drawArc(QRectF(c.offset + c.R - c.d / 2, c.offset, c.d, c.d),
+                              c.start_angle * 16, (c.stop_angle - c.start_angle) * 16)
+        qp.drawLines(lines)
+
+    def __draw_needle(self, qp, c, val, val2=0.0):
+        if c.second_needle:
+            qp.setPen(c.needle_pens[1])
+            tmp_val = min(c.max_val, max(val2, c.min_val))
+            tmp = self.__value_to_angle(c, tmp_val)
+            X1 = self.__angle_to_coords_with_offset(c, tmp, c.d / 27)
+            qp.drawLine(QLineF(c.offset + c.R, c.offset + c.R, X1[0], X1[1]))
+
+        qp.setPen(c.needle_pens[0])
+        tmp_val = min(c.max_val, max(val, c.min_val))
+        tmp = self.__value_to_angle(c, tmp_val)
+        X1 = self.__angle_to_coords_with_offset(c, tmp, c.d / 27)
+
+        qp.drawLine(QLineF(c.offset + c.R, c.offset + c.R, X1[0], X1[1]))
+        qp.setPen(c.palette.black_pen)
+        qp.drawEllipse(QRectF(c.offset + c.R - c.d / 80, c.offset + c.R - c.d / 80, c.d / 40, c.d / 40))
+        if c.display_nums:
+            self.__display_value(qp, c, val)
+
+    def __needle_step(self):
+        r = (self.__R - self.__d / 27) * self.devicePixelRatioF()
+        return 1 / (_NEEDLE_SUBPIXEL * r) if r > 0 else 1.0
+
+    def __visual_key(self):
+        c = self.__dial_config()
+        step = self.__needle_step()
+        angle = self.__value_to_angle(c, min(self.__max_val, max(self.__value, self.__min_val)))
+        angle2 = None
         if self.__second_needle:
-
-            if self.__dark:
-                color = QColor(86, 114, 179)
-            else:
-                color = QColor(0, 0, 255)
-            pen = QPen(color, self.__needle_width)
-            self.__qp.setPen(pen)
-            tmp_val = min(self.__max_val, max(val2, self.__min_val))
-            tmp = self.__value_to_angle(tmp_val)
-            X1 = self.__angle_to_coords_with_offset(tmp, self.__d / 27)
-            self.__qp.drawLine(QLineF(self.__offset + self.__R, self.__offset + self.__R, X1[0], X1[1]))
-
-        color = QColor(255, 0, 0) if not self.__dark else QColor(233, 96, 79)
-        pen = QPen(color, self.__needle_width)
-        self.__qp.setPen(pen)
-        tmp_val = min(self.__max_val, max(val, self.__min_val))
-        tmp = self.__value_to_angle(tmp_val)
-        X1 = self.__angle_to_coords_with_offset(tmp, self.__d / 27)
-
-        self.__qp.drawLine(QLineF(self.__offset + self.__R, self.__offset + self.__R, X1[0], X1[1]))
-        pen = QPen(QColor(0, 0, 0), 1)
-        self.__qp.setPen(pen)
-        self.__qp.drawEllipse(QRectF(self.__offset + self.__R - self.__d / 80, self.__offset + self.__R - self.__d / 80, self.__d / 40, self.__d / 40))
-        if self.__display_nums:
-            self.__display_value(val)
+            angle2 = round(self.__value_to_angle(c, min(self.__max_val, max(self.__second_value, self.__min_val))) / step)
+        text = self.__value_text(c, self.__value) if self.__display_nums else None
+        return round(angle / step), angle2, text
+
+    def __update_visual_state(self):
+        key = self.__visual_key()
+        if key != self.__visual_state:
+            self.__visual_state = key
+            self.__clock.mark_dirty(self)
+        else:
+            self.__suppressed_updates += 1
 
     def set_value(self, val: float):
         if val != self.__value:
             self.__value = val
-            self.__redraw_required = True
+            self.__update_visual_state()
 
     def set_second_value(self, val: float):
-        self.__second_needle = True
+        if not self.__second_needle:
+            self.__second_needle = True
+            self.__config = None
+            self.__visual_state = None
         if val != self.__second_value:
             self.__second_value = val
-            self.__redraw_required = True
+            self.__update_visual_state()
+
+    @property
+    def suppressed_updates(self) -> int:
+        """Число изменений значения, не изменивших изображение прибора"""
+        return self.__suppressed_updates
 
     def paintEvent(self, a0):
-        self.__redraw()
+        if self.__face is None:
+            self.__redraw()
+            return
+        dpr = self.devicePixelRatioF()
+        dial_key = self.__dial_key(dpr)
+        # оформление и значения снимаются в потоке GUI; RenderPool не читает полей виджета
+        config = self.__dial_config()
+        value = self.__value
+        second_value = self.__second_value
+        self.__face.request((self.__visual_key(), dial_key), self.size(), dpr,
+                            lambda image: self.__render_face(image, config, dial_key, value, second_value))
+        self.__qp.begin(self)
+        self.__face.paint(self.__qp)
+        self.__qp.end()
+
+    def set_threaded_rendering(self, enabled: bool):
+        """Потоковая отрисовка: прибор рисуется в RenderPool, paintEvent выводит последний готовый кадр"""
+        if enabled == (self.__face is not None):
+            return
+        # пул потоков загружается только при включении режима
+        from .render_pool import ThreadedFace
+        self.__face = ThreadedFace(self) if enabled else None
+        self.__clock.mark_dirty(self)
+
+    @property
+    def threaded_rendering(self) -> bool:
+        return self.__face is not None
+
+    def __dial_key(self, dpr):
+        return (self.__d, self.__offset, self.__min_val, self.__max_val, self.__major_step, self.__minor_step,
+                self.__display_nums, self.__frame, self.__draw_arc, self.__dark, self.__label, self.__unit, dpr)
+
+    def __render_dial(self, c, dpr, threaded=False):
+        size = round((c.d + c.offset * 2) * dpr)
+        # QPixmap можно создавать только в потоке GUI
+        dial = QImage(size, size, QImage.Format.Format_ARGB32_Premultiplied) if threaded else QPixmap(size, size)
+        dial.setDevicePixelRatio(dpr)
+        dial.fill(Qt.GlobalColor.transparent)
+
+        qp = QPainter(dial)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        if c.frame:
+            self.__draw_frame(qp, c)
+        self.__draw_scale(qp, c)
+        if c.display_nums:
+            self.__draw_captions(qp, c)
+        qp.end()
+        return dial
+
+    def __get_dial(self):
+        dpr = self.devicePixelRatioF()
+        if self.__dial is not None and self.__dial_dpr == dpr:
+            return self.__dial
+
+        key = self.__dial_key(dpr)
+        pixmap = _dial_cache.get(key)
+        if pixmap is None:
+            pixmap = self.__render_dial(self.__dial_config(), dpr)
+            _dial_cache[key] = pixmap
+            if len(_dial_cache) > _DIAL_CACHE_SIZE:
+                _dial_cache.popitem(last=False)
+        else:
+            _dial_cache.move_to_end(key)
+        self.__dial = pixmap
+        self.__dial_dpr = dpr
+        return pixmap
+
+    def __render_face(self, image, config, dial_key, value, second_value):
+        # выполняется в RenderPool: шкала своя, в QImage, и перерисовывается только при смене её ключа
+        if self.__dial_image_key != dial_key:
+            self.__dial_image = self.__render_dial(config, dial_key[-1], threaded=True)
+            self.__dial_image_key = dial_key
+        qp = QPainter(image)
+        qp.drawImage(0, 0, self.__dial_image)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.__draw_needle(qp, config, value, second_value)
+        qp.end()
 
     def __redraw(self):
         if not self.isVisible():
             return
+        dial = self.__get_dial()
         self.__qp.begin(self)
+        self.__qp.drawPixmap(0, 0, dial)
         self.__qp.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
-        if self.__frame:
-            self.__draw_frame()
-        self.__draw_scale()
-        self.__draw_needle(self.__value, self.__second_value)
+        self.__draw_needle(self.__qp, self.__dial_config(), self.__value, self.__second_value)
         self.__qp.end()
 
     def set_n_digits(self, n):
         self.__n_digits = n
-
-    def __display_value(self, val):
-        pen = QPen(QColor(255 if val > self.__max_val else 0, 0, 0), 1)
-        self.__qp.setPen(pen)
-        val = np.round(val, 4)
-        if val > self.__max_val or val < self.__min_val:
-            tmp = "Ошибка"
+        self.__config = None
+        self.__visual_state = None
+        self.__clock.mark_dirty(self)
+
+    @staticmethod
+    def __value_text(c, val):
+        val = round(val, 4)
+        if val > c.max_val or val < c.min_val:
+            return "Ошибка"
+        if (c.max_val - c.min_val) < 10:
+            tmp = f"{{:.{c.n_digits}f}}".format(val)
+        elif (c.max_val - c.min_val) < 100:
+            tmp = "{:.2f}".format(val)
         else:
-            if (self.__max_val - self.__min_val) < 10:
-                tmp = f"{{:.{self.__n_digits}f}}".format(val)
-            elif (self.__max_val - self.__min_val) < 100:
-                tmp = "{:.2f}".format(val)
-            else:
-                tmp = "{:.1f}".format(val)
-            if val > 0:
-                tmp = ' ' + tmp
-        self.__qp.setBrush(QColor(255, 0, 0, alpha=0))
-        self.__qp.setFont(QFont('bahnschrift', self.__d // 14))
-
-        if self.__dark:
-            pen = QPen(QColor(128, 128, 128), 1)
+            tmp = "{:.1f}".format(val)
+        if val > 0:
+            tmp = ' ' + tmp
+        return tmp
+
+    def __display_value(self, qp, c, val):
+        tmp = self.__value_text(c, val)
+        val = round(val, 4)
+        qp.setBrush(c.palette.transparent_brush)
+
+        if c.dark or val <= c.max_val:
+            qp.setPen(c.palette.text_pen)
         else:
-            pen = QPen(QColor(0, 0, 0), 1)
-        self.__qp.setPen(pen)
-        self.__qp.drawText(QRectF(self.__offset + self.__R - 50, self.__offset + self.__R - self.__R / 2, 100, self.__d / 10), Qt.AlignmentFlag.AlignCenter,
-                         f"{self.__unit}")
-
-        if self.__dark:
-            color = QColor(0xFFFFFF)
-        else:
-            color = QColor(255 if val > self.__max_val else 0, 0, 0)
-        pen = QPen(color, 1)
-        self.__qp.setPen(pen)
-        self.__qp.setFont(QFont('cascadia code', self.__d // 16))
-        self.__qp.drawText(QRectF(self.__offset + self.__R - 50, self.__offset + self.__R + self.__d / 5, 100, self.__R / 4), Qt.AlignmentFlag.AlignCenter,
+            qp.setPen(c.palette.error_pen)
+        qp.setFont(text_cache.font('cascadia code', c.d // 16))
+        qp.drawText(QRectF(c.offset + c.R - 50, c.offset + c.R + c.d / 5, 100, c.R / 4), Qt.AlignmentFlag.AlignCenter,
                          f"{tmp}")
 
-        if self.__dark:
-            pen = QPen(QColor(0xFFFFFF), 1)
-        else:
-            pen = QPen(QColor(0), 1)
-        self.__qp.setPen(pen)
-        self.__qp.setFont(QFont('bahnschrift', self.__d // 16))
-        y0 = self.__offset + int(self.__R + self.__d // 2.2)
-        self.__qp.drawText(self.__offset, y0, self.__d, self.__d // 10, Qt.AlignmentFlag.AlignCenter, self.__label)
+    @staticmethod
+    def __draw_captions(qp, c):
+        qp.setPen(c.palette.dim_text_pen)
+        text_cache.draw_static_text(qp, QRectF(c.offset + c.R - 50, c.offset + c.R - c.R / 2, 100, c.d / 10),
+                                    Qt.AlignmentFlag.AlignCenter, f"{c.unit}", 'bahnschrift', c.d // 14)
+
+        qp.setPen(c.palette.text_pen)
+        qp.setFont(text_cache.font('bahnschrift', c.d // 16))
+        y0 = c.offset + int(c.R + c.d // 2.2)
+        qp.drawText(c.offset, y0, c.d, c.d // 10, Qt.AlignmentFlag.AlignCenter, c.label)
 
-    def __draw_angle_text(self, text: str, metrics: QFontMetrics, max_radius: float, angle_radians: float):
+    @staticmethod
+    def __draw_angle_text(qp, c, text: str, metrics: QFontMetrics, font_size: int, max_radius: float, angle_radians: float):
         text_w = metrics.horizontalAdvance(text)
         r = sqrt(0.5 * text_w ** 2 + (0.5 * metrics.height()) ** 2)
         r_center = max_radius + r
-        x_win_center = r_center * cos(angle_radians) + self.width() / 2
-        y_win_center = r_center * sin(-angle_radians) + self.height() / 2
+        # центр шкалы - центр виджета; размеры берутся из оформления, шкала может рисоваться в RenderPool
+        x_win_center = r_center * cos(angle_radians) + c.offset + c.R
+        y_win_center = r_center * sin(-angle_radians) + c.offset + c.R
         rect = QRectF(x_win_center - text_w / 2, y_win_center - metrics.height() / 2, text_w, metrics.height())
 
-        self.__qp.setPen(QColor(0xFFFFFF) if self.__dark else QColor(0))
-        self.__qp.drawText(rect, Qt.AlignmentFlag.AlignCenter, text)
+        qp.setPen(c.palette.text_pen)
+        text_cache.draw_static_text(qp, rect, Qt.AlignmentFlag.AlignCenter, text, 'Bahnschrift, Arial', font_size)
 
     @property
     def value(self):
@@ -0,0 +1,576 @@
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from time import time, monotonic, perf_counter
+
+import numpy as np
+
+from .frame_clock import FrameClock
+
+
+# Формат файла записи (little-endian):
+#   заголовок: _MAGIC, длина метаданных (uint32), метаданные JSON (теги слотов), выравнивание до 8 байт
+#   далее блоки: заголовок блока _CHUNK (магия, вид, n, длина дополнительных данных, t_first, t_last),
+#   затем столбцы time float64[n], value float64[n], slot int32[n], выравнивание до 8 байт, дополнительные
+#   данные с выравниванием до 8 байт. Ключевой блок (KEYFRAME) хранит последние значения всех слотов на момент
+#   t_last; блок TAGS (n = 0) - полный список тегов JSON, когда к группе привязаны новые слоты.
+#   Значения-массивы (Diagram.set_values, set_section) пишутся блоками ARRAYS: элементы всех массивов подряд
+#   в столбцах, а в дополнительных данных - JSON [[слот, форма, время], ...] в том же порядке;
+#   ARRAY_KEYFRAME - последние массивы всех слотов на момент t_last
+_MAGIC = b"VWREC\x00\x01\x00"
+_CHUNK = struct.Struct("<4sIIIdd")
+_CHUNK_MAGIC = b"VWCH"
+
+DATA = 0
+KEYFRAME = 1
+TAGS = 2
+ARRAYS = 3
+ARRAY_KEYFRAME = 4
+
+# значения, которые пишутся в столбцы как есть; остальные - как массивы
+_SCALARS = (int, float, np.number, np.bool_)
+
+# файл растёт шагами, чтобы не пересоздавать отображение на каждый блок
+_GROW_STEP = 16 << 20
+
+
+def _align8(n):
+    return (n + 7) & ~7
+
+
+class Recorder:
+    """Запись изменений значений WidgetGroup в файл, отображаемый в память (только дописывание).
+    Изменения копятся в памяти и сбрасываются блоками по chunk_size записей (или не реже flush_interval с);
+    каждые keyframe_interval секунд пишется ключевой блок с полным состоянием для быстрого перехода.
+    Слоты, привязанные к группе после создания Recorder, добавляются в запись блоком TAGS.
+    Значения-массивы (например, матрица Diagram) записываются целиком при каждом изменении;
+    значения, которые нельзя привести к массиву чисел, пропускаются (stats()["skipped"])"""
+
+    def __init__(self, path, group, chunk_size=4096, keyframe_interval=10.0, flush_interval=1.0):
+        self.__path = path
+        self.__group = group
+        self.__chunk_size = chunk_size
+        self.__keyframe_interval = keyframe_interval
+        self.__flush_interval = flush_interval
+
+        tags = group.tags()
+        self.__last = [None] * len(tags)
+        self.__n_tags = len(tags)
+        self.__times = list()
+        self.__values = list()
+        self.__slots = list()
+        # значения-массивы: последние по слотам и ожидающие записи (время, слот, массив)
+        self.__last_arrays = dict()
+        self.__arrays = list()
+        self.__chunk_started = 0.0
+        self.__last_keyframe = None
+
+        meta = json.dumps({"tags": tags}).encode()
+        header = _MAGIC + struct.pack("<I", len(meta)) + meta
+        header += b"\x00" * (_align8(len(header)) - len(header))
+
+        self.__fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self.__size = _GROW_STEP
+        os.ftruncate(self.__fd, self.__size)
+        self.__mm = mmap.mmap(self.__fd, self.__size)
+        self.__mm[:len(header)] = header
+        self.__used = len(header)
+
+        self.__recording = False
+        self.__changes = 0
+        self.__chunks = 0
+        self.__keyframes = 0
+        self.__skipped = 0
+        self.__cost = 0.0
+
+    def start(self):
+        if not self.__recording:
+            self.__recording = True
+            self.__group.add_listener(self.__on_changes)
+
+    def stop(self):
+        if self.__recording:
+            self.__recording = False
+            self.__group.remove_listener(self.__on_changes)
+            self.flush()
+
+    @property
+    def recording(self) -> bool:
+        return self.__recording
+
+    def __on_changes(self, changes: dict):
+        t0 = perf_counter()
+        now = time()
+        last = self.__last
+        times = self.__times
+        values = self.__values
+        slots = self.__slots
+        n = len(times)
+        n_arrays = len(self.__arrays)
+        for slot, value in changes.items():
+            if slot >= len(last):
+                # слот привязан к группе после создания Recorder
+                last.extend([None] * (slot + 1 - len(last)))
+            if not isinstance(value, _SCALARS):
+                # в кадре FrameClock ошибка не выбрасывается: такое значение только пропускается
+                try:
+                    self.__add_array(now, slot, value)
+                except (TypeError, ValueError):
+                    self.__skipped += 1
+                continue
+            if last[slot] != value:
+                last[slot] = value
+                slots.append(slot)
+                values.append(value)
+        added = len(slots) - n
+        if added:
+            times.extend([now] * added)
+        added += len(self.__arrays) - n_arrays
+        if added:
+            self.__changes += added
+            if n == 0 and n_arrays == 0:
+                self.__chunk_started = now
+            if (len(times) + len(self.__arrays) >= self.__chunk_size
+                    or now - self.__chunk_started >= self.__flush_interval):
+                self.flush()
+        self.__cost += perf_counter() - t0
+
+    def __add_array(self, timestamp, slot, value) -> bool:
+        """Запоминает значение-массив, если оно изменилось; False - не изменилось"""
+        # копия: вызывающий может изменить свой массив после передачи
+        array = np.array(value, dtype=np.float64)
+        prev = self.__last_arrays.get(slot)
+        if prev is not None and prev.shape == array.shape and np.array_equal(prev, array):
+            return False
+        self.__last_arrays[slot] = array
+        self.__arrays.append((timestamp, slot, array))
+        return True
+
+    def record(self, slot: int, value, timestamp: float | None = None):
+        """Записывает значение слота вне WidgetGroup (например, в обработчике ввода оператора);
+        value - число или массив чисел (TypeError/ValueError, если его нельзя привести к массиву)"""
+        if slot >= len(self.__last):
+            n_slots = len(self.__group.tags())
+            if not 0 <= slot < n_slots:
+                raise IndexError(f"Slot {slot} is not bound to the group")
+            self.__last.extend([None] * (n_slots - len(self.__last)))
+        timestamp = time() if timestamp is None else timestamp
+        if not self.__times and not self.__arrays:
+            self.__chunk_started = timestamp
+        if isinstance(value, _SCALARS):
+            self.__last[slot] = value
+            self.__times.append(timestamp)
+            self.__values.append(value)
+            self.__slots.append(slot)
+        elif not self.__add_array(timestamp, slot, value):
+            return
+        self.__changes += 1
+        if len(self.__times) + len(self.__arrays) >= self.__chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Сбрасывает накопленные изменения блоком и при необходимости пишет ключевой блок"""
+        if not self.__times and not self.__arrays:
+            return
+        if len(self.__last) > self.__n_tags:
+            # теги новых слотов должны попасть в файл раньше их значений
+            tags = self.__group.tags()
+            self.__write_chunk(TAGS, np.empty(0), np.empty(0), np.empty(0, dtype=np.int32),
+                               json.dumps({"tags": tags}).encode())
+            self.__n_tags = len(tags)
+        t = None
+        if self.__times:
+            times = np.array(self.__times, dtype=np.float64)
+            self.__write_chunk(DATA, times, np.array(self.__values, dtype=np.float64),
+                               np.array(self.__slots, dtype=np.int32))
+            self.__times = list()
+            self.__values = list()
+            self.__slots = list()
+            t = float(times[-1])
+        if self.__arrays:
+            self.__write_arrays(ARRAYS, self.__arrays)
+            t = self.__arrays[-1][0] if t is None else max(t, self.__arrays[-1][0])
+            self.__arrays = list()
+
+        if self.__last_keyframe is None or t - self.__last_keyframe >= self.__keyframe_interval:
+            self.__write_keyframe(t)
+
+    def __write_keyframe(self, t):
+        slots = [i for i, v in enumerate(self.__last) if v is not None]
+        values = np.array([float(self.__last[i]) for i in slots], dtype=np.float64)
+        self.__write_chunk(KEYFRAME, np.full(len(slots), t), values, np.array(slots, dtype=np.int32))
+        if self.__last_arrays:
+            self.__write_arrays(ARRAY_KEYFRAME, [(t, slot, array) for slot, array in self.__last_arrays.items()])
+        self.__last_keyframe = t
+        self.__keyframes += 1
+
+    def __write_arrays(self, kind, entries):
+        times = np.concatenate([np.full(array.size, t) for t, _, array in entries])
+        values = np.concatenate([array.ravel() for _, _, array in entries])
+        slots = np.concatenate([np.full(array.size, slot, dtype=np.int32) for _, slot, array in entries])
+        layout = json.dumps([[slot, list(array.shape), t] for t, slot, array in entries]).encode()
+        self.__write_chunk(kind, times, values, slots, layout, (entries[0][0], entries[-1][0]))
+
+    def __write_chunk(self, kind, times, values, slots, extra=b"", t_range=None):
+        n = times.shape[0]
+        if t_range is None:
+            t_range = (float(times[0]), float(times[-1])) if n else (0.0, 0.0)
+        header = _CHUNK.pack(_CHUNK_MAGIC, kind, n, len(extra), *t_range)
+        size = _CHUNK.size + n * 16 + _align8(n * 4) + _align8(len(extra))
+        if self.__used + size > self.__size:
+            self.__size += max(_GROW_STEP, size)
+            os.ftruncate(self.__fd, self.__size)
+            self.__mm.resize(self.__size)
+        pos = self.__used
+        mm = self.__mm
+        # сначала столбцы, затем заголовок: прерванная запись не даёт читателю неполный блок
+        data_pos = pos + _CHUNK.size
+        mm[data_pos:data_pos + n * 8] = times.tobytes()
+        mm[data_pos + n * 8:data_pos + n * 16] = values.tobytes()
+        mm[data_pos + n * 16:data_pos + n * 20] = slots.tobytes()
+        if extra:
+            extra_pos = data_pos + n * 16 + _align8(n * 4)
+            mm[extra_pos:extra_pos + len(extra)] = extra
+        mm[pos:pos + _CHUNK.size] = header
+        self.__used += size
+        self.__chunks += 1
+
+    def close(self):
+        self.stop()
+        self.flush()
+        self.__mm.flush()
+        self.__mm.close()
+        os.ftruncate(self.__fd, self.__used)
+        os.close(self.__fd)
+
+    def stats(self) -> dict:
+        """cost_per_change_us - среднее время обработки одного изменения в потоке GUI, мкс;
+        skipped - значения, которые не удалось привести к числу или массиву чисел"""
+        return {
+            "changes": self.__changes,
+            "chunks": self.__chunks,
+            "keyframes": self.__keyframes,
+            "skipped": self.__skipped,
+            "bytes": self.__used,
+            "cost_per_change_us": self.__cost / self.__changes * 1e6 if self.__changes else 0.0,
+        }
+
+
+class RecordingReader:
+    """Чтение файла записи через отображение в память; столбцы блоков - массивы numpy без копирования"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.__mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self.__mm
+        if mm[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} is not a value recording")
+        meta_len, = struct.unpack_from("<I", mm, len(_MAGIC))
+        meta_pos = len(_MAGIC) + 4
+        meta = json.loads(mm[meta_pos:meta_pos + meta_len])
+        self.__tags = [tuple(t) if isinstance(t, list) else t for t in meta["tags"]]
+
+        offsets = list()
+        kinds = list()
+        counts = list()
+        t_first = list()
+        t_last = list()
+        layouts = dict()
+        pos = _align8(meta_pos + meta_len)
+        end = len(mm)
+        while pos + _CHUNK.size <= end:
+            magic, kind, n, n_extra, t0, t1 = _CHUNK.unpack_from(mm, pos)
+            size = _CHUNK.size + n * 16 + _align8(n * 4) + _align8(n_extra)
+            if magic != _CHUNK_MAGIC or pos + size > end:
+                # конец записанных данных (или запись прервана)
+                break
+            extra_pos = pos + _CHUNK.size + n * 16 + _align8(n * 4)
+            if kind == TAGS:
+                self.__tags = [tuple(t) if isinstance(t, list) else t
+                               for t in json.loads(mm[extra_pos:extra_pos + n_extra])["tags"]]
+            elif kind in (ARRAYS, ARRAY_KEYFRAME):
+                layouts[len(offsets)] = json.loads(mm[extra_pos:extra_pos + n_extra])
+            offsets.append(pos + _CHUNK.size)
+            kinds.append(kind)
+            counts.append(n)
+            t_first.append(t0)
+            t_last.append(t1)
+            pos += size
+        self.__offsets = offsets
+        self.__kinds = kinds
+        self.__counts = counts
+        self.__t_first = t_first
+        self.__t_last = t_last
+        self.__keyframes = [i for i, kind in enumerate(kinds) if kind == KEYFRAME]
+        self.__keyframe_times = [t_last[i] for i in self.__keyframes]
+        self.__data_chunks = [i for i, kind in enumerate(kinds) if kind == DATA]
+        self.__data_t_last = [t_last[i] for i in self.__data_chunks]
+        self.__layouts = layouts
+        self.__array_keyframes = [i for i, kind in enumerate(kinds) if kind == ARRAY_KEYFRAME]
+        self.__array_keyframe_times = [t_last[i] for i in self.__array_keyframes]
+        self.__array_chunks = [i for i, kind in enumerate(kinds) if kind == ARRAYS]
+        self.__array_t_last = [t_last[i] for i in self.__array_chunks]
+
+    @property
+    def tags(self) -> list:
+        return self.__tags
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self.__offsets)
+
+    @property
+    def start_time(self) -> float:
+        firsts = [self.__t_first[chunks[0]] for chunks in (self.__data_chunks, self.__array_chunks) if chunks]
+        return min(firsts) if firsts else 0.0
+
+    @property
+    def end_time(self) -> float:
+        lasts = [t_last[-1] for t_last in (self.__data_t_last, self.__array_t_last) if t_last]
+        return max(lasts) if lasts else 0.0
+
+    def chunk(self, i):
+        """(вид блока, время, значения, слоты) блока i"""
+        n = self.__counts[i]
+        pos = self.__offsets[i]
+        times = np.frombuffer(self.__mm, np.float64, n, pos)
+        values = np.frombuffer(self.__mm, np.float64, n, pos + n * 8)
+        slots = np.frombuffer(self.__mm, np.int32, n, pos + n * 16)
+        return self.__kinds[i], times, values, slots
+
+    def data_chunk_after(self, t: float) -> int:
+        """Позиция (в списке блоков данных) первого блока, содержащего записи позже t"""
+        return bisect_right(self.__data_t_last, t)
+
+    def data_chunk(self, k: int):
+        return self.chunk(self.__data_chunks[k])
+
+    def array_entries(self, i):
+        """Значения-массивы блока i (ARRAYS или ARRAY_KEYFRAME): список (время, слот, массив без копирования)"""
+        _, _, values, _ = self.chunk(i)
+        ret = list()
+        offset = 0
+        for slot, shape, t in self.__layouts[i]:
+            size = int(np.prod(shape, dtype=np.int64))
+            ret.append((t, slot, values[offset:offset + size].reshape(shape)))
+            offset += size
+        return ret
+
+    def array_chunk_after(self, t: float) -> int:
+        """Позиция (в списке блоков массивов) первого блока, содержащего значения позже t"""
+        return bisect_right(self.__array_t_last, t)
+
+    def array_chunk(self, k: int):
+        return self.array_entries(self.__array_chunks[k])
+
+    @property
+    def n_array_chunks(self) -> int:
+        return len(self.__array_chunks)
+
+    def arrays_at(self, t: float) -> dict:
+        """Значения-массивы слотов на момент t: {слот: массив}"""
+        state = dict()
+        k = bisect_right(self.__array_keyframe_times, t) - 1
+        first = 0
+        if k >= 0:
+            i = self.__array_keyframes[k]
+            state = {slot: array for _, slot, array in self.array_entries(i)}
+            first = bisect_right(self.__array_chunks, i)
+        for j in range(first, len(self.__array_chunks)):
+            i = self.__array_chunks[j]
+            if self.__t_first[i] > t:
+                break
+            for entry_t, slot, array in self.array_entries(i):
+                if entry_t > t:
+                    break
+                state[slot] = array
+        return state
+
+    @property
+    def n_data_chunks(self) -> int:
+        return len(self.__data_chunks)
+
+    def state_at(self, t: float):
+        """Значения всех слотов на момент t: (значения, маска известных); O(log n) поиск ключевого блока
+        и проход по блокам данных после него"""
+        n = len(self.__tags)
+        values = np.zeros(n)
+        known = np.zeros(n, dtype=bool)
+        k = bisect_right(self.__keyframe_times, t) - 1
+        first = 0
+        if k >= 0:
+            i = self.__keyframes[k]
+            _, _, kf_values, kf_slots = self.chunk(i)
+            values[kf_slots] = kf_values
+            known[kf_slots] = True
+            first = bisect_right(self.__data_chunks, i)
+        for j in range(first, len(self.__data_chunks)):
+            i = self.__data_chunks[j]
+            if self.__t_first[i] > t:
+                break
+            _, times, chunk_values, slots = self.chunk(i)
+            m = int(np.searchsorted(times, t, side="right"))
+            # при повторах слота присваивание numpy оставляет последнее значение
+            values[slots[:m]] = chunk_values[:m]
+            known[slots[:m]] = True
+        return values, known
+
+    def close(self):
+        self.__mm.close()
+
+
+class Replayer:
+    """Воспроизведение записи в WidgetGroup: переход к моменту времени и проигрывание
+    со скоростью speed (1.0 - реальное время, None - так быстро, как позволяет отрисовка).
+    Слоты записи сопоставляются слотам группы по тегам; значения-массивы передаются копиями"""
+
+    MAX_RECORDS_PER_FRAME = 200000
+
+    def __init__(self, recording, group):
+        self.__reader = recording if isinstance(recording, RecordingReader) else RecordingReader(recording)
+        self.__group = group
+        self.__clock = FrameClock.instance()
+
+        group_tags = set(group.tags())
+        self.__slot_map = np.array([group.slot(tag) if tag in group_tags else -1 for tag in self.__reader.tags],
+                                   dtype=np.int64)
+
+        self.__position = self.__reader.start_time
+        self.__chunk = 0
+        self.__row = 0
+        # позиция в блоках массивов: блок и номер значения в нём
+        self.__array_chunk = 0
+        self.__array_row = 0
+        self.__speed = 1.0
+        self.__playing = False
+        self.__last_frame = 0.0
+
+    @property
+    def reader(self) -> RecordingReader:
+        return self.__reader
+
+    @property
+    def position(self) -> float:
+        return self.__position
+
+    @property
+    def playing(self) -> bool:
+        return self.__playing
+
+    @property
+    def finished(self) -> bool:
+        return (self.__chunk >= self.__reader.n_data_chunks
+                and self.__array_chunk >= self.__reader.n_array_chunks)
+
+    def seek(self, t: float):
+        """Переходит к моменту t и выставляет виджетам значения на этот момент"""
+        values, known = self.__reader.state_at(t)
+        self.__push(np.flatnonzero(known), values[known])
+        self.__position = t
+        self.__chunk = self.__reader.data_chunk_after(t)
+        self.__row = 0
+        if self.__chunk < self.__reader.n_data_chunks:
+            _, times, _, _ = self.__reader.data_chunk(self.__chunk)
+            self.__row = int(np.searchsorted(times, t, side="right"))
+        self.__push_arrays(self.__reader.arrays_at(t))
+        self.__array_chunk = self.__reader.array_chunk_after(t)
+        self.__array_row = 0
+        if self.__array_chunk < self.__reader.n_array_chunks:
+            entries = self.__reader.array_chunk(self.__array_chunk)
+            self.__array_row = sum(1 for entry_t, _, _ in entries if entry_t <= t)
+
+    def play(self, speed: float | None = 1.0):
+        self.__speed = speed
+        self.__last_frame = monotonic()
+        if not self.__playing:
+            self.__playing = True
+            self.__clock.add_frame_callback(self.__frame)
+
+    def pause(self):
+        if self.__playing:
+            self.__playing = False
+            self.__clock.remove_frame_callback(self.__frame)
+
+    def __push(self, slots, values):
+        slots = self.__slot_map[slots]
+        bound = slots >= 0
+        if not bound.all():
+            slots = slots[bound]
+            values = values[bound]
+        if slots.shape[0]:
+            self.__group.update_slots(slots, values)
+            self.__group.flush()
+
+    def __push_arrays(self, arrays: dict):
+        slot_map = self.__slot_map
+        slots = list()
+        values = list()
+        for slot, array in arrays.items():
+            if slot < slot_map.shape[0] and slot_map[slot] >= 0:
+                slots.append(int(slot_map[slot]))
+                # массивы записи - представления отображённого файла только для чтения
+                values.append(array.copy())
+        if slots:
+            self.__group.update_slots(slots, values)
+            self.__group.flush()
+
+    def __frame(self):
+        now = monotonic()
+        dt = now - self.__last_frame
+        self.__last_frame = now
+        if self.__speed is None:
+            target = float("inf")
+            budget = self.MAX_RECORDS_PER_FRAME
+        else:
+            target = self.__position + dt * self.__speed
+            budget = None
+        self.advance(target, budget)
+        if self.finished:
+            self.pause()
+
+    def advance(self, target: float, budget: int | None = None):
+        """Передаёт в группу все записи до момента target (но не больше budget записей)"""
+        reader = self.__reader
+        slots_parts = list()
+        values_parts = list()
+        taken = 0
+        position = self.__position
+        while self.__chunk < reader.n_data_chunks:
+            _, times, values, slots = reader.data_chunk(self.__chunk)
+            end = int(np.searchsorted(times, target, side="right"))
+            if budget is not None:
+                end = min(end, self.__row + budget - taken)
+            if end > self.__row:
+                slots_parts.append(slots[self.__row:end])
+                values_parts.append(values[self.__row:end])
+                taken += end - self.__row
+                position = float(times[end - 1])
+                self.__row = end
+            if self.__row < times.shape[0]:
+                break
+            self.__chunk += 1
+            self.__row = 0
+        if slots_parts:
+            self.__push(np.concatenate(slots_parts), np.concatenate(values_parts))
+        limited = budget is not None and taken >= budget
+        # массивы не обгоняют записи, ограниченные бюджетом кадра
+        array_target = position if limited else target
+        arrays = dict()
+        while self.__array_chunk < reader.n_array_chunks:
+            entries = reader.array_chunk(self.__array_chunk)
+            while self.__array_row < len(entries) and entries[self.__array_row][0] <= array_target:
+                entry_t, slot, array = entries[self.__array_row]
+                arrays[slot] = array
+                position = max(position, entry_t)
+                self.__array_row += 1
+            if self.__array_row < len(entries):
+                break
+            self.__array_chunk += 1
+            self.__array_row = 0
+        self.__push_arrays(arrays)
+        if target == float("inf") or limited:
+            self.__position = position
+        else:
+            self.__position = max(position, target)
@@ -0,0 +1,237 @@
+"""Отрисовка изображений виджетов в QImage вне потока GUI.
+
+QPainter на QImage можно использовать в любом потоке, поэтому виджет в режиме потоковой
+отрисовки рисует своё изображение в RenderPool, а paintEvent только выводит последний готовый
+кадр (ThreadedFace). Кадров у виджета два - показываемый и запасной, в который рисуется
+следующий; в работе не больше одного кадра на виджет, а запросы, пришедшие во время его
+отрисовки, замещают друг друга - рисуется только последний.
+
+Функция отрисовки выполняется в чужом потоке: она не обращается к QWidget и QPixmap и получает
+изменяемое состояние виджета снимком, сделанным в потоке GUI. PyQt отпускает GIL на время
+вызовов Qt, поэтому параллельно с потоком GUI идёт растеризация, а не код Python.
+"""
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, QRectF, QCoreApplication
+from PyQt6.QtGui import QImage
+
+from .frame_clock import FrameClock
+
+
+class RenderPool:
+    """Общий пул потоков отрисовки. Готовые кадры передаются в поток GUI в начале кадра FrameClock
+    (как и значения IngestEndpoint), пока есть кадры в работе"""
+
+    __instance = None
+
+    def __init__(self, n_threads=None):
+        self.__n_threads = n_threads or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.__executor = ThreadPoolExecutor(self.__n_threads, thread_name_prefix="value_widgets-render")
+        # готовые результаты: добавляются рабочими потоками, забираются потоком GUI
+        self.__done = deque()
+        self.__in_flight = 0
+        self.__polling = False
+        self.__closed = False
+        self.__clock = FrameClock.instance()
+
+        self.__submitted = 0
+        self.__completed = 0
+        self.__errors = 0
+        self.__render_time = 0.0
+
+        app = QCoreApplication.instance()
+        if app is not None:
+            # рабочие потоки не должны рисовать текст после удаления QGuiApplication
+            app.aboutToQuit.connect(self.shutdown)
+
+    @classmethod
+    def instance(cls) -> "RenderPool":
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
+
+    @property
+    def n_threads(self) -> int:
+        return self.__n_threads
+
+    def submit(self, run, done) -> bool:
+        """run() выполняется в пуле, done(результат run) - в потоке GUI в начале ближайшего кадра.
+        Если run() выбросил исключение, оно выводится через sys.excepthook, а done получает None.
+        После shutdown() возвращает False и ничего не делает: виджеты выводят последний готовый кадр"""
+        if self.__closed:
+            return False
+        self.__submitted += 1
+        self.__in_flight += 1
+        if not self.__polling:
+            self.__polling = True
+            self.__clock.add_frame_callback(self.__deliver)
+        self.__executor.submit(self.__run, run, done)
+        return True
+
+    def __run(self, run, done):
+        t0 = perf_counter()
+        try:
+            self.__done.append((done, run(), None))
+        except Exception as e:
+            self.__done.append((done, None, e))
+        self.__render_time += perf_counter() - t0
+
+    def __deliver(self):
+        done = self.__done
+        while done:
+            callback, result, error = done.popleft()
+            self.__in_flight -= 1
+            self.__completed += 1
+            if error is not None:
+                self.__errors += 1
+                sys.excepthook(type(error), error, error.__traceback__)
+            callback(result)
+        if not self.__in_flight:
+            self.__polling = False
+            self.__clock.remove_frame_callback(self.__deliver)
+
+    def shutdown(self):
+        self.__closed = True
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+        # отменённые задачи не вернутся: ждём только готовые результаты, затем снимаем обработчик кадра
+        self.__in_flight = len(self.__done)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def stats(self) -> dict:
+        """render_time - суммарное время работы функций отрисовки в пуле, с"""
+        return {
+            "threads": self.__n_threads,
+            "closed": self.__closed,
+            "submitted": self.__submitted,
+            "completed": self.__completed,
+            "in_flight": self.__in_flight,
+            "errors": self.__errors,
+            "render_time": self.__render_time,
+        }
+
+
+class ThreadedFace:
+    """Двойной буфер изображения виджета, которое рисуется в RenderPool.
+    Вызывать из потока GUI; готовый кадр вызывает widget.update()"""
+
+    def __init__(self, widget, pool=None):
+        self.__widget = widget
+        self.__pool = pool if pool is not None else RenderPool.instance()
+        self.__front = None
+        self.__front_key = None
+        self.__spare = None
+        self.__busy_key = None
+        self.__busy = False
+        self.__pending = None
+        # кадры с номером не больше __valid_from устарели до готовности (invalidate)
+        self.__generation = 0
+        self.__valid_from = 0
+
+        self.__requested = 0
+        self.__rendered = 0
+        self.__dropped = 0
+        self.__stale = 0
+
+    def request(self, key, size, dpr, render):
+        """Ставит кадр в работу. key - всё, от чего зависит изображение; size - логический размер;
+        render(image) рисует кадр в очищенный QImage в потоке пула.
+        Запрос с ключом показанного или уже ожидающего кадра ничего не делает"""
+        if self.__busy:
+            if self.__pending is not None:
+                if self.__pending[0] == key:
+                    return
+                # промежуточный кадр так и не был нарисован
+                self.__dropped += 1
+            elif key == self.__busy_key:
+                return
+            self.__pending = (key, size, dpr, render)
+            return
+        if key != self.__front_key:
+            self.__start(key, size, dpr, render)
+
+    def __start(self, key, size, dpr, render):
+        w = round(size.width() * dpr)
+        h = round(size.height() * dpr)
+        image = self.__spare
+        self.__spare = None
+        if image is None or image.width() != w or image.height() != h:
+            image = QImage(w, h, QImage.Format.Format_ARGB32_Premultiplied)
+        image.setDevicePixelRatio(dpr)
+
+        generation = self.__generation + 1
+        if not self.__pool.submit(lambda: self.__render(image, render),
+                                  lambda result: self.__finished(generation, key, image, result)):
+            # пул остановлен (выход из приложения)
+            self.__spare = image
+            return
+        self.__busy = True
+        self.__busy_key = key
+        self.__generation = generation
+        self.__requested += 1
+
+    @staticmethod
+    def __render(image, render):
+        image.fill(Qt.GlobalColor.transparent)
+        render(image)
+        return True
+
+    def __finished(self, generation, key, image, result):
+        self.__busy = False
+        self.__busy_key = None
+        if result and generation > self.__valid_from:
+            self.__spare = self.__front
+            self.__front = image
+            self.__front_key = key
+            self.__rendered += 1
+            if not sip.isdeleted(self.__widget):
+                self.__widget.update()
+        else:
+            self.__stale += 1
+            self.__spare = image
+        if self.__pending is not None:
+            pending = self.__pending
+            self.__pending = None
+            self.__start(*pending)
+
+    def invalidate(self):
+        """Кадры в работе и ожидающие устарели; показанный остаётся на экране до готовности нового"""
+        self.__valid_from = self.__generation
+        self.__front_key = None
+        if self.__pending is not None:
+            self.__pending = None
+            self.__dropped += 1
+
+    @property
+    def ready(self) -> bool:
+        return self.__front is not None
+
+    def paint(self, qp, rect=None):
+        """Выводит последний готовый кадр; rect - область виджета (QRect), None - весь кадр"""
+        front = self.__front
+        if front is None:
+            return
+        if rect is None:
+            qp.drawImage(0, 0, front)
+            return
+        dpr = front.devicePixelRatio()
+        qp.drawImage(QRectF(rect), front, QRectF(rect.x() * dpr, rect.y() * dpr, rect.width() * dpr,
+                                                 rect.height() * dpr))
+
+    def stats(self) -> dict:
+        """dropped - кадры, замещённые более новыми до начала отрисовки;
+        stale - нарисованные, но устаревшие к готовности кадры"""
+        return {
+            "requested": self.__requested,
+            "rendered": self.__rendered,
+            "dropped": self.__dropped,
+            "stale": self.__stale,
+            "busy": self.__busy,
+        }
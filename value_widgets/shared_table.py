@@ -0,0 +1,184 @@
+from multiprocessing import shared_memory
+from time import time
+
+import numpy as np
+
+from .frame_clock import FrameClock
+
+
+# заголовок: счётчик версий (нечётный - идёт запись), число слотов;
+# далее столбцы значение float64[n], время float64[n], счётчик записей uint64[n]
+_HEADER_SIZE = 2
+_SEQ = 0
+_N_SLOTS = 1
+
+# попыток чтения за кадр, пока писатель занят; запись короткая, поэтому обычно хватает повтора
+_READ_ATTEMPTS = 4
+
+
+class SharedValueTable:
+    """Таблица значений float64 в разделяемой памяти для передачи данных из процесса сбора в процесс GUI.
+    Для каждого слота хранится значение, время последней записи и счётчик записей (по нему читатель находит
+    изменившиеся слоты, даже если время записи не изменилось).
+    Писатель (один) обновляет таблицу под seqlock: счётчик версий нечётный на время записи.
+    Создаётся через create() в одном процессе и открывается через attach(name) в другом"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.__shm = shm
+        self.__owner = owner
+        header = np.ndarray((_HEADER_SIZE,), dtype=np.int64, buffer=shm.buf)
+        n = int(header[_N_SLOTS])
+        self.__header = header
+        self.__n_slots = n
+        offset = _HEADER_SIZE * 8
+        self.__values = np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        self.__timestamps = np.ndarray((n,), dtype=np.float64, buffer=shm.buf, offset=offset + n * 8)
+        self.__counts = np.ndarray((n,), dtype=np.uint64, buffer=shm.buf, offset=offset + n * 16)
+
+        # состояние читателя: счётчики записей слотов, уже переданных виджетам
+        self.__seen = np.zeros(n, dtype=np.uint64)
+        self.__changed = np.zeros(n, dtype=bool)
+
+    @classmethod
+    def create(cls, n_slots: int, name: str | None = None) -> "SharedValueTable":
+        shm = shared_memory.SharedMemory(name=name, create=True, size=(_HEADER_SIZE + 3 * n_slots) * 8)
+        header = np.ndarray((_HEADER_SIZE,), dtype=np.int64, buffer=shm.buf)
+        header[_SEQ] = 0
+        header[_N_SLOTS] = n_slots
+        ret = cls(shm, True)
+        ret.__values[:] = 0.0
+        ret.__timestamps[:] = 0.0
+        ret.__counts[:] = 0
+        return ret
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedValueTable":
+        return cls(shared_memory.SharedMemory(name=name), False)
+
+    @property
+    def name(self) -> str:
+        return self.__shm.name
+
+    @property
+    def n_slots(self) -> int:
+        return self.__n_slots
+
+    @property
+    def seq(self) -> int:
+        return int(self.__header[_SEQ])
+
+    @property
+    def values(self) -> np.ndarray:
+        """Представление значений без копирования; при чтении без read_changed возможны разорванные данные"""
+        return self.__values
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.__timestamps
+
+    @property
+    def write_counts(self) -> np.ndarray:
+        return self.__counts
+
+    # --- писатель ---
+
+    def write(self, slot: int, value: float, timestamp: float | None = None):
+        header = self.__header
+        header[_SEQ] += 1
+        self.__values[slot] = value
+        self.__timestamps[slot] = time() if timestamp is None else timestamp
+        self.__counts[slot] += 1
+        header[_SEQ] += 1
+
+    def write_many(self, slots, values, timestamp: float | None = None):
+        """Записывает пачку значений одной версией таблицы; slots - индексы или срез"""
+        header = self.__header
+        header[_SEQ] += 1
+        self.__values[slots] = values
+        self.__timestamps[slots] = time() if timestamp is None else timestamp
+        self.__counts[slots] += 1
+        header[_SEQ] += 1
+
+    # --- читатель ---
+
+    def read_changed(self):
+        """Возвращает (слоты, значения), изменившиеся с прошлого успешного вызова.
+        None - писатель в этот момент обновлял таблицу, чтение нужно повторить позже"""
+        seq = self.__header[_SEQ]
+        if seq & 1:
+            return None
+        changed = self.__changed
+        np.not_equal(self.__counts, self.__seen, out=changed)
+        slots = np.flatnonzero(changed)
+        values = self.__values[slots]
+        counts = self.__counts[slots]
+        if self.__header[_SEQ] != seq:
+            return None
+        self.__seen[slots] = counts
+        return slots, values
+
+    def close(self):
+        self.__header = None
+        self.__values = None
+        self.__timestamps = None
+        self.__counts = None
+        self.__shm.close()
+
+    def unlink(self):
+        """Удаляет сегмент разделяемой памяти; вызывает создавший таблицу процесс"""
+        if self.__owner:
+            self.__shm.unlink()
+
+
+class SharedTableReader:
+    """Раз в кадр FrameClock читает изменившиеся слоты SharedValueTable и передаёт их в WidgetGroup.
+    Слот таблицы соответствует слоту группы (порядку вызовов WidgetGroup.bind)"""
+
+    def __init__(self, table: SharedValueTable, group):
+        self.__table = table
+        self.__group = group
+        self.__clock = FrameClock.instance()
+        self.__running = False
+
+        self.__frames = 0
+        self.__retries = 0
+        self.__changed = 0
+
+    def start(self):
+        if not self.__running:
+            self.__running = True
+            self.__clock.add_frame_callback(self.poll)
+
+    def stop(self):
+        if self.__running:
+            self.__running = False
+            self.__clock.remove_frame_callback(self.poll)
+
+    @property
+    def running(self) -> bool:
+        return self.__running
+
+    def poll(self):
+        self.__frames += 1
+        for _ in range(_READ_ATTEMPTS):
+            data = self.__table.read_changed()
+            if data is not None:
+                break
+        else:
+            # писатель обновлял таблицу - данные заберём в следующем кадре
+            self.__retries += 1
+            return
+        slots, values = data
+        if len(slots):
+            self.__changed += len(slots)
+            self.__group.update_slots(slots, values)
+            self.__group.flush()
+
+    def stats(self) -> dict:
+        """retries - кадры, пропущенные из-за одновременной записи"""
+        return {
+            "frames": self.__frames,
+            "retries": self.__retries,
+            "changed": self.__changed,
+            "seq": self.__table.seq,
+        }
@@ -1,32 +1,48 @@
 from PyQt6 import QtCore, QtGui
-from PyQt6.QtGui import QPen, QColor, QFont
+from PyQt6.QtGui import QPen, QColor, QPainter
 from PyQt6.QtCore import QRectF, Qt
 from PyQt6.QtWidgets import QLabel
 
 from .utils import choose_contrast_color, is_app_dark
+from . import text_cache
 
 
 class StateWidget(QLabel):
+    """Надпись состояния на цветной подложке.
+    По умолчанию (painted=True) подложка и текст рисуются в paintEvent без стилей Qt;
+    painted=False - прежняя отрисовка через setStyleSheet"""
 
-    def __init__(self, widget, x, y, w, h):
+    def __init__(self, widget, x, y, w, h, painted=True):
         super().__init__()
         self.setParent(widget)
         self.setGeometry(x, y, w, h) 
         self.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.setFont(QFont("Bahnschrift, Arial", 12))
+        self.setFont(text_cache.font("Bahnschrift, Arial", 12))
         self.__state: int | None = None
         self.__states = dict()
+        # в режиме painted состояние рисуется из заранее подготовленных цветов, без стилей Qt
+        self.__painted = painted
+        self.__qp = QPainter()
 
     def add_state(self, name: str, value: int, color):
-        self.__states[value] = name, color
+        if self.__painted:
+            color = QColor(color)
+            self.__states[value] = name, color, choose_contrast_color(color)
+        else:
+            self.__states[value] = name, color
         if self.__state is None:
             self.set_state(value)
 
     def set_state(self, state: int):
         if self.__state != state:
+            # неизвестное состояние - ошибка вызывающего, а не отрисовки
+            description = self.__states[state]
             self.__state = state
-            name, color = self.__states[state]
-            self.setText(name)
+            self.setText(description[0])
+            if self.__painted:
+                self.update()
+                return
+            name, color = description
             self.setStyleSheet(
                 f"""
                 background-color: {color};
@@ -35,6 +51,23 @@ class StateWidget(QLabel):
                 """
             )
 
+    def paintEvent(self, a0):
+        if not self.__painted:
+            super().paintEvent(a0)
+            return
+        if self.__state is None:
+            return
+        name, color, text_color = self.__states[self.__state]
+        self.__qp.begin(self)
+        self.__qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.__qp.setPen(Qt.PenStyle.NoPen)
+        self.__qp.setBrush(color)
+        self.__qp.drawRoundedRect(QRectF(self.rect()), 5, 5)
+        self.__qp.setPen(text_color)
+        self.__qp.setFont(self.font())
+        self.__qp.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, name)
+        self.__qp.end()
+
     @property
     def state(self):
         return self.__state
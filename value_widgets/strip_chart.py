@@ -0,0 +1,473 @@
+from .color_generator import ColorGenerator
+from .frame_clock import FrameClock
+from .theme import ThemeService
+from .palette import Palette
+from . import text_cache
+
+from math import log2, floor
+
+from PyQt6.QtGui import QPainter, QColor, QPen, QPixmap, QImage, QPolygonF
+from PyQt6.QtCore import Qt, QPointF, QRect, QRectF, QLineF
+from PyQt6.QtWidgets import QWidget
+import numpy as np
+
+
+# нижний уровень пирамиды: блоки по 2 ** _BASE_LEVEL отсчётов; более мелкие блоки
+# дешевле считать по исходным данным, чем хранить
+_BASE_LEVEL = 3
+
+
+class _Series:
+    """Кольцевой буфер отсчётов одного ряда и пирамида min/max по блокам 2 ** k отсчётов.
+    Пирамида достраивается при добавлении только для завершённых блоков"""
+
+    def __init__(self, capacity: int, label: str, color: QColor):
+        self.label = label
+        self.color = color
+        self.pen = QPen(color, 0)
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.values = np.zeros(capacity)
+        self.n = 0
+        self.levels = list()
+        k = _BASE_LEVEL
+        while capacity >> k:
+            size = capacity >> k
+            self.levels.append((np.zeros(size), np.zeros(size)))
+            k += 1
+
+    def append(self, values):
+        if isinstance(values, (int, float)):
+            # одиночный отсчёт: пирамида обновляется только при завершении блока нижнего уровня
+            n0 = self.n
+            self.values[n0 & self.mask] = values
+            self.n = n1 = n0 + 1
+            if n1 & ((1 << _BASE_LEVEL) - 1):
+                return
+        else:
+            values = np.asarray(values, dtype=float).ravel()
+            m = values.shape[0]
+            if m == 0:
+                return
+            cap = self.capacity
+            if m > cap:
+                self.n += m - cap
+                values = values[m - cap:]
+                m = cap
+            n0 = self.n
+            n1 = n0 + m
+            i = n0 & self.mask
+            first = min(m, cap - i)
+            self.values[i:i + first] = values[:first]
+            if first < m:
+                self.values[:m - first] = values[first:]
+            self.n = n1
+        self.__update_levels(n0, n1)
+
+    def __update_levels(self, n0: int, n1: int):
+        oldest = max(0, n1 - self.capacity)
+        for level, (mins, maxs) in enumerate(self.levels):
+            k = level + _BASE_LEVEL
+            j1 = n1 >> k
+            j0 = max(n0 >> k, oldest >> k)
+            if j0 >= j1:
+                # блоки верхних уровней тоже не завершились
+                break
+            blocks = np.arange(j0, j1)
+            if level == 0:
+                idx = ((blocks[:, np.newaxis] << k) + np.arange(1 << k)) & self.mask
+                src = self.values[idx]
+                lo = src.min(axis=1)
+                hi = src.max(axis=1)
+            else:
+                prev_mins, prev_maxs = self.levels[level - 1]
+                prev_mask = prev_mins.shape[0] - 1
+                idx = ((blocks[:, np.newaxis] << 1) + np.arange(2)) & prev_mask
+                lo = prev_mins[idx].min(axis=1)
+                hi = prev_maxs[idx].max(axis=1)
+            dst = blocks & (mins.shape[0] - 1)
+            mins[dst] = lo
+            maxs[dst] = hi
+
+    def raw(self, start: int, stop: int):
+        return self.values[np.arange(start, stop) & self.mask]
+
+    def envelope(self, start: int, stop: int, bins: int):
+        """min/max по bins равным частям [start, stop); возвращает (номера частей, min, max)"""
+        span = stop - start
+        k = floor(log2(span / bins)) if span > bins else 0
+        if k < _BASE_LEVEL:
+            pos = np.arange(start, stop)
+            lo = hi = self.values[pos & self.mask]
+        else:
+            mins, maxs = self.levels[k - _BASE_LEVEL]
+            size = 1 << k
+            jb = -(-start // size)
+            je = stop >> k
+            blocks = np.arange(jb, je)
+            idx = blocks & (mins.shape[0] - 1)
+            pos = blocks << k
+            lo = mins[idx]
+            hi = maxs[idx]
+            # неполные блоки по краям меньше одной части - сворачиваются в одну точку
+            head = self.raw(start, min(jb << k, stop))
+            tail = self.raw(max(je << k, start), stop) if je >= jb else np.empty(0)
+            if head.shape[0]:
+                pos = np.concatenate(([start], pos))
+                lo = np.concatenate(([head.min()], lo))
+                hi = np.concatenate(([head.max()], hi))
+            if tail.shape[0]:
+                pos = np.concatenate((pos, [je << k]))
+                lo = np.concatenate((lo, [tail.min()]))
+                hi = np.concatenate((hi, [tail.max()]))
+        if pos.shape[0] == 0:
+            return pos, lo, hi
+        b = (pos - start) * bins // span
+        starts = np.flatnonzero(np.diff(b, prepend=-1))
+        return b[starts], np.minimum.reduceat(lo, starts), np.maximum.reduceat(hi, starts)
+
+
+class StripChart(QWidget):
+    """Тренд значений во времени: новые отсчёты добавляются справа.
+    История ряда хранится в кольцевом буфере на capacity отсчётов (округляется до степени 2);
+    при отрисовке на каждый физический пиксель по горизонтали приходится не больше двух точек"""
+
+    def __init__(self, widget, x, y, w, h, capacity=1 << 20, redraw_period=15):
+        super().__init__()
+        self.setParent(widget)
+        self.__offset_x = 50
+        self.__offset_y = 25
+        self.__h = h
+        self.__w = w
+
+        self.__min_val = 0
+        self.__max_val = 1
+
+        self.__capacity = 1 << max(_BASE_LEVEL, (int(capacity) - 1).bit_length())
+        self.__span = 0
+        self.__sample_rate = 0.0
+        self.__series = list()
+        self.__colors = ColorGenerator()
+
+        self.__label = "Untitled"
+        self.__dark = False
+        self.__palette = Palette.get(self.__dark)
+        self.__background = None
+        self.__overlay = None
+        self.__polygon = QPolygonF()
+        # потоковая отрисовка: версия оформления - часть ключа кадра; слои в QImage и свой буфер
+        # точек использует только RenderPool
+        self.__face = None
+        self.__face_layers = None
+        self.__face_polygon = QPolygonF()
+        self.__face_key = None
+        self.__chrome = 0
+
+        self.setGeometry(x, y, w, h)
+
+        self.__clock = FrameClock.instance()
+        self.__clock.register(self, redraw_period)
+        ThemeService.instance().register(self)
+        self.show()
+
+    def paintEvent(self, a0):
+        if self.__face is None:
+            self.__redraw()
+            return
+        dpr = self.devicePixelRatioF()
+        layers_key = (self.__chrome, dpr)
+        key = (layers_key, tuple(s.n for s in self.__series))
+        if key != self.__face_key:
+            # снимок - точки видимого окна каждого ряда (не больше двух на пиксель): писатель кольцевого
+            # буфера работает в потоке GUI, поэтому отсчёты читаются здесь, а не в RenderPool
+            self.__face_key = key
+            bins = max(1, round(self.__w * dpr))
+            span = self.__view_span()
+            lines = list()
+            for s in self.__series:
+                pts = self.__series_points(s, s.n, bins, span, lambda n: np.empty((n, 2)))
+                if pts is not None:
+                    lines.append((s.pen, pts))
+            self.__face.request(key, self.size(), dpr, lambda image: self.__render_face(image, layers_key, lines))
+        qp = QPainter(self)
+        self.__face.paint(qp, a0.rect())
+        qp.end()
+
+    def set_threaded_rendering(self, enabled: bool):
+        """Потоковая отрисовка: график рисуется в RenderPool, paintEvent выводит последний готовый кадр"""
+        if enabled == (self.__face is not None):
+            return
+        # пул потоков загружается только при включении режима
+        from .render_pool import ThreadedFace
+        self.__face = ThreadedFace(self) if enabled else None
+        self.__face_key = None
+        self.__clock.mark_dirty(self)
+
+    @property
+    def threaded_rendering(self) -> bool:
+        return self.__face is not None
+
+    def __invalidate_chrome(self):
+        self.__background = None
+        self.__overlay = None
+        self.__chrome += 1
+        if self.__face is not None:
+            self.__face.invalidate()
+        self.__clock.mark_dirty(self)
+
+    def set_dark(self, dark: bool):
+        if self.__dark != dark:
+            self.__dark = dark
+            self.__palette = Palette.get(dark)
+            self.__invalidate_chrome()
+
+    def set_label(self, label: str) -> None:
+        self.__label = label
+        self.__invalidate_chrome()
+
+    def set_min_value(self, val: float):
+        self.__min_val = val
+        self.__invalidate_chrome()
+
+    def set_max_value(self, val: float):
+        self.__max_val = val
+        self.__invalidate_chrome()
+
+    def set_span(self, n_samples: int):
+        """Ширина окна в отсчётах; 0 - вся история"""
+        self.__span = min(int(n_samples), self.__capacity)
+        self.__invalidate_chrome()
+
+    def set_sample_rate(self, rate: float):
+        """Частота отсчётов, Гц; задаётся для подписей шкалы времени"""
+        self.__sample_rate = rate
+        self.__invalidate_chrome()
+
+    def add_series(self, label: str, color=None) -> int:
+        color = QColor(color) if color is not None else QColor(self.__colors.get_color())
+        self.__series.append(_Series(self.__capacity, label, color))
+        self.__invalidate_chrome()
+        return len(self.__series) - 1
+
+    def set_color(self, series: int, color):
+        self.__series[series].color = QColor(color)
+        self.__series[series].pen = QPen(QColor(color), 0)
+        self.__invalidate_chrome()
+
+    def append(self, series: int, values):
+        """Добавляет отсчёт или массив отсчётов в конец ряда"""
+        self.__series[series].append(values)
+        self.__clock.mark_dirty(self, self.__plot_rect())
+
+    def clear(self):
+        for series in self.__series:
+            series.n = 0
+        # число отсчётов после очистки может совпасть с ключом уже нарисованного кадра
+        self.__face_key = None
+        if self.__face is not None:
+            self.__face.invalidate()
+        self.__clock.mark_dirty(self)
+
+    @property
+    def capacity(self) -> int:
+        return self.__capacity
+
+    def setGeometry(self, x, y, w, h):
+        self.__w = w
+        self.__h = h
+        super().setGeometry(x - self.__offset_x, y - self.__offset_y, w + self.__offset_x * 2, h + self.__offset_y * 2)
+        self.__background = None
+        self.__overlay = None
+        self.__chrome += 1
+        if self.__face is not None:
+            self.__face.invalidate()
+
+    def __plot_rect(self):
+        return QRect(self.__offset_x, self.__offset_y, self.__w + 1, self.__h + 1)
+
+    def __real_to_window_y(self, y):
+        return self.__offset_y + self.__h / (self.__max_val - self.__min_val) * (self.__max_val - y)
+
+    def __view_span(self):
+        return self.__span if self.__span > 0 else self.__capacity
+
+    def __new_layer(self, dpr, threaded):
+        w = round((self.__w + self.__offset_x * 2) * dpr)
+        h = round((self.__h + self.__offset_y * 2) * dpr)
+        # QPixmap можно создавать только в потоке GUI
+        layer = QImage(w, h, QImage.Format.Format_ARGB32_Premultiplied) if threaded else QPixmap(w, h)
+        layer.setDevicePixelRatio(dpr)
+        layer.fill(Qt.GlobalColor.transparent)
+        return layer
+
+    def __render_background(self, default_color, dpr, threaded=False):
+        """Заголовок, сетка, оси и шкалы - под графиками"""
+        pixmap = self.__new_layer(dpr, threaded)
+        qp = QPainter(pixmap)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        pen = QPen()
+        pen.setColor(default_color)
+        qp.setPen(pen)
+
+        qp.setFont(text_cache.font("bahnschrift", 14))
+        qp.drawText(self.__offset_x, 0, self.__w, 20, Qt.AlignmentFlag.AlignCenter, self.__label)
+
+        qp.drawLine(QLineF(self.__offset_x, self.__offset_y + self.__h, self.__offset_x + self.__w, self.__offset_y + self.__h))
+        qp.drawLine(QLineF(self.__offset_x, self.__offset_y + self.__h, self.__offset_x, self.__offset_y))
+
+        y = self.__offset_y
+        i = 0
+        val = self.__max_val
+        step = (self.__max_val - self.__min_val) / 4
+        while y <= self.__offset_y + self.__h:
+            if i % 2 == 0:
+                d = 5
+            else:
+                d = 3
+            qp.drawLine(QLineF(self.__offset_x, y, self.__offset_x - d, y))
+            text_cache.draw_static_text(qp, QRectF(self.__offset_x - 50, y - 10, 40, 20), Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+                                        f"{round(val)}", "bahnschrift", 10)
+            y += self.__h / 4
+            val -= step
+            i += 1
+
+        # вертикальная сетка и шкала времени (в секундах назад от последнего отсчёта)
+        grid_pen = QPen(default_color)
+        grid_pen.setWidthF(0.75)
+        grid_pen.setStyle(Qt.PenStyle.DotLine)
+        span = self.__view_span()
+        for i in range(1, 8):
+            x = self.__offset_x + i * self.__w / 8
+            qp.setPen(grid_pen)
+            qp.drawLine(QLineF(x, self.__offset_y + self.__h, x, self.__offset_y))
+            if self.__sample_rate > 0 and i % 2 == 0:
+                qp.setPen(pen)
+                seconds = (8 - i) * span / 8 / self.__sample_rate
+                text = f"{seconds:.0f}" if seconds >= 10 else f"{seconds:.2f}".rstrip("0").rstrip(".")
+                text_cache.draw_static_text(qp, QRectF(x - 40, self.__offset_y + self.__h + 5, 80, 15),
+                                            Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignTop,
+                                            f"-{text} с", "bahnschrift", 10)
+        qp.end()
+        return pixmap
+
+    def __render_overlay(self, dpr, threaded=False):
+        """Легенда - поверх графиков"""
+        pixmap = self.__new_layer(dpr, threaded)
+        if not self.__series:
+            return pixmap
+        qp = QPainter(pixmap)
+        qp.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        y0 = self.__offset_y
+        h = 13
+        step = 5
+        radius = h / 2
+
+        metrics = text_cache.metrics("Bahnschrift, Arial", 11)
+        max_width = max(metrics.horizontalAdvance(s.label) for s in self.__series)
+        wrect = max_width + h + 4 * step
+        hrect = metrics.height() * len(self.__series) + step * (len(self.__series) - 1)
+        x0 = self.__offset_x + self.__w - wrect
+
+        qp.setPen(self.__palette.transparent_pen)
+        qp.setBrush(self.__palette.legend_brush)
+        qp.drawRoundedRect(QRectF(x0, y0, wrect, hrect), radius, radius)
+
+        x0 += 5
+        y0 += 5
+        for series in self.__series:
+            qp.setPen(self.__palette.transparent_pen)
+            qp.setBrush(series.color)
+            qp.drawRoundedRect(QRectF(x0, y0, h, h), radius, radius)
+
+            qp.setPen(series.color)
+            text_cache.draw_static_text_at_baseline(qp, QPointF(x0 + h + 5, y0 + h), series.label, "Bahnschrift, Arial", 11)
+            y0 += h + 4
+        qp.end()
+        return pixmap
+
+    @staticmethod
+    def __fill_polygon(polygon, n):
+        """Возвращает массив (n, 2) поверх памяти QPolygonF - точки заполняются без создания QPointF"""
+        polygon.resize(n)
+        ptr = polygon.data()
+        ptr.setsize(n * 16)
+        return np.frombuffer(ptr, dtype=np.float64).reshape(n, 2)
+
+    def __series_points(self, series, stop, bins, span, buffer):
+        """Точки ломаной ряда в координатах виджета; buffer(n) выделяет массив (n, 2). None - нечего рисовать"""
+        start = max(stop - span, stop - series.capacity, 0)
+        if stop - start < 1:
+            return None
+        # правый край графика - последний отсчёт
+        x_scale = self.__w / span
+        x_right = self.__offset_x + self.__w
+        y_scale = self.__h / (self.__max_val - self.__min_val)
+
+        if stop - start <= bins:
+            values = series.raw(start, stop)
+            pts = buffer(values.shape[0])
+            pts[:, 0] = np.arange(start - stop + 1, 1) * x_scale + x_right
+            pts[:, 1] = self.__offset_y + (self.__max_val - values) * y_scale
+        else:
+            view_bins = max(1, round(bins * (stop - start) / span))
+            b, lo, hi = series.envelope(start, stop, view_bins)
+            pts = buffer(2 * b.shape[0])
+            x = x_right - (view_bins - b - 0.5) * (self.__w / bins)
+            pts[0::2, 0] = x
+            pts[1::2, 0] = x
+            # порядок min/max чередуется, чтобы соседние вертикали соединялись короткими отрезками
+            first = np.where(np.arange(b.shape[0]) % 2 == 0, lo, hi)
+            second = np.where(np.arange(b.shape[0]) % 2 == 0, hi, lo)
+            pts[0::2, 1] = self.__offset_y + (self.__max_val - first) * y_scale
+            pts[1::2, 1] = self.__offset_y + (self.__max_val - second) * y_scale
+        return pts
+
+    def __draw_series(self, qp, series, bins, span):
+        # точки пишутся прямо в память QPolygonF
+        if self.__series_points(series, series.n, bins, span,
+                                lambda n: self.__fill_polygon(self.__polygon, n)) is None:
+            return
+        qp.setPen(series.pen)
+        qp.drawPolyline(self.__polygon)
+
+    def __redraw(self):
+        if not self.isVisible():
+            return
+        dpr = self.devicePixelRatioF()
+        if self.__background is None or self.__background.devicePixelRatio() != dpr:
+            self.__background = self.__render_background(self.__palette.diagram, dpr)
+            self.__overlay = self.__render_overlay(dpr)
+
+        qp = QPainter()
+        qp.begin(self)
+        qp.drawPixmap(0, 0, self.__background)
+        qp.setClipRect(self.__plot_rect())
+        bins = max(1, round(self.__w * dpr))
+        span = self.__view_span()
+        for series in self.__series:
+            self.__draw_series(qp, series, bins, span)
+        qp.setClipping(False)
+        qp.drawPixmap(0, 0, self.__overlay)
+        qp.end()
+
+    def __render_face(self, image, layers_key, lines):
+        # выполняется в RenderPool: слои свои, в QImage, и перерисовываются только при смене оформления;
+        # точки рядов посчитаны в потоке GUI (paintEvent), кольцевые буферы здесь не читаются
+        dpr = layers_key[1]
+        if self.__face_layers is None or self.__face_layers[0] != layers_key:
+            self.__face_layers = (layers_key, self.__render_background(self.__palette.diagram, dpr, threaded=True),
+                                  self.__render_overlay(dpr, threaded=True))
+        _, background, overlay = self.__face_layers
+        qp = QPainter(image)
+        qp.drawImage(0, 0, background)
+        qp.setClipRect(self.__plot_rect())
+        polygon = self.__face_polygon
+        for pen, pts in lines:
+            self.__fill_polygon(polygon, pts.shape[0])[:] = pts
+            qp.setPen(pen)
+            qp.drawPolyline(polygon)
+        qp.setClipping(False)
+        qp.drawImage(0, 0, overlay)
+        qp.end()
@@ -0,0 +1,114 @@
+from threading import get_ident, Lock
+
+from PyQt6.QtGui import QFont, QFontMetrics, QStaticText, QTransform
+from PyQt6.QtCore import Qt, QPointF
+
+
+# кэши общие для всех виджетов пакета; разрешение шрифта (в т.ч. подбор замены
+# для отсутствующих в системе семейств) выполняется один раз на ключ.
+# QFont и QStaticText реентерабельны, но не потокобезопасны: у потоков RenderPool свои экземпляры
+_fonts = dict()
+_metrics = dict()
+_static_texts = dict()
+
+_STATIC_TEXT_CACHE_SIZE = 4096
+
+# добавление с вытеснением в кэш подписей может идти одновременно в нескольких потоках
+_cache_lock = Lock()
+
+_stats = {
+    "font_hits": 0,
+    "font_misses": 0,
+    "metrics_hits": 0,
+    "metrics_misses": 0,
+    "static_text_hits": 0,
+    "static_text_misses": 0,
+}
+
+
+def font(family: str, size: int, weight: int = -1) -> QFont:
+    """Возвращает общий экземпляр шрифта; изменять его нельзя"""
+    key = (family, int(size), weight, get_ident())
+    ret = _fonts.get(key)
+    if ret is None:
+        _stats["font_misses"] += 1
+        ret = QFont(family, int(size), weight)
+        _fonts[key] = ret
+    else:
+        _stats["font_hits"] += 1
+    return ret
+
+
+def metrics(family: str, size: int, weight: int = -1) -> QFontMetrics:
+    key = (family, int(size), weight, get_ident())
+    ret = _metrics.get(key)
+    if ret is None:
+        _stats["metrics_misses"] += 1
+        ret = QFontMetrics(font(family, size, weight))
+        _metrics[key] = ret
+    else:
+        _stats["metrics_hits"] += 1
+    return ret
+
+
+def static_text(text: str, family: str, size: int, weight: int = -1) -> QStaticText:
+    """Подготовленный QStaticText для редко меняющихся подписей"""
+    key = (text, family, int(size), weight, get_ident())
+    ret = _static_texts.get(key)
+    if ret is None:
+        _stats["static_text_misses"] += 1
+        ret = QStaticText(text)
+        ret.setTextFormat(Qt.TextFormat.PlainText)
+        ret.prepare(QTransform(), font(family, size, weight))
+        with _cache_lock:
+            if len(_static_texts) >= _STATIC_TEXT_CACHE_SIZE:
+                del _static_texts[next(iter(_static_texts))]
+            _static_texts[key] = ret
+    else:
+        _stats["static_text_hits"] += 1
+    return ret
+
+
+def draw_static_text(qp, rect, flags, text: str, family: str, size: int, weight: int = -1):
+    """Рисует кэшированную подпись, выравнивая её в прямоугольнике rect как drawText"""
+    st = static_text(text, family, size, weight)
+    size_f = st.size()
+    x = rect.x()
+    y = rect.y()
+    if flags & Qt.AlignmentFlag.AlignHCenter:
+        x += (rect.width() - size_f.width()) / 2
+    elif flags & Qt.AlignmentFlag.AlignRight:
+        x += rect.width() - size_f.width()
+    if flags & Qt.AlignmentFlag.AlignVCenter:
+        y += (rect.height() - size_f.height()) / 2
+    elif flags & Qt.AlignmentFlag.AlignBottom:
+        y += rect.height() - size_f.height()
+    qp.setFont(font(family, size, weight))
+    qp.drawStaticText(QPointF(x, y), st)
+
+
+def draw_static_text_at_baseline(qp, point, text: str, family: str, size: int, weight: int = -1):
+    """То же, что drawText(QPointF, text): point - начало базовой линии"""
+    ascent = metrics(family, size, weight).ascent()
+    qp.setFont(font(family, size, weight))
+    qp.drawStaticText(QPointF(point.x(), point.y() - ascent), static_text(text, family, size, weight))
+
+
+def stats() -> dict:
+    ret = dict(_stats)
+    ret["fonts"] = len(_fonts)
+    ret["metrics"] = len(_metrics)
+    ret["static_texts"] = len(_static_texts)
+    return ret
+
+
+def reset_stats():
+    for key in _stats:
+        _stats[key] = 0
+
+
+def clear():
+    _fonts.clear()
+    _metrics.clear()
+    _static_texts.clear()
+    reset_stats()
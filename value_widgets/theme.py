@@ -0,0 +1,55 @@
+from weakref import ref
+
+from PyQt6.QtCore import QObject, Qt, pyqtSlot as Slot
+from PyQt6.QtGui import QGuiApplication
+
+from .utils import is_app_dark
+
+
+class ThemeService(QObject):
+    """Единая подписка на смену темы приложения; рассылает set_dark() зарегистрированным виджетам.
+    Виджеты хранятся по id() через слабые ссылки, как в FrameClock"""
+
+    __instance = None
+
+    def __init__(self):
+        super().__init__()
+        # id(виджет) -> слабая ссылка
+        self.__widgets = dict()
+        self.__dark = is_app_dark()
+        QGuiApplication.styleHints().colorSchemeChanged.connect(self.__scheme_changed)
+
+    @classmethod
+    def instance(cls) -> "ThemeService":
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
+
+    @property
+    def dark(self) -> bool:
+        return self.__dark
+
+    def register(self, widget):
+        """Регистрирует виджет и сразу применяет к нему текущую тему"""
+        key = id(widget)
+        if key not in self.__widgets:
+            self.__widgets[key] = ref(widget, lambda _, k=key: self.__widgets.pop(k, None))
+            widget.destroyed.connect(lambda _=None, k=key: self.__widgets.pop(k, None))
+        widget.set_dark(self.__dark)
+
+    def unregister(self, widget):
+        self.__widgets.pop(id(widget), None)
+
+    def set_dark(self, dark: bool):
+        if dark == self.__dark:
+            return
+        self.__dark = dark
+        # виджеты только помечаются к перерисовке - сама перерисовка пройдёт одним кадром FrameClock
+        for widget_ref in tuple(self.__widgets.values()):
+            widget = widget_ref()
+            if widget is not None:
+                widget.set_dark(dark)
+
+    @Slot("Qt::ColorScheme")
+    def __scheme_changed(self, scheme):
+        self.set_dark(scheme == Qt.ColorScheme.Dark)
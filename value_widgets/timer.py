@@ -1,18 +1,229 @@
+from threading import get_ident
 from time import monotonic
+from weakref import WeakMethod
+
+from PyQt6.QtCore import QObject, QTimer, QThread, QCoreApplication, Qt, pyqtSlot as Slot
+
+
+# иерархическое колесо: _LEVELS уровней по _SLOTS ячеек, ячейка уровня L охватывает _SLOTS ** L тиков
+_BITS = 8
+_SLOTS = 1 << _BITS
+_MASK = _SLOTS - 1
+_LEVELS = 4
+_MAX_INTERVAL = (1 << 31) - 1
+
+
+class TimerWheel(QObject):
+    """Планировщик программных таймеров на иерархическом колесе.
+    Постановка и снятие таймера - O(1). Один QTimer будит колесо только к ближайшему сроку (или
+    к переносу ячейки старшего уровня), поэтому без назревших сроков ничего не опрашивается.
+    coalesce - шаг округления сроков вверх, мс: близкие по времени таймеры срабатывают за одно пробуждение.
+    Колесо создаётся и используется в потоке GUI после создания QApplication - иначе его QTimer не сработает"""
+
+    __instance = None
+
+    def __init__(self, resolution=1, coalesce=0):
+        app = QCoreApplication.instance()
+        if app is None:
+            raise RuntimeError("TimerWheel requires a QApplication; create it before timers with callbacks")
+        if QThread.currentThread() is not app.thread():
+            raise RuntimeError("TimerWheel must be created in the GUI thread")
+        super().__init__()
+        self.__thread_id = get_ident()
+        self.__resolution = resolution / 1000
+        self.__coalesce = max(1, round(coalesce / resolution))
+        self.__epoch = monotonic()
+        self.__tick = 0
+        self.__wheel = [[dict() for _ in range(_SLOTS)] for _ in range(_LEVELS)]
+        self.__counts = [0] * _LEVELS
+
+        self.__wakeup = None
+        self.__wakeups = 0
+        self.__fired = 0
+
+        self.__tmr = QTimer(self)
+        self.__tmr.setSingleShot(True)
+        self.__tmr.setTimerType(Qt.TimerType.PreciseTimer)
+        self.__tmr.timeout.connect(self.__on_timeout)
+
+    @classmethod
+    def instance(cls) -> "TimerWheel":
+        if cls.__instance is None:
+            cls.__instance = cls()
+        return cls.__instance
+
+    def set_coalescing(self, coalesce: int):
+        """Шаг округления сроков, мс; действует для таймеров, поставленных после вызова"""
+        self.__coalesce = max(1, round(coalesce / 1000 / self.__resolution))
+
+    def __now_tick(self) -> int:
+        return int((monotonic() - self.__epoch) / self.__resolution)
+
+    def schedule(self, timer: "Timer", deadline: float):
+        """Ставит timer на срок deadline (monotonic, с); уже поставленный таймер переносится"""
+        if get_ident() != self.__thread_id:
+            raise RuntimeError("Timers with callbacks can only be scheduled from the GUI thread")
+        self.cancel(timer)
+        tick = -(-(deadline - self.__epoch) // self.__resolution)
+        c = self.__coalesce
+        tick = int(-(-tick // c) * c)
+        self.__insert(timer, max(tick, self.__tick + 1))
+
+    def cancel(self, timer: "Timer"):
+        slot = timer._slot
+        if slot is not None:
+            del slot[timer]
+            self.__counts[timer._level] -= 1
+            timer._slot = None
+
+    def __insert(self, timer, tick):
+        timer._tick = tick
+        # срок за пределами колеса ставится в последнюю ячейку и при переносе пересчитывается
+        tick = min(tick, self.__tick + (1 << (_BITS * _LEVELS)) - 1)
+        delta = tick - self.__tick
+        level = 0
+        while delta >= 1 << (_BITS * (level + 1)):
+            level += 1
+        shift = _BITS * level
+        slot = self.__wheel[level][(tick >> shift) & _MASK]
+        slot[timer] = None
+        self.__counts[level] += 1
+        timer._slot = slot
+        timer._level = level
+        # для старших уровней колесо просыпается к началу ячейки, чтобы перенести таймер ниже
+        event = tick >> shift << shift
+        if self.__wakeup is None or event < self.__wakeup:
+            self.__arm(event)
+
+    def __arm(self, event):
+        self.__wakeup = event
+        delay = (self.__epoch + event * self.__resolution - monotonic()) * 1000
+        # при раннем пробуждении (предел интервала QTimer) колесо просто заводится снова
+        self.__tmr.start(min(max(0, int(-(-delay // 1))), _MAX_INTERVAL))
+
+    def __next_event(self):
+        """Ближайший тик, на котором есть таймеры к срабатыванию или к переносу; None - колесо пусто"""
+        best = None
+        for level in range(_LEVELS):
+            if not self.__counts[level]:
+                continue
+            shift = _BITS * level
+            block = self.__tick >> shift
+            slots = self.__wheel[level]
+            for k in range(1, _SLOTS + 1):
+                if slots[(block + k) & _MASK]:
+                    event = (block + k) << shift
+                    if best is None or event < best:
+                        best = event
+                    break
+        return best
+
+    @Slot()
+    def __on_timeout(self):
+        self.__wakeups += 1
+        self.__wakeup = None
+        self.advance(self.__now_tick())
+        event = self.__next_event()
+        if event is not None:
+            self.__arm(event)
+
+    def advance(self, now_tick: int):
+        """Срабатывают все таймеры со сроком не позже now_tick; пустые участки колеса пропускаются"""
+        while True:
+            event = self.__next_event()
+            if event is None or event > now_tick:
+                break
+            self.__tick = event
+            # перенос ячеек старших уровней, начинающихся на этом тике
+            for level in range(_LEVELS - 1, 0, -1):
+                shift = _BITS * level
+                if event & ((1 << shift) - 1):
+                    continue
+                slot = self.__wheel[level][(event >> shift) & _MASK]
+                if slot:
+                    pending = list(slot)
+                    slot.clear()
+                    self.__counts[level] -= len(pending)
+                    for timer in pending:
+                        timer._slot = None
+                        self.__insert(timer, timer._tick)
+            slot = self.__wheel[0][event & _MASK]
+            if slot:
+                due = list(slot)
+                slot.clear()
+                self.__counts[0] -= len(due)
+                for timer in due:
+                    timer._slot = None
+                    self.__fired += 1
+                    timer._fire()
+        self.__tick = max(self.__tick, now_tick)
+
+    def __len__(self):
+        return sum(self.__counts)
+
+    def stats(self) -> dict:
+        """wakeups - пробуждения колеса, fired - срабатывания таймеров"""
+        return {"pending": len(self), "wakeups": self.__wakeups, "fired": self.__fired}
 
 
 class Timer:
+    """Программный таймер с периодом period, мс.
+    С callback таймер периодический и обслуживается TimerWheel: callback вызывается без опроса;
+    такой таймер создаётся в потоке GUI после создания QApplication (иначе RuntimeError).
+    Метод объекта хранится слабой ссылкой: после удаления объекта таймер останавливается сам, как и прежний
+    опрашиваемый таймер. Функцию или lambda колесо держит, пока таймер не остановлен stop().
+    Без callback - опрашиваемый таймер, как раньше: expired()/get(); его можно использовать в любом потоке"""
 
-    def __init__(self, period, callback=None):
+    def __init__(self, period, callback=None, wheel=None):
         self.period = period / 1000
         self.counter = monotonic()
+        self.__callback = None
         self.callback = callback
+        self._slot = None
+        self._level = 0
+        self._tick = 0
+        self.__wheel = wheel
+        if callback is not None:
+            self.__schedule()
+
+    @property
+    def callback(self):
+        """Функция таймера; None - не задана или объект её метода удалён"""
+        callback = self.__callback
+        if isinstance(callback, WeakMethod):
+            return callback()
+        return callback
+
+    @callback.setter
+    def callback(self, callback):
+        # колесо держит таймер, а таймер не должен держать объект, которому принадлежит
+        if hasattr(callback, "__self__") and hasattr(callback, "__func__"):
+            callback = WeakMethod(callback)
+        self.__callback = callback
+
+    def __schedule(self):
+        if self.__wheel is None:
+            self.__wheel = TimerWheel.instance()
+        self.__wheel.schedule(self, self.counter + self.period)
 
     def restart(self):
         self.counter = monotonic()
+        if self.callback is not None:
+            self.__schedule()
+
+    def stop(self):
+        """Снимает таймер с колеса; restart() ставит его снова"""
+        if self.__wheel is not None:
+            self.__wheel.cancel(self)
+
+    @property
+    def active(self) -> bool:
+        return self._slot is not None
 
     def set_period(self, period):
         self.period = period / 1000
+        if self._slot is not None:
+            self.__schedule()
 
     def expired(self):
         return self.get() >= self.period * 1000
@@ -24,3 +235,17 @@ class Timer:
         if self.expired() and self.callback:
             self.restart()
             self.callback()
+
+    def _fire(self):
+        callback = self.callback
+        if callback is None:
+            # объект метода удалён - таймер снят с колеса и больше не ставится
+            return
+        # следующий срок отсчитывается от номинального, а не от момента срабатывания: округление сроков
+        # (coalesce) выравнивает пробуждения, не растягивая период; после долгой задержки - от текущего момента
+        now = monotonic()
+        self.counter += self.period
+        if now - self.counter >= self.period:
+            self.counter = now
+        self.__schedule()
+        callback()
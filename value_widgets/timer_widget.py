@@ -1,12 +1,25 @@
-from PyQt6.QtGui import QFont, QIcon
-from PyQt6.QtCore import Qt, pyqtSlot as Slot, QTimer
+from time import monotonic
+
+from PyQt6.QtGui import QIcon
+from PyQt6.QtCore import Qt, pyqtSlot as Slot
 from PyQt6.QtWidgets import QPushButton, QFrame, QHBoxLayout, QVBoxLayout, QSpacerItem, QSizePolicy, QLabel
 
-from .timer import Timer
-from .utils import get_image_path, is_app_dark
+from .utils import get_image_path
+from .frame_clock import FrameClock
+from .theme import ThemeService
+from . import text_cache
 
 
 class TimerWidget(QFrame):
+    """Секундомер или измеритель времени перехода контролируемой величины от begin_value к end_value.
+    Измерение ведётся по отметкам времени значений, переданных в set_controlled_value, и не зависит
+    от отрисовки; моменты пересечения порогов уточняются линейной интерполяцией между отсчётами"""
+
+    # WidgetGroup передаёт отсчёты и скрытому виджету: пропущенный отсчёт - пропущенное пересечение порога
+    DEFER_HIDDEN_VALUES = False
+    # WidgetGroup передаёт отметку времени значения вторым аргументом set_controlled_value
+    TIMESTAMPED_VALUES = True
+
     def __init__(self, widget, x, y, begin_value=None, end_value=None, normal_min=0, normal_max=100,
                  name=None, units=None, dark=False, redraw_period=5):
         super().__init__()
@@ -24,8 +37,17 @@ class TimerWidget(QFrame):
         self.__value_ok = True
 
         self.__counter = 0.0
+        # 0 - остановлен, 1 - ожидание пересечения begin_value, 2 - идёт отсчёт
         self.__fsm = 0
-        self.__tmr = Timer(100)
+        # начало отсчёта в шкале отметок времени значений (для секундомера - monotonic)
+        self.__start_time = 0.0
+        # предыдущий отсчёт и соответствие его отметки времени monotonic() для отображения хода отсчёта
+        self.__last_value = None
+        self.__last_time = 0.0
+        self.__time_offset = 0.0
+        # момент взвода кнопкой в шкале отметок времени значений: отсчёт не может начаться раньше
+        self.__arm_time = 0.0
+        self.__shown_text = None
 
         self.__startButton = QPushButton(self)
         self.__startButton.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
@@ -47,7 +69,7 @@ class TimerWidget(QFrame):
         self.__layout = QVBoxLayout(self)
         self.__name_label = QLabel()
         self.__name_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        self.__name_label.setFont(QFont("Consolas, Courier New", 11))
+        self.__name_label.setFont(text_cache.font("Consolas, Courier New", 11))
         
         buf = self.__name
         if self.__begin_value is not None:
@@ -59,7 +81,7 @@ class TimerWidget(QFrame):
         self.__time_label = QLabel()
         self.__time_label.setText("0.00 с")
         self.__time_label.setAlignment(Qt.AlignmentFlag.AlignHCenter)
-        self.__time_label.setFont(QFont("Consolas, Courier New", 14))
+        self.__time_label.setFont(text_cache.font("Consolas, Courier New", 14))
         self.__layout.addWidget(self.__name_label)
         self.__layout.addWidget(self.__time_label)
         spacerItem = QSpacerItem(10, 10, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
@@ -75,46 +97,63 @@ class TimerWidget(QFrame):
         self.set_dark(dark)
         self.__time_label.setStyleSheet(f"color: {'rgb(6, 214, 160)' if self.__dark else 'rgb(0, 100, 50)'}")
 
-        self.__qtmr = QTimer(self)
-        self.__qtmr.timeout.connect(self.__redraw_process)
-        self.__qtmr.start(redraw_period)
-        self.__redraw_required = True
+        # ход отсчёта показывается раз в кадр, пока идёт отсчёт и таймер виден
+        self.__clock = FrameClock.instance()
+        self.__clock.register(self, redraw_period)
+        self.__running = False
+        self.destroyed.connect(lambda _=None, clock=self.__clock, cb=self.__on_frame: clock.remove_frame_callback(cb))
+        ThemeService.instance().register(self)
         self.show()
 
-    @Slot()
-    def __redraw_process(self):
-        if self.__dark != is_app_dark():
-            self.set_dark(is_app_dark())
-            self.__redraw_required = True
-        if self.__redraw_required:
-            self.update()
-            self.__redraw_required = not self.__paused
+    def showEvent(self, a0):
+        # скрытый таймер продолжает измерение, но надпись не обновляет
+        self.__refresh_label()
+        super().showEvent(a0)
 
     def paintEvent(self, a0):
-        self.__redraw()
+        # снова виден - возобновляем показ хода отсчёта
+        if self.__fsm == 2 and not self.__running:
+            self.__set_running(True)
+            self.__refresh_label()
+        super().paintEvent(a0)
+
+    @property
+    def counter(self) -> float:
+        """Измеренное (или текущее) время, с"""
+        return self.__elapsed()
+
+    @property
+    def running(self) -> bool:
+        return self.__fsm == 2
 
     @Slot()
     def __start_timer(self):
         self.__fsm = 1
-        self.__tmr.restart()
+        self.__arm_time = monotonic() + self.__time_offset
         self.__counter = 0
         self.__tmp_counter = 0
         self.__paused = False
-        self.__redraw_required = True
+        self.__set_running(False)
+        self.__refresh_label()
 
     @Slot()
     def __pause_timer(self):
         if self.__paused:
-            self.__fsm = 1
-            self.__tmr.restart()
+            # секундомер: отсчёт идёт от нажатия кнопки
+            self.__fsm = 2
+            self.__start_time = monotonic()
+            self.__time_offset = 0.0
             self.__paused = False
             self.__startButton.setIcon(QIcon(get_image_path("pause.png")))
+            self.__set_running(True)
         else:
+            self.__counter = self.__elapsed()
             self.__paused = True
             self.__fsm = 0
             self.__tmp_counter = self.__counter
             self.__startButton.setIcon(QIcon(get_image_path("play.png")))
-        self.__redraw_required = True
+            self.__set_running(False)
+        self.__refresh_label()
 
     @Slot()
     def __clear_timer(self):
@@ -122,14 +161,40 @@ class TimerWidget(QFrame):
         self.__paused = True
         self.__fsm = 0
         self.__counter = 0
-        self.__tmr.restart()
         self.__tmp_counter = 0
-        self.__redraw_required = True
+        self.__set_running(False)
+        self.__refresh_label()
+
+    def __set_running(self, running: bool):
+        if running != self.__running:
+            self.__running = running
+            if running:
+                self.__clock.add_frame_callback(self.__on_frame)
+            else:
+                self.__clock.remove_frame_callback(self.__on_frame)
+
+    def __on_frame(self):
+        if self.__clock.is_exposed(self):
+            self.__refresh_label()
+        else:
+            # невидимый таймер не занимает кадры; показ хода отсчёта возобновит paintEvent
+            self.__set_running(False)
+            self.__clock.mark_dirty(self)
 
-    def __draw_rect(self):
-        if not self.isVisible():
+    def __elapsed(self) -> float:
+        if self.__fsm != 2:
+            return self.__counter
+        # текущее время в шкале отметок времени значений
+        now = monotonic() + self.__time_offset
+        return now - self.__start_time + self.__tmp_counter
+
+    def __refresh_label(self):
+        counter = self.__elapsed()
+        text = f"{counter:05.2f} с"
+        if text == self.__shown_text:
             return
-        if self.__normal_min <= self.__counter <= self.__normal_max:
+        self.__shown_text = text
+        if self.__normal_min <= counter <= self.__normal_max:
             if not self.__value_ok:
                 self.__time_label.setStyleSheet(f"color: {'rgb(6, 214, 160)' if self.__dark else 'rgb(0, 100, 50)'}")
                 self.__value_ok = True
@@ -137,10 +202,45 @@ class TimerWidget(QFrame):
             if self.__value_ok:
                 self.__time_label.setStyleSheet(f"color: {'rgb(229, 89, 52)' if self.__dark else 'rgb(230, 0, 0)'}")
                 self.__value_ok = False
-        self.__time_label.setText(f"{self.__counter:05.2f} с")
+        self.__time_label.setText(text)
 
-    def set_controlled_value(self, val: float):
+    def set_controlled_value(self, val: float, timestamp: float | None = None):
+        """timestamp - время отсчёта, с; по умолчанию monotonic(). Все отсчёты должны быть в одной шкале времени"""
         self.__controlled_value = val
+        if self.__begin_value is None:
+            return
+        t = monotonic() if timestamp is None else timestamp
+        prev_value, prev_time = self.__last_value, self.__last_time
+        self.__last_value = val
+        self.__last_time = t
+        self.__time_offset = t - monotonic()
+
+        if self.__fsm == 1 and self.__passed(val, self.__begin_value, True):
+            self.__fsm = 2
+            # пересечение между отсчётом до взвода и первым отсчётом после него - не раньше взвода
+            start = self.__crossing(prev_value, prev_time, val, t, self.__begin_value, True)
+            self.__start_time = min(max(start, self.__arm_time), t)
+            self.__set_running(True)
+        if self.__fsm == 2 and self.__passed(val, self.__end_value, False):
+            end = self.__crossing(prev_value, prev_time, val, t, self.__end_value, False)
+            self.__counter = max(0.0, end - self.__start_time)
+            self.__fsm = 0
+            self.__set_running(False)
+            self.__refresh_label()
+
+    def __passed(self, val, threshold, begin: bool) -> bool:
+        """Величина прошла порог в направлении от begin_value к end_value; begin_value - строго"""
+        if self.__begin_value < self.__end_value:
+            return val > threshold if begin else val >= threshold
+        if self.__begin_value > self.__end_value:
+            return val < threshold if begin else val <= threshold
+        return False
+
+    def __crossing(self, v0, t0, v1, t1, threshold, begin: bool) -> float:
+        """Момент пересечения порога между двумя отсчётами; без предыдущего отсчёта по эту сторону порога - t1"""
+        if v0 is None or self.__passed(v0, threshold, begin) or v1 == v0 or t1 <= t0:
+            return t1
+        return t0 + (threshold - v0) / (v1 - v0) * (t1 - t0)
 
     def set_dark(self, dark: bool):
         if dark != self.__dark:
@@ -179,29 +279,5 @@ class TimerWidget(QFrame):
             self.__pauseButton.setStyleSheet(button_style)
         self.__dark = dark
 
-    def __redraw(self):
-        match self.__fsm:
-            case 0:
-                pass
-            case 1:
-                if self.__begin_value is None:
-                    self.__fsm = 2
-                    self.__tmr.restart()
-                elif ((self.__begin_value > self.__end_value and self.__controlled_value < self.__begin_value) or
-                        (self.__begin_value < self.__end_value and self.__controlled_value > self.__begin_value)):
-                    self.__fsm = 2
-                    self.__tmr.restart()
-            case 2:
-                if self.__begin_value is None:
-                    self.__counter = self.__tmr.get() / 1000 + self.__tmp_counter
-                else:
-                    if ((self.__begin_value < self.__end_value and self.__controlled_value >= self.__end_value) or
-                            (self.__begin_value > self.__end_value and self.__controlled_value <= self.__end_value)):
-                        self.__fsm = 0
-                    else:
-                        self.__counter = self.__tmr.get() / 1000 + self.__tmp_counter
-
-        self.__draw_rect()
-
     def setGeometry(self, x, y, w, h):
         super().setGeometry(x, y, w, h)
@@ -1,19 +1,28 @@
-from statistics import mean
-import importlib.resources as pkg_resources
-from pathlib import Path
 from PyQt6.QtGui import QColor, QGuiApplication
 from PyQt6.QtCore import Qt
 
 
-def choose_contrast_color(color: QColor):
-        if mean((color.red(), color.green(), color.blue())) >= 128:
-            return QColor(0, 0, 0)
+_contrast_colors = dict()
+
+
+def choose_contrast_color(color: QColor) -> QColor:
+    """Чёрный или белый цвет текста для фона color; результат общий, изменять его нельзя"""
+    key = color.rgba()
+    ret = _contrast_colors.get(key)
+    if ret is None:
+        if color.red() + color.green() + color.blue() >= 3 * 128:
+            ret = QColor(0, 0, 0)
         else:
-            return QColor(255, 255, 255)
-        
+            ret = QColor(255, 255, 255)
+        _contrast_colors[key] = ret
+    return ret
+
 
 def get_image_path(filename: str) -> str:
     """Получить путь к изображению из пакета"""
+    # importlib.resources заметно удлиняет импорт пакета, а нужен только TimerWidget
+    import importlib.resources as pkg_resources
+    from pathlib import Path
     try:
         return str(pkg_resources.files("value_widgets.images") / filename)
     except AttributeError:
@@ -0,0 +1,339 @@
+from time import monotonic
+
+from PyQt6.QtCore import QObject, QEvent
+from PyQt6.QtWidgets import QWidget
+
+from .frame_clock import FrameClock
+
+
+# имена методов, через которые виджеты пакета принимают новое значение
+_SETTER_NAMES = ("set_value", "set_state", "set_error", "set_position", "set_controlled_value")
+
+
+def _accepts(setter, n_args: int) -> bool:
+    """setter можно вызвать с n_args позиционными аргументами; без сигнатуры (встроенные функции) - считается, что да"""
+    # inspect нужен только при привязке и заметно удлиняет импорт пакета
+    from inspect import signature
+    try:
+        signature(setter).bind(*[None] * n_args)
+    except TypeError:
+        return False
+    except ValueError:
+        return True
+    return True
+
+
+def resolve_setter(widget, setter=None, timestamped=None):
+    """Функция установки значения виджета и признак передачи отметки времени (см. WidgetGroup.bind);
+    TypeError, если подходящей функции нет или её нельзя вызвать с нужными аргументами"""
+    if setter is None:
+        # методы с другим числом аргументов (например, Diagram.set_value(section, item, value)) пропускаются
+        for name in _SETTER_NAMES:
+            if hasattr(widget, name) and _accepts(getattr(widget, name), 1):
+                setter = getattr(widget, name)
+                break
+        else:
+            raise TypeError(f"Cannot find single-argument value setter for {type(widget).__name__}, "
+                            f"pass setter explicitly")
+        if timestamped is None:
+            timestamped = getattr(widget, "TIMESTAMPED_VALUES", False) and _accepts(setter, 2)
+    elif isinstance(setter, str):
+        setter = getattr(widget, setter)
+        if timestamped is None:
+            timestamped = getattr(widget, "TIMESTAMPED_VALUES", False) and _accepts(setter, 2)
+    timestamped = bool(timestamped)
+    # ошибка привязки выявляется здесь, а не при применении значений в кадре FrameClock
+    if not _accepts(setter, 2 if timestamped else 1):
+        raise TypeError(f"Setter {getattr(setter, '__name__', setter)!r} of {type(widget).__name__} "
+                        f"cannot be called with {'(value, timestamp)' if timestamped else 'a single value'}")
+    return setter, timestamped
+
+
+class _ShowWatcher(QObject):
+    """Сообщает группе о показе скрытых виджетов, для которых отложены значения"""
+
+    def __init__(self, callback):
+        super().__init__()
+        self.__callback = callback
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Show:
+            self.__callback(obj)
+        return False
+
+
+class WidgetGroup:
+    """Таблица привязок тег -> виджет для пакетного обновления.
+    Новые значения копятся (по последнему на тег) и применяются один раз за кадр FrameClock.
+    Скрытым виджетам значения не передаются: последнее значение запоминается и применяется при показе.
+    Виджеты, которым важен каждый отсчёт (DEFER_HIDDEN_VALUES = False, например TimerWidget), получают
+    значения и скрытыми - их перерисовку откладывает FrameClock. Вызывать из потока GUI"""
+
+    def __init__(self):
+        self.__slots = dict()
+        self.__widgets = list()
+        self.__setters = list()
+        self.__deferrable = list()
+        self.__timestamped = list()
+        self.__pending = dict()
+        # отметки времени ожидающих значений (update_slots с timestamps): слот -> время
+        self.__pending_times = dict()
+        self.__listeners = list()
+        self.__clock = FrameClock.instance()
+        # отложенные значения скрытых виджетов: слот -> значение; виджеты, ждущие показа
+        self.__hidden = dict()
+        self.__watched = dict()
+        self.__watcher = _ShowWatcher(self.__widget_shown)
+
+        self.__samples = 0
+        self.__coalesced = 0
+        self.__applied = 0
+        self.__invalidated = 0
+        self.__deferred = 0
+        self.__frames = 0
+        self.__rate_t0 = monotonic()
+        self.__rate_samples = 0
+        self.__ingest_rate = 0.0
+
+    def bind(self, tag, widget, setter=None, defer_hidden=None, timestamped=None) -> int:
+        """Привязывает виджет к тегу и возвращает индекс слота для update_array.
+        setter - имя метода виджета или функция f(value); по умолчанию подбирается по типу виджета.
+        defer_hidden - откладывать значения до показа скрытого виджета (по умолчанию - атрибут
+        DEFER_HIDDEN_VALUES виджета, иначе True); False для функций, которые копят отсчёты.
+        timestamped - setter принимает вторым аргументом отметку времени значения (None, если значение
+        пришло без неё); по умолчанию - атрибут TIMESTAMPED_VALUES виджета для его методов, иначе False.
+        Setter, который нельзя вызвать с этими аргументами, - TypeError здесь же"""
+        setter, timestamped = resolve_setter(widget, setter, timestamped)
+        if defer_hidden is None:
+            defer_hidden = getattr(widget, "DEFER_HIDDEN_VALUES", True)
+        defer_hidden = defer_hidden and isinstance(widget, QWidget)
+
+        slot = self.__slots.get(tag)
+        if slot is None:
+            slot = len(self.__widgets)
+            self.__slots[tag] = slot
+            self.__widgets.append(widget)
+            self.__setters.append(setter)
+            self.__deferrable.append(defer_hidden)
+            self.__timestamped.append(timestamped)
+        else:
+            self.__widgets[slot] = widget
+            self.__setters[slot] = setter
+            self.__deferrable[slot] = defer_hidden
+            self.__timestamped[slot] = timestamped
+            if slot in self.__hidden:
+                # отложенное значение переходит к новому виджету
+                self.__pending.setdefault(slot, self.__hidden.pop(slot))
+                self.__schedule()
+        # элементы canvas - не QObject: их удаляет сцена, привязку снимает unbind
+        if hasattr(widget, "destroyed"):
+            widget.destroyed.connect(lambda _=None, s=slot, w=widget: self.__widget_destroyed(s, w))
+        return slot
+
+    def unbind(self, tag):
+        slot = self.__slots.get(tag)
+        if slot is not None:
+            self.__widgets[slot] = None
+            self.__setters[slot] = None
+            self.__pending.pop(slot, None)
+            self.__pending_times.pop(slot, None)
+            self.__hidden.pop(slot, None)
+
+    def slot(self, tag) -> int:
+        return self.__slots[tag]
+
+    def tags(self) -> list:
+        """Теги в порядке слотов"""
+        ret = [None] * len(self.__widgets)
+        for tag, slot in self.__slots.items():
+            ret[slot] = tag
+        return ret
+
+    def add_listener(self, callback):
+        """callback(changes) вызывается после каждого применения значений; changes - словарь {слот: значение}"""
+        if callback not in self.__listeners:
+            self.__listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.__listeners:
+            self.__listeners.remove(callback)
+
+    def __widget_destroyed(self, slot, widget):
+        self.__watched.pop(widget, None)
+        if self.__widgets[slot] is widget:
+            self.__widgets[slot] = None
+            self.__setters[slot] = None
+            self.__pending.pop(slot, None)
+            self.__pending_times.pop(slot, None)
+            self.__hidden.pop(slot, None)
+
+    def __defer(self, slot, widget, value):
+        self.__hidden[slot] = value
+        slots = self.__watched.get(widget)
+        if slots is None:
+            slots = self.__watched[widget] = set()
+            widget.installEventFilter(self.__watcher)
+        slots.add(slot)
+
+    def __widget_shown(self, widget):
+        slots = self.__watched.pop(widget, None)
+        if slots is None:
+            return
+        widget.removeEventFilter(self.__watcher)
+        hidden = self.__hidden
+        # событие Show приходит до первой перерисовки показанного виджета
+        for slot in slots:
+            if slot in hidden and self.__widgets[slot] is widget:
+                if self.__timestamped[slot]:
+                    self.__setters[slot](hidden.pop(slot), None)
+                else:
+                    self.__setters[slot](hidden.pop(slot))
+                self.__applied += 1
+        # показанный виджет перерисуется целиком - отдельная перерисовка по пометке не нужна
+        self.__clock.clear_dirty(widget)
+
+    def set(self, tag, value):
+        self.__put(self.__slots[tag], value)
+        if self.__pending_times:
+            self.__pending_times.pop(self.__slots[tag], None)
+        self.__schedule()
+
+    def update(self, values: dict):
+        """Принимает словарь {тег: значение}; неизвестные теги пропускаются"""
+        slots = self.__slots
+        for tag, value in values.items():
+            slot = slots.get(tag)
+            if slot is not None:
+                self.__put(slot, value)
+                if self.__pending_times:
+                    self.__pending_times.pop(slot, None)
+        self.__schedule()
+
+    def update_array(self, values, first_slot=0):
+        """Принимает последовательность значений для слотов first_slot, first_slot + 1, ..."""
+        n = min(len(values), len(self.__widgets) - first_slot)
+        if n <= 0:
+            return
+        pending = self.__pending
+        n_before = len(pending)
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        for i in range(n):
+            pending[first_slot + i] = values[i]
+        if self.__pending_times:
+            for i in range(n):
+                self.__pending_times.pop(first_slot + i, None)
+        n_new = len(pending) - n_before
+        self.__samples += n
+        self.__coalesced += n - n_new
+        self.__schedule()
+
+    def update_slots(self, slots, values, timestamps=None):
+        """Принимает пары (слот, значение); слоты могут повторяться - применяется последнее значение.
+        timestamps - отметки времени значений для виджетов, привязанных с timestamped"""
+        if hasattr(slots, "tolist"):
+            slots = slots.tolist()
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+        pending = self.__pending
+        n_before = len(pending)
+        for slot, value in zip(slots, values):
+            pending[slot] = value
+        if timestamps is not None:
+            if hasattr(timestamps, "tolist"):
+                timestamps = timestamps.tolist()
+            self.__pending_times.update(zip(slots, timestamps))
+        elif self.__pending_times:
+            for slot in slots:
+                self.__pending_times.pop(slot, None)
+        n = len(slots)
+        self.__samples += n
+        self.__coalesced += n - (len(pending) - n_before)
+        self.__schedule()
+
+    def __put(self, slot, value):
+        self.__samples += 1
+        if slot in self.__pending:
+            self.__coalesced += 1
+        self.__pending[slot] = value
+
+    def __schedule(self):
+        if self.__pending:
+            self.__clock.call_next_frame(self.flush)
+
+    def flush(self):
+        """Применяет накопленные значения немедленно"""
+        pending = self.__pending
+        if not pending:
+            return
+        self.__pending = dict()
+        times = self.__pending_times
+        self.__pending_times = dict()
+        timestamped = self.__timestamped
+        clock = self.__clock
+        widgets = self.__widgets
+        setters = self.__setters
+        deferrable = self.__deferrable
+        invalidated = 0
+        deferred = 0
+        for slot, value in pending.items():
+            setter = setters[slot]
+            if setter is None:
+                continue
+            widget = widgets[slot]
+            if deferrable[slot] and not widget.isVisible():
+                self.__defer(slot, widget, value)
+                deferred += 1
+                continue
+            args = (value, times.get(slot)) if timestamped[slot] else (value,)
+            if clock.is_registered(widget):
+                was_dirty = clock.is_dirty(widget)
+                setter(*args)
+                if not was_dirty and clock.is_dirty(widget):
+                    invalidated += 1
+            else:
+                setter(*args)
+                invalidated += 1
+        self.__applied += len(pending) - deferred
+        self.__deferred += deferred
+        self.__invalidated += invalidated
+        self.__frames += 1
+        for listener in self.__listeners:
+            listener(pending)
+
+    @property
+    def n_bound(self) -> int:
+        return len(self.__slots)
+
+    def stats(self) -> dict:
+        """ingest_rate - отсчётов в секунду с прошлого вызова stats();
+        coalesced - отсчёты, замещённые более новыми до применения;
+        deferred - значения, отложенные до показа скрытых виджетов;
+        invalidated - виджеты, которые после применения потребовали перерисовки"""
+        now = monotonic()
+        dt = now - self.__rate_t0
+        if dt > 0:
+            self.__ingest_rate = (self.__samples - self.__rate_samples) / dt
+        self.__rate_t0 = now
+        self.__rate_samples = self.__samples
+        return {
+            "samples": self.__samples,
+            "ingest_rate": self.__ingest_rate,
+            "coalesced": self.__coalesced,
+            "applied": self.__applied,
+            "invalidated": self.__invalidated,
+            "deferred": self.__deferred,
+            "frames": self.__frames,
+            "pending": len(self.__pending),
+        }
+
+    def reset_stats(self):
+        self.__samples = 0
+        self.__coalesced = 0
+        self.__applied = 0
+        self.__invalidated = 0
+        self.__deferred = 0
+        self.__frames = 0
+        self.__rate_t0 = monotonic()
+        self.__rate_samples = 0
+        self.__ingest_rate = 0.0